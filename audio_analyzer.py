@@ -1,31 +1,188 @@
-import pyaudio
+try:
+    import pyaudio
+except ImportError:  # Offline replay (audio_sources.py) works without PortAudio
+    pyaudio = None
 import numpy as np
 import threading
 import time
+import bisect
 from collections import deque
+import metrics
+from audio_capture import CaptureRing
+from tempo_tracker import TempoTracker
+from onset_classifier import OnsetClassifier
+from feature_stream import (F_BANDS, F_FLUX, F_RMS, F_TIME, FeatureRing,
+                            band_layout, onset_groups)
+
+HOP_SECONDS = metrics.histogram("vj_audio_hop_seconds", "Analysis time per audio hop")
+INPUT_OVERFLOWS = metrics.counter("vj_audio_input_overflows_total", "Input overflows reported by PortAudio")
+
+# np.fft.rfft(..., out=) exists from NumPy 2.0 on
+RFFT_HAS_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+PA_CONTINUE = pyaudio.paContinue if pyaudio else 0
+PA_INPUT_UNDERFLOW = pyaudio.paInputUnderflow if pyaudio else 1
+PA_INPUT_OVERFLOW = pyaudio.paInputOverflow if pyaudio else 2
+
+
+class SpectralPlan:
+    """Immutable per-(rate, chunk) analysis constants, shared between analyzers."""
+
+    def __init__(self, rate, chunk):
+        # Window scaled to unit mean so flux levels match the old rectangular chunks
+        window = np.hanning(chunk).astype(np.float32)
+        self.window = window * (chunk / window.sum())
+        self.freqs = np.fft.rfftfreq(chunk, 1.0 / rate)
+        bass_idx = np.where((self.freqs >= 20) & (self.freqs <= 200))[0]
+        self.bass_bins = slice(int(bass_idx[0]), int(bass_idx[-1]) + 1)
+        self.num_bass = len(bass_idx)
+        self.num_bins = len(self.freqs)
+        # Log-spaced feature bands (see feature_stream.py)
+        self.band_starts, self.band_stop, self.band_centres = band_layout(rate, chunk)
+        self.onset_groups = onset_groups(self.band_centres)
+        self.spectrum_dtype = np.fft.rfft(np.zeros(chunk, dtype=np.float32)).dtype
+
+
+_plans = {}
+
+
+def get_plan(rate, chunk):
+    key = (rate, chunk)
+    if key not in _plans:
+        _plans[key] = SpectralPlan(rate, chunk)
+    return _plans[key]
+
+
+class RunningMedian:
+    """Median over a sliding window: O(log n) search + small memmove per update."""
+
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self.values = deque()
+        self.ordered = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        if len(self.values) == self.maxlen:
+            old = self.values.popleft()
+            del self.ordered[bisect.bisect_left(self.ordered, old)]
+        self.values.append(value)
+        bisect.insort(self.ordered, value)
+
+    def median(self):
+        n = len(self.ordered)
+        if n == 0:
+            return 0.0
+        mid = n // 2
+        if n % 2:
+            return self.ordered[mid]
+        return 0.5 * (self.ordered[mid - 1] + self.ordered[mid])
 
 
 class AudioAnalyzer:
-    def __init__(self, device_name="BlackHole 2ch", rate=44100, chunk=2048):
+    def __init__(self, device_name="BlackHole 2ch", rate=44100, chunk=2048, hop=512):
+        # chunk = analysis window, hop = samples read per step (chunk % hop == 0).
+        # Overlapping windows bound detection latency by the hop, not the window.
+        if chunk % hop:
+            raise ValueError("chunk must be a multiple of hop")
         self.rate = rate
         self.chunk = chunk
+        self.hop = hop
         self.device_name = device_name
         self.device_index = None
-        self.p = pyaudio.PyAudio()
+        self.p = pyaudio.PyAudio() if pyaudio else None
         self.stream = None
         self.running = False
+        self.worker_alive = False
         self.on_beat_callback = None
+        self.on_tempo_callback = None
 
-        self.flux_history = deque(maxlen=128)
+        # ~6 s of flux history, ~1 s warm-up, independent of the hop size
+        self.flux_history = RunningMedian(int(6.0 * rate / hop))
+        self.warmup_hops = int(1.0 * rate / hop)
         self.last_beat_time = 0.0
         self.min_interval = 0.25
+        # Peak picking: fire on the hop where flux rises over the threshold,
+        # and only if it reaches peak_fraction of the last onset's peak flux
+        # (decaying with a 2 s half-life). Overlapping hops put small flux
+        # bumps (hats, noise) just before a kick above the median threshold;
+        # without this gate they fire first and the debounce eats the kick.
+        self.peak_fraction = 0.4
+        self.peak_decay = 0.5 ** (hop / float(rate) / 2.0)
+        self.onset_peak = 0.0
+        self.flux_above = False
 
         self.current_volume = 0.0
         self.current_device_name = "Searching..."
-        self.prev_log_mag = None
+
+        # Per-hop latency report: processing time and onset -> detection delay
+        self.hop_process_time = 0.0
+        self.onset_latency = 0.0
+
+        # Live capture: the PortAudio callback fills this ring, the analysis
+        # worker drains it one hop at a time (see audio_capture.py)
+        self.capture = CaptureRing()
+        self.hop_buffer = np.zeros(hop, dtype=np.int16)
+        self.input_overflows = 0   # PortAudio reported lost input (before our callback)
+        self.input_underflows = 0
+        self.analysis_errors = 0
+
+        # Feature stream: one row per hop, read lock-free by the lighting side
+        self.features = FeatureRing()
+        # Kick/snare/hat events from the same rows: onsets.subscribe(kind, handler)
+        self.onsets = OnsetClassifier()
+
+        self._build_plan()
+
+        # Time source for capture timestamps; offline replay swaps in the
+        # source's sample clock so results don't depend on wall time
+        self.clock = time.perf_counter
+        # ADC -> read() delay reported by PortAudio; taken off every capture time
+        self.input_latency = 0.0
+
+        # Tempo published from the onset stream (perf_counter clock)
+        self.tempo = TempoTracker()
+        self.bpm = 0.0
+        self.tempo_confidence = 0.0
+        self.next_beat_time = 0.0
+
+    def _build_plan(self):
+        self.plan = get_plan(self.rate, self.chunk)
+
+        # Ring buffer written twice (at pos and pos + chunk) so the latest
+        # window is always the contiguous view ring[pos + hop : pos + hop + chunk]
+        self.ring = np.zeros(2 * self.chunk, dtype=np.float32)
+        self.ring_pos = 0
+
+        # Preallocated work buffers: the hot loop writes into these with out=
+        self.windowed = np.zeros(self.chunk, dtype=np.float32)
+        self.spectrum = np.zeros(self.plan.num_bins, dtype=self.plan.spectrum_dtype)
+        self.abs_hop = np.zeros(self.hop, dtype=np.float32)
+        self.flux_diff = np.zeros(self.plan.num_bass, dtype=np.float64)
+        # Log-magnitudes of the last chunk // hop windows, used as a ring
+        self.log_mags = np.zeros((self.chunk // self.hop, self.plan.num_bass), dtype=np.float64)
+        self.log_mag_pos = 0
+        self.hops_seen = 0
+
+        self.band_power = np.zeros(self.plan.band_stop - self.plan.band_starts[0], dtype=np.float64)
+        self.band_starts = self.plan.band_starts - self.plan.band_starts[0]
+        # Band log-energies of the last chunk // hop windows (flux vs one window back)
+        self.band_hist = np.zeros((self.chunk // self.hop, len(self.band_starts)), dtype=np.float64)
+
+    def _push_hop(self, samples):
+        pos = self.ring_pos
+        self.ring[pos:pos + self.hop] = samples
+        self.ring[pos + self.chunk:pos + self.chunk + self.hop] = samples
+        self.ring_pos = (pos + self.hop) % self.chunk
+        start = pos + self.hop
+        return self.ring[start:start + self.chunk]
 
     def list_devices(self):
         devices = []
+        if not self.p:
+            return devices
         for i in range(self.p.get_device_count()):
             dev = self.p.get_device_info_by_index(i)
             max_inputs = dev.get("maxInputChannels", 0)
@@ -40,6 +197,8 @@ class AudioAnalyzer:
         return devices
 
     def find_device_index(self):
+        if not self.p:
+            return None
         for i in range(self.p.get_device_count()):
             dev = self.p.get_device_info_by_index(i)
             name = dev.get("name")
@@ -70,15 +229,21 @@ class AudioAnalyzer:
             self.stream = None
 
     def start_stream(self):
+        if not self.p:
+            print("Error starting audio stream: PyAudio is not installed")
+            return
         try:
+            self.capture.reset()
             self.stream = self.p.open(
                 format=pyaudio.paInt16,
                 channels=1,
                 rate=self.rate,
                 input=True,
                 input_device_index=self.device_index,
-                frames_per_buffer=self.chunk,
+                frames_per_buffer=self.hop,
+                stream_callback=self._audio_callback,
             )
+            self.input_latency = float(self.stream.get_input_latency())
             self.running = True
             if (
                 self.current_device_name == "Searching..."
@@ -93,65 +258,203 @@ class AudioAnalyzer:
         except Exception as e:
             print(f"Error starting audio stream: {e}")
 
-    def start(self, callback=None):
+    def start(self, callback=None, tempo_callback=None):
         self.on_beat_callback = callback
+        self.on_tempo_callback = tempo_callback
         if self.device_index is None:
             self.device_index = self.find_device_index()
         self.start_stream()
+        self.worker_alive = True
         self.thread = threading.Thread(target=self._analysis_loop, daemon=True)
         self.thread.start()
 
     def stop(self):
+        self.worker_alive = False
+        self.capture.ready.set()
         self.stop_stream()
-        self.p.terminate()
+        if self.p: self.p.terminate()
+
+    def replay(self, source, callback=None, tempo_callback=None):
+        """
+        Run the analysis loop over an offline source (see audio_sources.py)
+        in the calling thread, as fast as the CPU allows. Timestamps come
+        from the source's sample clock.
+        """
+        self.on_beat_callback = callback
+        self.on_tempo_callback = tempo_callback
+        self.stream = source
+        self.clock = source.clock
+        self.input_latency = 0.0
+        self.running = True
+        try:
+            self._replay_loop()
+        finally:
+            self.running = False
+            self.stream = None
+            self.clock = time.perf_counter
+
+    def _audio_callback(self, in_data, frame_count, time_info, status):
+        # PortAudio thread: copy and return, analysis happens on the worker
+        if status & PA_INPUT_OVERFLOW:
+            self.input_overflows += 1
+            INPUT_OVERFLOWS.inc()
+        if status & PA_INPUT_UNDERFLOW:
+            self.input_underflows += 1
+        # The block's last sample was captured input_latency ago
+        t_end = self.clock() - self.input_latency - 1.0 / self.rate
+        self.capture.write(np.frombuffer(in_data, dtype=np.int16), t_end)
+        return None, PA_CONTINUE
 
     def _analysis_loop(self):
+        ready = self.capture.ready
+        while self.worker_alive:
+            ready.clear()  # Before draining, so a block written meanwhile isn't slept through
+            while self.worker_alive and self._drain_hop():
+                pass
+            ready.wait(0.1)
+
+    def _drain_hop(self):
+        """Analyse the next buffered hop; False if a full hop hasn't arrived yet."""
+        start = self.capture.read(self.hop_buffer)
+        if start is None:
+            return False
+        self._process_hop(self.hop_buffer, self.capture.time_of(start, self.rate))
+        return True
+
+    def _replay_loop(self):
         while self.running:
-            if not self.stream:
-                time.sleep(0.1)
-                continue
             try:
-                t_capture = time.perf_counter()
-                data = self.stream.read(self.chunk, exception_on_overflow=False)
-                samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
-
-                self.current_volume = float(np.max(np.abs(samples)) / 32768.0)
+                data = self.stream.read(self.hop, exception_on_overflow=False)
+            except EOFError:
+                break  # Offline source exhausted
+            # The hop just returned ended input_latency ago; timestamp its first sample
+            t_capture = self.clock() - self.input_latency - self.hop / float(self.rate)
+            self._process_hop(np.frombuffer(data, dtype=np.int16), t_capture)
 
-                beat_detected, precise_time = self._detect_beat(samples, t_capture)
+    def _process_hop(self, samples, t_capture):
+        # samples = int16 hop (cast happens in the ring write), t_capture = its first sample
+        try:
+            t0 = time.perf_counter()
+            beat_detected, precise_time = self._detect_beat(samples, t_capture)
+            self.hop_process_time = time.perf_counter() - t0
+            HOP_SECONDS.observe(self.hop_process_time)
 
-                if beat_detected and self.on_beat_callback:
+            if beat_detected:
+                self._update_tempo(precise_time)
+                if self.on_beat_callback:
                     self.on_beat_callback(precise_time)
-            except Exception as e:
-                print(f"Audio Loop Error: {e}")
-                break
+        except Exception as e:
+            # A bad hop or a failing callback costs that hop, not the analysis
+            self.analysis_errors += 1
+            if self.analysis_errors == 1 or self.analysis_errors % 100 == 0:
+                print(f"Audio Loop Error ({self.analysis_errors}x): {e}")
+
+    def capture_stats(self):
+        stats = self.capture.stats()
+        stats.update({
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+            "analysis_errors": self.analysis_errors,
+            "hop_process_us": self.hop_process_time * 1e6,
+        })
+        return stats
+
+    def _update_tempo(self, onset_time):
+        self.bpm = self.tempo.add_onset(onset_time)
+        self.tempo_confidence = self.tempo.confidence
+        # The grid beat this onset fell on can lie a hair after it (phase
+        # smoothing); skip it so the prediction is the beat after this one
+        self.next_beat_time = self.tempo.next_beat(onset_time + 0.25 * self.tempo.period)
+        if self.bpm > 0 and self.on_tempo_callback:
+            self.on_tempo_callback(self.bpm, self.next_beat_time, self.tempo_confidence)
+
+    def beat_phase(self, now=None):
+        return self.tempo.phase(self.clock() if now is None else now)
+
+    def _publish_features(self, spectrum, newest, t_capture):
+        plan = self.plan
+        row = self.features.claim()
+        row[F_TIME] = t_capture
+        row[F_RMS] = np.sqrt(np.dot(newest, newest) / len(newest)) / 32768.0
+
+        power = self.band_power
+        np.abs(spectrum[plan.band_starts[0]:plan.band_stop], out=power)
+        np.multiply(power, power, out=power)
+        bands = row[F_BANDS]
+        np.add.reduceat(power, self.band_starts, out=bands)
+        np.log1p(bands, out=bands)
+        bands *= 1.0 / np.log(10.0)  # log10(1 + energy)
+
+        # Same ring position as the bass flux: the slot holds the window one chunk back
+        old = self.band_hist[self.log_mag_pos]
+        flux = row[F_FLUX]
+        if self.hops_seen >= len(self.band_hist):
+            np.subtract(bands, old, out=flux)
+            np.maximum(flux, 0.0, out=flux)
+        else:
+            flux[:] = 0.0
+        old[:] = bands
+        for col, idx in plan.onset_groups.items():
+            row[col] = flux[idx].sum()
+        self.features.publish()
+        self.onsets.process(row)
 
     def _detect_beat(self, samples, t_capture):
-        fft = np.fft.rfft(samples)
-        mag = np.abs(fft)
+        # samples = newest hop, t_capture = time of its first sample
+        plan = self.plan
+        frame = self._push_hop(samples)
+        newest = frame[-self.hop:]
+        np.abs(newest, out=self.abs_hop)
+        self.current_volume = float(self.abs_hop.max() / 32768.0)
+
+        np.multiply(frame, plan.window, out=self.windowed)
+        if RFFT_HAS_OUT:
+            spectrum = np.fft.rfft(self.windowed, out=self.spectrum)
+        else:
+            spectrum = np.fft.rfft(self.windowed)
 
-        freqs = np.fft.rfftfreq(len(samples), 1.0 / self.rate)
-        bass_idx = np.where((freqs >= 20) & (freqs <= 200))[0]
-        bass_mag = mag[bass_idx]
+        self._publish_features(spectrum, newest, t_capture)
 
-        log_mag = np.log10(bass_mag + 1.0)
+        # The oldest slot of the log-magnitude ring holds the window one full
+        # chunk back (not the previous, mostly overlapping hop), so per-hop
+        # noise doesn't swamp the onset. Read it before overwriting.
+        slot = self.log_mag_pos
+        log_mag = self.log_mags[slot]
+        diff = self.flux_diff
+        np.abs(spectrum[plan.bass_bins], out=diff)
+        np.add(diff, 1.0, out=diff)
+        np.log10(diff, out=diff)
         flux = 0.0
-        if self.prev_log_mag is not None and len(self.prev_log_mag) == len(log_mag):
-            flux = float(np.sum(np.maximum(0, log_mag - self.prev_log_mag)))
-        self.prev_log_mag = log_mag
+        if self.hops_seen >= len(self.log_mags):
+            np.subtract(diff, log_mag, out=log_mag)
+            np.maximum(log_mag, 0.0, out=log_mag)
+            flux = float(log_mag.sum())
+        log_mag[:] = diff
+        self.log_mag_pos = (slot + 1) % len(self.log_mags)
+        self.hops_seen += 1
 
         self.flux_history.append(flux)
 
-        if len(self.flux_history) > 20:
-            local_flux = list(self.flux_history)
-            threshold = np.median(local_flux) * 2.5 + 0.1
+        # Follow the peak of the current onset through its debounce window
+        self.onset_peak *= self.peak_decay
+        if t_capture - self.last_beat_time <= self.min_interval:
+            self.onset_peak = max(self.onset_peak, flux)
 
-            if flux > threshold:
-                now = time.perf_counter()
-                if now - self.last_beat_time > self.min_interval:
-                    peak_in_chunk = np.argmax(np.abs(samples))
-                    precise_t = t_capture + (peak_in_chunk / float(self.rate))
+        if len(self.flux_history) > self.warmup_hops:
+            threshold = max(self.flux_history.median() * 2.5 + 0.1,
+                            self.onset_peak * self.peak_fraction)
+            rising = not self.flux_above
+            self.flux_above = flux > threshold
 
-                    self.last_beat_time = now
+            if self.flux_above and rising:
+                peak_in_chunk = int(np.argmax(self.abs_hop))
+                precise_t = t_capture + (peak_in_chunk / float(self.rate))
+                # Debounce in capture time: a backlog drained in a burst
+                # must not squeeze beats closer together
+                if precise_t - self.last_beat_time > self.min_interval:
+                    self.last_beat_time = precise_t
+                    self.onset_peak = max(self.onset_peak, flux)
+                    self.onset_latency = self.clock() - precise_t
                     return True, precise_t
 
         return False, 0.0
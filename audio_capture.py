@@ -0,0 +1,117 @@
+"""
+Sample ring between the PortAudio callback and the analysis worker.
+
+PortAudio calls AudioAnalyzer's callback on its own thread with every
+captured block; the callback only copies the block into a CaptureRing and
+wakes the worker, so a slow FFT hop (or a GC pause) delays analysis
+instead of overflowing the input. The ring holds a few seconds of audio;
+samples are only dropped (and counted in `overruns`) if the worker falls
+that far behind.
+"""
+
+import threading
+from collections import deque
+import numpy as np
+import metrics
+
+DROPPED_SAMPLES = metrics.counter("vj_audio_dropped_samples_total",
+                                  "Captured samples dropped because the analysis fell behind")
+
+
+class CaptureRing:
+    """
+    Single-producer / single-consumer int16 sample ring.
+
+    `written` and `consumed` are running sample counts: the producer only
+    moves `written` after the samples are in place and the consumer only
+    moves `consumed`, so neither side takes a lock. They double as a
+    sample clock for timestamping hops.
+    """
+
+    def __init__(self, capacity=1 << 17):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.ready = threading.Event()
+        self.reset()
+
+    def reset(self):
+        """Forget buffered audio and counters (only while no stream is running)."""
+        self.written = 0
+        self.consumed = 0
+        self.overruns = 0     # Samples dropped because the ring was full
+        self.max_backlog = 0  # Most samples ever waiting for the worker
+        # (sample count, time) of the end of the newest block, see write()
+        self.anchor = (0, 0.0)
+        # (first index after an overrun, anchor of the samples before it),
+        # oldest first; pruned by time_of() as the consumer moves on
+        self.gaps = deque()
+
+    def available(self):
+        return self.written - self.consumed
+
+    def write(self, samples, t_end=0.0):
+        """
+        Producer: append a block, `t_end` = capture time of its last sample.
+
+        Returns the number of samples dropped (the oldest part of the block
+        that didn't fit).
+        """
+        n = len(samples)
+        free = self.capacity - (self.written - self.consumed)
+        dropped = max(0, n - free)
+        if dropped:
+            # Keep the newest part. It follows the buffered samples without
+            # a gap in the sample count, so the buffered ones keep the
+            # anchor of their own block; the new anchor below only times
+            # samples from here on
+            if not self.gaps or self.gaps[-1][0] != self.written:
+                self.gaps.append((self.written, self.anchor))
+            self.overruns += dropped
+            DROPPED_SAMPLES.inc(dropped)
+            samples = samples[dropped:]
+            n -= dropped
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        self.data[pos:pos + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.anchor = (self.written + n, t_end)
+        self.written += n
+        self.max_backlog = max(self.max_backlog, self.written - self.consumed)
+        self.ready.set()
+        return dropped
+
+    def read(self, out):
+        """
+        Consumer: fill `out` with the next len(out) samples.
+
+        Returns the sample index of out[0], or None (and leaves `out`
+        alone) if not enough samples are buffered yet.
+        """
+        n = len(out)
+        start = self.consumed
+        if self.written - start < n:
+            return None
+        pos = start % self.capacity
+        first = min(n, self.capacity - pos)
+        out[:first] = self.data[pos:pos + first]
+        out[first:] = self.data[:n - first]
+        self.consumed = start + n
+        return start
+
+    def time_of(self, index, rate):
+        """
+        Capture time of sample `index` (consumer side, indices not decreasing),
+        from the timestamp of the newest block before the next overrun gap.
+        """
+        gaps = self.gaps
+        while gaps and gaps[0][0] <= index:
+            gaps.popleft()
+        count, t_end = gaps[0][1] if gaps else self.anchor
+        return t_end - (count - 1 - index) / float(rate)
+
+    def stats(self):
+        return {
+            "overruns": self.overruns,
+            "backlog": self.available(),
+            "max_backlog": self.max_backlog,
+        }
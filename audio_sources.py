@@ -0,0 +1,69 @@
+"""
+Offline audio sources for AudioAnalyzer.replay().
+
+They mimic the parts of a PyAudio input stream the analysis loop uses
+(read(n) -> int16 bytes) and carry their own sample clock, so a track
+can be analysed faster than real time with reproducible timestamps.
+"""
+
+import wave
+import numpy as np
+
+
+class ArraySource:
+    """Mono int16 (or float -1..1) NumPy buffer served in hop-sized reads."""
+
+    def __init__(self, samples, rate=44100):
+        samples = np.asarray(samples)
+        if samples.dtype != np.int16:
+            samples = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        self.samples = samples
+        self.rate = rate
+        self.position = 0
+
+    def read(self, n, exception_on_overflow=False):
+        if self.position + n > len(self.samples):
+            raise EOFError("End of audio source")
+        block = self.samples[self.position:self.position + n]
+        self.position += n
+        return block.tobytes()
+
+    def clock(self):
+        """Time (s) of the end of the last block read, counted from sample 0."""
+        return self.position / float(self.rate)
+
+    @property
+    def duration(self):
+        return len(self.samples) / float(self.rate)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class WavSource(ArraySource):
+    """16-bit PCM WAV file, downmixed to mono."""
+
+    def __init__(self, path):
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            data = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        if channels > 1:
+            data = data.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        super().__init__(data, rate)
+
+
+def load_beat_annotations(path):
+    """Beat times in seconds, one per line (first column; '#' comments allowed)."""
+    beats = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if line:
+                beats.append(float(line.split()[0]))
+    return np.array(beats)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Command bus contention benchmark.
+
+Renders at --fps on one thread while producer threads post commands (preset
+switches and master/hue pairs) at --rate per second in total, and reader
+threads poll the controller's state snapshot. A master/hue pair is always
+posted as one batch with hue = master / 2, so a reader that ever sees
+another combination saw a torn state. Reports update() time without and
+with the command load, post() cost on the producers, post -> apply wait
+and torn reads.
+
+    python3 bench_commands.py
+    python3 bench_commands.py --rate 1000 --producers 8
+    python3 bench_commands.py --switch-interval 1e-5
+    python3 bench_commands.py --direct   # old way: set attributes from the threads
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+import numpy as np
+from lighting_controller import LightingController
+
+PRESETS = ["techno_red", "acid_green", "rainbow_flow", "code_red", "pastel_dreams"]
+
+
+class NullSender:
+    def set_frame(self, frame, start=1):
+        pass
+
+
+def render_loop(controller, fps, stop, times, stalls):
+    interval = 1.0 / fps
+    deadline = time.perf_counter()
+    while not stop.is_set():
+        deadline += interval
+        t0 = time.perf_counter(); c0 = time.thread_time()
+        controller.update(deadline)
+        wall = time.perf_counter() - t0
+        times.append(wall)
+        # Wall time not spent running this thread: waiting for the GIL, a lock or the CPU
+        stalls.append(max(0.0, wall - (time.thread_time() - c0)))
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def producer(controller, rate, stop, post_times, direct, seed):
+    rng = random.Random(seed)
+    interval = 1.0 / rate
+    next_t = time.perf_counter()
+    while not stop.is_set():
+        v = rng.random()
+        t0 = time.perf_counter()
+        if rng.random() < 0.1:
+            name = rng.choice(PRESETS)
+            if direct: controller.set_preset(name, 0)
+            else: controller.commands.post("set_preset", name, 0)
+        elif direct:
+            controller.set_param("master", v)
+            controller.set_param("hue", v / 2)
+        else:
+            controller.commands.post_batch([("set_param", "master", v), ("set_param", "hue", v / 2)])
+        post_times.append(time.perf_counter() - t0)
+        next_t += interval
+        delay = next_t - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def reader(controller, stop, counts, direct):
+    n = 0
+    while not stop.is_set():
+        if direct:
+            master, hue = controller.master, controller.hue
+        else:
+            state = controller.state
+            master, hue = state.master, state.hue
+        counts[0] += 1
+        if abs(hue - master / 2) > 1e-9:
+            counts[1] += 1
+        n += 1
+        if n % 50 == 0:
+            time.sleep(0.0002)
+
+
+def percentiles(values):
+    a = np.array(values) * 1e6
+    return np.percentile(a, 50), np.percentile(a, 99), a.max()
+
+
+def run(seconds, fps, rate, producers, readers, direct, switch_interval):
+    # A short GIL switch interval interleaves the threads far more often
+    sys.setswitchinterval(switch_interval)
+    controller = LightingController(NullSender())
+    controller.set_param("hue", controller.master / 2)
+    controller.update()
+    stop = threading.Event()
+
+    # Idle phase: render only
+    idle, idle_stalls = [], []
+    r = threading.Thread(target=render_loop, args=(controller, fps, stop, idle, idle_stalls))
+    r.start()
+    time.sleep(seconds)
+    stop.set(); r.join()
+
+    stop = threading.Event()
+    loaded, stalls, post_times = [], [], []
+    counts = [0, 0]  # reads, torn reads
+    threads = [threading.Thread(target=render_loop, args=(controller, fps, stop, loaded, stalls))]
+    threads += [threading.Thread(target=producer,
+                                 args=(controller, rate / producers, stop, post_times, direct, i))
+                for i in range(producers)]
+    threads += [threading.Thread(target=reader, args=(controller, stop, counts, direct))
+                for _ in range(readers)]
+    for t in threads: t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads: t.join()
+
+    print(f"Mode: {'direct attribute writes' if direct else 'command bus'}; "
+          f"{producers} producers at {rate:.0f} commands/s, {readers} readers, {fps:.0f} fps")
+    print("update() us           p50      p99      max")
+    print("  idle           {:8.1f} {:8.1f} {:8.1f}  ({} frames)".format(*percentiles(idle), len(idle)))
+    print("  under load     {:8.1f} {:8.1f} {:8.1f}  ({} frames)".format(*percentiles(loaded), len(loaded)))
+    print("stall us (wall - CPU time of update())")
+    print("  idle           {:8.1f} {:8.1f} {:8.1f}".format(*percentiles(idle_stalls)))
+    print("  under load     {:8.1f} {:8.1f} {:8.1f}".format(*percentiles(stalls)))
+    print("post() us        {:8.1f} {:8.1f} {:8.1f}  ({} posts)".format(*percentiles(post_times), len(post_times)))
+    if not direct:
+        s = controller.commands.stats()
+        print(f"Commands: {s['posted']} posted, {s['applied']} applied, {s['errors']} errors, "
+              f"max post -> apply wait {s['max_wait_ms']:.1f} ms")
+    print(f"State reads: {counts[0]}, torn: {counts[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Command bus contention benchmark")
+    parser.add_argument("--seconds", type=float, default=3.0, help="run time per phase")
+    parser.add_argument("--fps", type=float, default=40.0)
+    parser.add_argument("--rate", type=float, default=200.0, help="commands per second, all producers")
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--switch-interval", type=float, default=0.005,
+                        help="sys.setswitchinterval() for the run, s (try 1e-5 to stress tearing)")
+    parser.add_argument("--direct", action="store_true",
+                        help="mutate the controller from the producer threads (no bus)")
+    args = parser.parse_args()
+
+    print("Command Bus Benchmark")
+    print("=" * 40)
+    run(args.seconds, args.fps, args.rate, args.producers, args.readers, args.direct,
+        args.switch_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pixel-mapping render benchmark.
+
+Patches full universes of 170-pixel RGB bars (510 channels each) plus a
+16x8 matrix, then times LightingController renders of every pixel preset
+(and one group preset for comparison) through an OutputRouter frame.
+
+    python3 bench_pixels.py
+    python3 bench_pixels.py --universes 8 --frames 2000
+"""
+
+import argparse
+import time
+import numpy as np
+from fixtures import UNIVERSE_SIZE, Patch
+from lighting_controller import LightingController
+from network_outputs import OutputRouter
+
+PRESETS = ["pixel_chase", "pixel_rainbow", "pixel_noise", "spectrum", "techno_red"]
+
+
+def build_patch(universes):
+    patch = Patch(profiles={"bar170": {"pixels": [170, 1]}, "matrix": {"pixels": [16, 8]}},
+                  size=(universes + 1) * UNIVERSE_SIZE)
+    for u in range(universes):
+        patch.add(f"bar{u}", "bar170", 1, universe=u, x=0.0, y=u / universes, width=1.0)
+    patch.add("matrix", "matrix", 1, universe=universes, x=0.0, y=0.0, width=1.0, height=1.0)
+    return patch
+
+
+def run(universes, frames, fps):
+    patch = build_patch(universes)
+    router = OutputRouter(universes=universes + 1)
+    controller = LightingController(router, patch=patch)
+    controller.listeners.clear()
+    controller.on_spectrum(np.linspace(1.0, 0.1, 16))
+    cells = len(patch.cell_xy)
+
+    print(f"{universes + 1} universes, {cells} RGB cells, {frames} frames per preset")
+    print(f"\n{'preset':<16}{'frame us':>10}{'p95 us':>9}{'max fps':>10}{'budget %':>10}")
+    for preset in PRESETS:
+        controller.set_preset(preset, fade_beats=0)
+        times = np.empty(frames)
+        for i in range(frames):
+            t0 = time.perf_counter()
+            controller.update(100.0 + i / fps)
+            times[i] = time.perf_counter() - t0
+        mean = times.mean()
+        print(f"{preset:<16}{mean * 1e6:>10.1f}{np.percentile(times, 95) * 1e6:>9.1f}"
+              f"{1.0 / mean:>10.0f}{mean * fps * 100:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pixel-mapping render benchmark")
+    parser.add_argument("--universes", type=int, default=4, help="universes of pixel bars")
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--fps", type=float, default=40.0, help="target output rate")
+    args = parser.parse_args()
+
+    print("Pixel Map Benchmark")
+    print("=" * 40)
+    run(args.universes, args.frames, args.fps)
+
+
+if __name__ == "__main__":
+    main()
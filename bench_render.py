@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Headless render/output benchmark.
+
+Drives LightingController.update() through every preset with DMXSender
+in Virtual Mode recording to a frame file (no FTDI device needed), then
+reports per-tick CPU time, achieved output frame rate and inter-frame
+jitter from the recorded timestamps. The sender transmits on every output
+tick here, changed or not, so the timing is the pacing of the send loop
+(or the scheduler), not the delta logic; "changed" counts the frames
+delta sending would have sent.
+
+    python3 bench_render.py
+    python3 bench_render.py --seconds 5 --fixtures 60
+    python3 bench_render.py --scheduler     # drive through RenderScheduler
+    python3 bench_render.py --fade 4        # 4-beat crossfade into every preset
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from dmx_sender import DMXSender
+from effects import PRESETS  # Registry; lighting_controller adds the pixel presets
+from fixtures import Patch, default_patch
+from frame_recorder import read_frames
+from lighting_controller import LightingController
+from render_scheduler import RenderScheduler
+
+
+def build_patch(extra_fixtures):
+    if not extra_fixtures:
+        return default_patch()
+    # House rig plus a wall of 4ch panels, spread over as many universes as needed
+    universes = 1 + (extra_fixtures * 4 + 64) // 512
+    patch = Patch(size=universes * 512)
+    patch.add("panel1", "rgb_panel_4ch", 10, group="p1")
+    patch.add("panel2", "rgb_panel_4ch", 20, group="p2")
+    patch.add("party_bar", "party_bar_15ch", 30, group="pb")
+    for i in range(extra_fixtures):
+        # 4ch panels from channel 65 on, never straddling a universe boundary
+        universe, offset = divmod(64 + 4 * i, 512)
+        patch.add(f"wall{i}", "rgb_panel_4ch", offset + 1, group=("p1", "p2", "pb")[i % 3],
+                  universe=universe)
+    return patch
+
+
+class TimedController:
+    """Measures CPU and wall time of every update() the scheduler makes."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.cpu, self.wall = [], []
+
+    def update(self, frame_time=None):
+        c0 = time.thread_time(); w0 = time.perf_counter()
+        self.controller.update(frame_time)
+        self.cpu.append(time.thread_time() - c0)
+        self.wall.append(time.perf_counter() - w0)
+
+
+def run(seconds, tick_hz, extra_fixtures, use_scheduler=False, fade_beats=0.0):
+    path = os.path.join(tempfile.gettempdir(), "bench_render_frames.dmxrec")
+    out_hz = tick_hz if use_scheduler else 40.0
+    # Room for every frame of the run, so no preset's frames are overwritten
+    capacity = int(len(PRESETS) * seconds * out_hz * 1.25) + 64
+    sender = DMXSender(port="virtual", max_rate=out_hz, keepalive_rate=float("inf"),
+                       record_path=path, record_capacity=capacity)
+    sender.start(threaded=not use_scheduler)
+    controller = LightingController(sender, patch=build_patch(extra_fixtures))
+    controller.listeners.clear()
+    controller.fade_beats = fade_beats
+    timed = TimedController(controller)
+    scheduler = RenderScheduler(timed, sender, output_hz=tick_hz) if use_scheduler else None
+
+    windows = []
+    interval = 1.0 / tick_hz
+    for preset in PRESETS:
+        controller.last_transition = None
+        controller.set_preset(preset)
+        timed.cpu, timed.wall = [], []
+        t_start = time.perf_counter()
+        if scheduler:
+            scheduler.run(duration=seconds)
+        else:
+            deadline = t_start
+            while time.perf_counter() - t_start < seconds:
+                timed.update()
+                deadline += interval
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        fade = controller.last_transition.stats() if controller.last_transition else None
+        windows.append((preset, t_start, time.perf_counter(),
+                        np.array(timed.cpu), np.array(timed.wall), fade))
+
+    sender.stop()
+    if sender.recorder.count > capacity:
+        print(f"Warning: {sender.recorder.count - capacity} oldest frames were overwritten")
+    timestamps, frames = read_frames(path)
+    os.remove(path)
+
+    print(f"\n{'preset':<18}{'tick cpu us':>12}{'tick p95':>10}{'fps out':>9}"
+          f"{'jitter ms':>11}{'max gap ms':>12}{'frames':>8}{'changed':>9}"
+          + (f"{'fade us':>9}{'fade max':>10}{'src 1/n':>9}" if fade_beats else ""))
+    all_cpu = []
+    for preset, t0, t1, cpu, wall, fade in windows:
+        window = (timestamps >= t0) & (timestamps < t1)
+        ts = timestamps[window]
+        changed = int(np.any(np.diff(frames[window], axis=0) != 0, axis=1).sum())
+        gaps = np.diff(ts)
+        fps = 1.0 / gaps.mean() if len(gaps) else 0.0
+        jitter = gaps.std() * 1000 if len(gaps) else 0.0
+        max_gap = gaps.max() * 1000 if len(gaps) else 0.0
+        all_cpu.append(cpu)
+        print(f"{preset:<18}{cpu.mean() * 1e6:>12.1f}{np.percentile(cpu, 95) * 1e6:>10.1f}"
+              f"{fps:>9.1f}{jitter:>11.2f}{max_gap:>12.1f}{len(ts):>8}{changed:>9}"
+              + (f"{fade['cost_us']:>9.1f}{fade['max_cost_us']:>10.1f}{fade['source_every']:>9}"
+                 if fade else ""))
+
+    cpu = np.concatenate(all_cpu)
+    print(f"\nTicks: {len(cpu)} at {tick_hz:.0f} Hz, mean CPU {cpu.mean() * 1e6:.1f} us "
+          f"({cpu.mean() * tick_hz * 100:.2f}% of one core), "
+          f"max {cpu.max() * 1e6:.1f} us; recorded frames: {len(timestamps)} of capacity {capacity}, "
+          f"of {frames.shape[1] if len(frames) else 0} bytes")
+    if scheduler:
+        print(f"Scheduler: {scheduler.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless render/output benchmark")
+    parser.add_argument("--seconds", type=float, default=2.0, help="run time per preset")
+    parser.add_argument("--tick-hz", type=float, default=50.0, help="update() rate")
+    parser.add_argument("--fixtures", type=int, default=0, help="extra 4ch panels to patch")
+    parser.add_argument("--scheduler", action="store_true",
+                        help="render and send through RenderScheduler (tick-hz = output rate)")
+    parser.add_argument("--fade", type=float, default=0.0,
+                        help="crossfade length in beats when switching presets")
+    args = parser.parse_args()
+
+    print("Render Benchmark")
+    print("=" * 40)
+    run(args.seconds, args.tick_hz, args.fixtures, args.scheduler, args.fade)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Web control surface load test.
+
+Runs the real render/output loop (RenderScheduler + DMXSender in Virtual
+Mode) with the control server, first alone and then
+while --clients simulated phones use the dashboard from a separate process:
+each loads the page, keeps the event stream open, polls /get_status and
+posts a preset command now and then. Reports DMX frame timing from the
+send times for both phases (the moment every frame is handed to the
+DMX output, changed or not), plus request latencies seen by the clients.
+
+    python3 bench_web.py
+    python3 bench_web.py --clients 50 --poll-hz 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+import numpy as np
+import web_server
+from dmx_sender import DMXSender
+from lighting_controller import LightingController
+from render_scheduler import RenderScheduler
+
+PRESETS = ["techno_red", "acid_green", "rainbow_flow", "code_red", "pastel_dreams", "white_kick"]
+
+
+async def _request(reader, writer, method, path, body=b""):
+    head = (f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n"
+            f"Content-Type: application/json\r\n\r\n")
+    writer.write(head.encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _phone(port, seconds, poll_hz, command_every, seed, results):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    t0 = time.perf_counter()
+    await _request(reader, writer, "GET", "/")
+    results["page"].append(time.perf_counter() - t0)
+
+    # Event stream on its own connection, read until the end
+    ev_reader, ev_writer = await asyncio.open_connection("127.0.0.1", port)
+    ev_writer.write(b"GET /events HTTP/1.1\r\nHost: bench\r\n\r\n")
+
+    async def read_events():
+        while True:
+            line = await ev_reader.readline()
+            if not line:
+                return
+            if line.startswith(b"event:"):
+                results["events"] += 1
+    events = asyncio.ensure_future(read_events())
+
+    end = time.perf_counter() + seconds
+    next_command = time.perf_counter() + rng.uniform(0, command_every)
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        status = await _request(reader, writer, "GET", "/get_status")
+        results["status"].append(time.perf_counter() - t0)
+        results["errors"] += status != 200
+        if time.perf_counter() >= next_command:
+            body = json.dumps({"commands": [["set_preset", rng.choice(PRESETS)]]}).encode()
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, "POST", "/commands", body)
+            results["command"].append(time.perf_counter() - t0)
+            results["errors"] += status != 200
+            next_command += command_every
+        await asyncio.sleep(1.0 / poll_hz)
+    events.cancel()
+    writer.close()
+    ev_writer.close()
+
+
+def _phones_process(port, clients, seconds, poll_hz, command_every, out):
+    results = {"page": [], "status": [], "command": [], "events": 0, "errors": 0}
+
+    async def main():
+        await asyncio.gather(*[_phone(port, seconds, poll_hz, command_every, i, results)
+                               for i in range(clients)])
+    asyncio.run(main())
+    out.put(results)
+
+
+class TimedSender:
+    """DMXSender proxy recording when every send_due() actually runs."""
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.output_latency = sender.output_latency
+        self.times = []
+
+    def set_frame(self, frame, start=1):
+        self.sender.set_frame(frame, start)
+
+    def send_due(self, now=None):
+        self.times.append(time.perf_counter())
+        return self.sender.send_due(now)
+
+
+def frame_timing(times, t0, t1, interval):
+    ts = times[(times >= t0) & (times < t1)]
+    dev = np.abs(np.diff(ts) - interval) * 1e3
+    return len(ts), dev.mean(), np.percentile(dev, 99), dev.max()
+
+
+def run(seconds, clients, poll_hz, command_every, output_hz):
+    dmx = DMXSender(port="virtual")
+    dmx.start(threaded=False)
+    sender = TimedSender(dmx)
+    controller = LightingController(sender)
+    server = web_server.start_web_server(controller, host="127.0.0.1", port=0)
+    scheduler = RenderScheduler(controller, sender, output_hz=output_hz)
+
+    t_idle = time.perf_counter()
+    scheduler.run(duration=seconds)
+    idle_sched = scheduler.stats()
+
+    out = multiprocessing.Queue()
+    phones = multiprocessing.Process(target=_phones_process,
+                                     args=(server.port, clients, seconds, poll_hz, command_every, out))
+    phones.start()
+    time.sleep(0.5)  # Let the phones connect
+    t_load = time.perf_counter()
+    scheduler.missed_deadlines, scheduler.max_late = 0, 0.0
+    scheduler.run(duration=seconds - 0.5)
+    t_end = time.perf_counter()
+    load_sched = scheduler.stats()
+    results = out.get()
+    phones.join()
+
+    web_stats = server.stats()
+    web_server.stop_web_server()
+    dmx.stop()
+    times = np.array(sender.times)
+
+    interval = 1.0 / output_hz
+    print(f"{'phase':<22}{'frames':>8}{'|gap dev| ms':>14}{'p99 ms':>9}{'max ms':>9}{'missed':>8}{'max late ms':>13}")
+    for name, t0, t1, sched in [("render only", t_idle, t_load - 0.5, idle_sched),
+                                (f"{clients} phones", t_load, t_end, load_sched)]:
+        n, mean, p99, worst = frame_timing(times, t0, t1, interval)
+        print(f"{name:<22}{n:>8}{mean:>14.3f}{p99:>9.3f}{worst:>9.3f}{sched['missed_deadlines']:>8}"
+              f"{sched['max_late_ms']:>13.3f}")
+
+    print(f"\nPhones: {len(results['status'])} status polls, {len(results['command'])} commands, "
+          f"{results['events']} events received, {results['errors']} errors")
+    for name in ("page", "status", "command"):
+        lat = np.array(results[name]) * 1e3
+        if len(lat):
+            print(f"  {name:<8} p50 {np.percentile(lat, 50):6.2f} ms  p99 {np.percentile(lat, 99):6.2f} ms")
+    print(f"Server: {web_stats}")
+    print(f"Commands: {controller.commands.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web control surface load test")
+    parser.add_argument("--seconds", type=float, default=5.0, help="run time per phase")
+    parser.add_argument("--clients", type=int, default=20, help="simulated phones")
+    parser.add_argument("--poll-hz", type=float, default=4.0, help="status polls per phone per second")
+    parser.add_argument("--command-every", type=float, default=2.0, help="s between commands per phone")
+    parser.add_argument("--output-hz", type=float, default=40.0)
+    args = parser.parse_args()
+
+    print("Web Load Test")
+    print("=" * 40)
+    run(args.seconds, args.clients, args.poll_hz, args.command_every, args.output_hz)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Precomputed colour tables for the render path.
+
+    HUE_WHEEL    full-saturation hue wheel, HUE_STEPS x RGB (0-255 floats)
+    level_curve  brightness (0-1) -> light output for a given gamma
+    fine_curve   the same as 16-bit values for coarse/fine dimmer pairs
+    hue_rotation RGB matrix turning colours around the hue wheel
+
+Levels are looked up at LUT_SIZE (12-bit) resolution, so a fade through
+a gamma curve still has distinct steps at the dark end where 8-bit linear
+output visibly jumps.
+"""
+
+import numpy as np
+
+LUT_SIZE = 4096
+LUT_MAX = LUT_SIZE - 1
+HUE_STEPS = 1536  # 256 per sextant of the wheel
+
+
+def _hue_wheel(steps):
+    h = np.arange(steps, dtype=np.float64) / steps * 6
+    i = h.astype(np.intp) % 6
+    f = h - np.floor(h)
+    one, zero = np.ones(steps), np.zeros(steps)
+    # Sextant -> (r, g, b) with s = v = 1: p = 0, q = 1 - f, t = f
+    r = np.choose(i, [one, 1 - f, zero, zero, f, one])
+    g = np.choose(i, [f, one, one, 1 - f, zero, zero])
+    b = np.choose(i, [zero, zero, f, one, one, 1 - f])
+    return np.floor(np.stack([r, g, b], axis=1) * 255).astype(np.float32)
+
+
+HUE_WHEEL = _hue_wheel(HUE_STEPS)
+
+
+def hue_index(hue):
+    """Hue (0-1, any shape, wraps) -> row index into HUE_WHEEL."""
+    idx = (np.mod(hue, 1.0) * HUE_STEPS).astype(np.intp)
+    return np.minimum(idx, HUE_STEPS - 1)
+
+
+def hue_to_rgb(hue):
+    """Hue (0-1) -> RGB 0-255 at full saturation and value, from the wheel."""
+    return HUE_WHEEL[hue_index(hue)]
+
+
+def hue_rotation(hue):
+    """3x3 float32 matrix rotating RGB by `hue` turns about the grey axis (greys stay put)."""
+    a = 2 * np.pi * hue
+    c, k, r = np.cos(a), (1 - np.cos(a)) / 3.0, np.sin(a) / np.sqrt(3.0)
+    return np.array([[c + k, k - r, k + r],
+                     [k + r, c + k, k - r],
+                     [k - r, k + r, c + k]], dtype=np.float32)
+
+
+def level_curve(gamma=1.0, size=LUT_SIZE):
+    """Float32 table: level index (0..size-1) -> output 0-1 following x ** gamma."""
+    return (np.linspace(0.0, 1.0, size) ** gamma).astype(np.float32)
+
+
+def fine_curve(gamma=1.0, size=LUT_SIZE):
+    """Uint16 table: level index -> 16-bit dimmer value (coarse = >> 8, fine = & 0xFF)."""
+    return np.round(level_curve(gamma, size).astype(np.float64) * 65535).astype(np.uint16)
+
+
+def level_index(levels):
+    """Levels 0-1 -> LUT indices (clipped)."""
+    return (np.clip(levels, 0.0, 1.0) * LUT_MAX + 0.5).astype(np.intp)
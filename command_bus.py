@@ -0,0 +1,66 @@
+"""
+Commands from the web, MIDI or any other thread into the render loop.
+
+Producers post() command batches from their own threads (a deque append,
+no lock); LightingController drains the bus once per frame before it
+renders, so a batch is applied all at once between two frames and a
+render never sees half of it. Readers on other threads use the
+controller's `state` snapshot instead of its live attributes.
+
+    controller.commands.post("set_preset", "acid_green")
+    controller.commands.post_batch([("set_param", "master", 0.5),
+                                    ("set_param", "hue", 0.25)])
+"""
+
+import time
+from collections import deque
+
+
+class CommandBus:
+    def __init__(self, allowed, clock=time.perf_counter):
+        self.allowed = frozenset(allowed)
+        self.clock = clock
+        self.queue = deque()  # (post time, ((name, *args), ...))
+        self.posted = 0
+        self.applied = 0
+        self.errors = 0
+        self.wait = 0.0       # Post -> apply time of the last batch, s
+        self.max_wait = 0.0
+
+    def post(self, name, *args):
+        self.post_batch([(name,) + args])
+
+    def post_batch(self, commands):
+        """Queue commands to apply together on the next frame (any thread)."""
+        batch = tuple(tuple(c) for c in commands)
+        for command in batch:
+            if not command or command[0] not in self.allowed:
+                raise ValueError(f"Unknown command: {command[0] if command else None}")
+        self.queue.append((self.clock(), batch))
+        self.posted += len(batch)
+
+    def drain(self, ctx, now):
+        """Render thread: apply every queued batch, in posting order."""
+        while self.queue:
+            t, batch = self.queue.popleft()
+            for name, *args in batch:
+                try:
+                    getattr(ctx, name)(*args)
+                    self.applied += 1
+                except Exception as e:
+                    # Bad arguments or a failing handler: drop the command, keep the frame
+                    self.errors += 1
+                    if self.errors == 1 or self.errors % 100 == 0:
+                        print(f"Command Error ({name}, {self.errors}x): {e}")
+            self.wait = self.clock() - t
+            self.max_wait = max(self.max_wait, self.wait)
+
+    def stats(self):
+        return {
+            "posted": self.posted,
+            "applied": self.applied,
+            "errors": self.errors,
+            "queued": len(self.queue),
+            "wait_ms": self.wait * 1e3,
+            "max_wait_ms": self.max_wait * 1e3,
+        }
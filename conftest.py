@@ -0,0 +1,23 @@
+import pytest
+from lighting_controller import LightingController
+
+
+class FakeSender:
+    """DMXSender stand-in: keeps a copy of the last frame it was handed."""
+
+    def __init__(self, output_latency=0.0):
+        self.output_latency = output_latency
+        self.frame = None
+
+    def set_frame(self, frame, start=1):
+        self.frame = bytes(frame)
+
+
+@pytest.fixture
+def sender():
+    return FakeSender()
+
+
+@pytest.fixture
+def controller(sender):
+    return LightingController(sender)
@@ -9,7 +9,9 @@ import serial.tools.list_ports
 import threading
 import time
 import logging
-from typing import Optional, List, Union
+from contextlib import contextmanager
+from typing import Optional, List, Union, Sequence
+from metrics import DMX_FRAMES, SERIAL_WRITE_SECONDS
 
 
 class DMXController:
@@ -22,6 +24,7 @@ class DMXController:
     - 30-40Hz output rate in separate thread
     - 513 bytes: Start code (0x00) + 512 DMX channels
     - Serial config: 250,000 baud, 8N2
+    - Double-buffered universe: writers never block the output thread
     """
 
     # DMX Protocol Constants
@@ -46,17 +49,32 @@ class DMXController:
         self.logger = self._setup_logging()
 
         # DMX data buffer: [start_code, channel1, channel2, ..., channel512]
-        self.dmx_data = bytearray([0] * (self.DMX_UNIVERSE_SIZE + 1))
+        # Writers update this back buffer; the output thread copies it into a
+        # preallocated scratch buffer and swaps that with the front buffer it
+        # transmits. A sequence number (odd while a write is in progress)
+        # tells the output thread whether its copy is consistent.
+        self.dmx_data = bytearray(self.DMX_UNIVERSE_SIZE + 1)
+        self._front = bytearray(self.DMX_UNIVERSE_SIZE + 1)
+        self._scratch = bytearray(self.DMX_UNIVERSE_SIZE + 1)
+        # Channel views (no start code) for the monitor, made once and swapped with the buffers
+        self._front_view = memoryview(self._front)[1:]
+        self._scratch_view = memoryview(self._scratch)[1:]
+        self._seq = 0
+        self._front_seq = 0
+        self._zeros = bytes(self.DMX_UNIVERSE_SIZE)
 
         # Threading control
         self._running = False
         self._thread = None
-        self._data_lock = threading.Lock()
+        self._data_lock = threading.Lock()  # Serializes writers only
 
         # Serial connection
         self.serial_port = None
         self.port_name = None
 
+        # Optional universe_monitor.UniverseMonitor: sees every transmitted frame
+        self.monitor = None
+
         # Initialize port
         if port:
             self.port_name = port
@@ -236,6 +254,7 @@ class DMXController:
         if not self.serial_port or not self.serial_port.is_open:
             raise RuntimeError("Serial port not open")
 
+        t0 = time.perf_counter()
         # Step 1: Generate Break signal
         # Set break condition (line LOW)
         self.serial_port.break_condition = True
@@ -247,13 +266,42 @@ class DMXController:
         time.sleep(self.DMX_MAB_TIME)
 
         # Step 3: Send data frame
-        # Acquire lock and copy current DMX data
-        with self._data_lock:
-            data_to_send = bytes(self.dmx_data)
+        self._swap_buffers()
 
         # Send the complete frame
-        self.serial_port.write(data_to_send)
+        self.serial_port.write(self._front)
         self.serial_port.flush()  # Ensure data is transmitted
+        SERIAL_WRITE_SECONDS.observe(time.perf_counter() - t0)
+        DMX_FRAMES.inc()
+        if self.monitor:
+            self.monitor.publish(self._front_view)
+
+    def _swap_buffers(self):
+        """
+        Publish the latest consistent back buffer to the front buffer.
+
+        Lock-free and allocation-free: copies into the scratch buffer and
+        swaps references only if no writer touched the data meanwhile.
+        A torn copy is dropped and the previous front frame is resent.
+        """
+        seq = self._seq
+        if seq == self._front_seq or seq & 1:
+            return
+        self._scratch[:] = self.dmx_data
+        if self._seq == seq:
+            self._front, self._scratch = self._scratch, self._front
+            self._front_view, self._scratch_view = self._scratch_view, self._front_view
+            self._front_seq = seq
+
+    @contextmanager
+    def _writing(self):
+        """Writer section: serializes writers and marks the buffer as in flux."""
+        with self._data_lock:
+            self._seq += 1
+            try:
+                yield self.dmx_data
+            finally:
+                self._seq += 1
 
     def set_channel(self, channel: int, value: int):
         """
@@ -269,8 +317,8 @@ class DMXController:
         if not 0 <= value <= 255:
             raise ValueError("Value must be between 0 and 255")
 
-        with self._data_lock:
-            self.dmx_data[channel] = value  # channel index offset by start code
+        with self._writing() as data:
+            data[channel] = value  # channel index offset by start code
 
     def set_channels(self, channels: dict):
         """
@@ -279,19 +327,40 @@ class DMXController:
         Args:
             channels: Dictionary of {channel: value} pairs
         """
-        with self._data_lock:
+        # Validate before taking the writer lock
+        for channel, value in channels.items():
+            if not 1 <= channel <= self.DMX_UNIVERSE_SIZE:
+                raise ValueError(
+                    f"Channel {channel} must be between 1 and {self.DMX_UNIVERSE_SIZE}"
+                )
+
+            if not 0 <= value <= 255:
+                raise ValueError(
+                    f"Value {value} for channel {channel} must be between 0 and 255"
+                )
+
+        with self._writing() as data:
             for channel, value in channels.items():
-                if not 1 <= channel <= self.DMX_UNIVERSE_SIZE:
-                    raise ValueError(
-                        f"Channel {channel} must be between 1 and {self.DMX_UNIVERSE_SIZE}"
-                    )
+                data[channel] = value
+
+    def set_range(self, start_channel: int, values: Sequence[int]):
+        """
+        Set a contiguous block of channels in one slice assignment.
+
+        Args:
+            start_channel: First DMX channel (1-512)
+            values: Channel values (0-255); bytes, bytearray or list of ints
+        """
+        end = start_channel + len(values) - 1
+        if not 1 <= start_channel <= end <= self.DMX_UNIVERSE_SIZE:
+            raise ValueError(
+                f"Channels {start_channel}-{end} must be between 1 and {self.DMX_UNIVERSE_SIZE}"
+            )
 
-                if not 0 <= value <= 255:
-                    raise ValueError(
-                        f"Value {value} for channel {channel} must be between 0 and 255"
-                    )
+        block = bytes(values)  # Raises ValueError for values outside 0-255
 
-                self.dmx_data[channel] = value
+        with self._writing() as data:
+            data[start_channel:end + 1] = block
 
     def get_channel(self, channel: int) -> int:
         """
@@ -306,15 +375,13 @@ class DMXController:
         if not 1 <= channel <= self.DMX_UNIVERSE_SIZE:
             raise ValueError(f"Channel must be between 1 and {self.DMX_UNIVERSE_SIZE}")
 
-        with self._data_lock:
-            return self.dmx_data[channel]
+        return self.dmx_data[channel]
 
     def blackout(self):
         """Set all DMX channels to 0 (blackout)."""
-        with self._data_lock:
+        with self._writing() as data:
             # Keep start code at 0, set all channels to 0
-            for i in range(1, len(self.dmx_data)):
-                self.dmx_data[i] = 0
+            data[1:] = self._zeros
 
         self.logger.info("Blackout applied")
 
@@ -328,10 +395,11 @@ class DMXController:
         if not 0 <= value <= 255:
             raise ValueError("Value must be between 0 and 255")
 
-        with self._data_lock:
+        block = bytes([value]) * self.DMX_UNIVERSE_SIZE
+
+        with self._writing() as data:
             # Keep start code at 0, set all channels to value
-            for i in range(1, len(self.dmx_data)):
-                self.dmx_data[i] = value
+            data[1:] = block
 
         self.logger.info(f"All channels set to {value}")
 
@@ -1,19 +1,45 @@
 import serial
 import time
 import threading
+from frame_recorder import FrameRecorder
+from metrics import DMX_FRAMES, SERIAL_WRITE_SECONDS
 
 class DMXSender:
-    def __init__(self, port="/dev/cu.usbserial-BG03LVHM", baudrate=250000):
+    def __init__(self, port="/dev/cu.usbserial-BG03LVHM", baudrate=250000,
+                 max_rate=40.0, keepalive_rate=5.0, record_path=None, record_capacity=4096):
         self.port = port
         self.baudrate = baudrate
         # Optimization: Only send 64 channels to reduce load on wireless transmitter
         self.num_channels = 64 
-        self.dmx_data = bytearray([0] * self.num_channels)
+        # Preallocated wire frame (start code + channels); dmx_data is a view into it
+        self.frame = bytearray(1 + self.num_channels)
+        self.dmx_data = memoryview(self.frame)[1:]
+        # Send at max_rate while values change, keepalive_rate while static
+        # (keepalive_rate=inf: every send_due() call transmits)
+        self.max_rate = max_rate
+        self.keepalive_rate = keepalive_rate
+        self.dirty = True
+        self.frames_sent = 0
+        self.last_send = 0.0
         self.running = False
         self.thread = None
         self.ser = None
+        # Optional frame recording (memory-mapped ring file, see frame_recorder.py);
+        # in Virtual Mode this is the output instead of dropping frames
+        self.record_path = record_path
+        self.record_capacity = record_capacity  # Frames kept; the oldest are overwritten
+        self.recorder = None
+        # Optional universe_monitor.UniverseMonitor: sees every frame sent
+        self.monitor = None
 
-    def start(self):
+    @property
+    def output_latency(self):
+        # Break (one 0x00 byte at 9600 baud) + the frame at 250k, 11 bits per byte
+        # (8N2); fixtures latch the values once the whole frame is in
+        return 11.0 / 9600 + len(self.frame) * 11.0 / self.baudrate
+
+    def start(self, threaded=True):
+        # threaded=False: no send loop, an external scheduler calls send_due()
         try:
             self.ser = serial.Serial(
                 self.port, 
@@ -26,40 +52,108 @@ class DMXSender:
         except Exception as e:
             print(f"Warning: Entering Virtual Mode ({e})")
             self.ser = None
+
+        if self.record_path:
+            self.recorder = FrameRecorder(self.record_path, len(self.frame), self.record_capacity)
+            print(f"DMXSender recording frames to {self.record_path}")
         
-        self.running = True
-        self.thread = threading.Thread(target=self._send_loop, daemon=True)
-        self.thread.start()
+        if threaded:
+            self.running = True
+            self.thread = threading.Thread(target=self._send_loop, daemon=True)
+            self.thread.start()
 
     def stop(self):
         self.running = False
         if self.thread: self.thread.join()
         if self.ser: self.ser.close()
+        if self.recorder: self.recorder.close()
 
     def set_channel(self, channel, value):
         # Only set if channel is within our reduced range
         if 1 <= channel <= self.num_channels:
-            self.dmx_data[channel - 1] = max(0, min(255, int(value)))
+            value = max(0, min(255, int(value)))
+            if self.dmx_data[channel - 1] != value:
+                self.dmx_data[channel - 1] = value
+                self.dirty = True
+
+    def set_frame(self, frame, start=1):
+        # Bulk write of a contiguous block of channels starting at `start`.
+        # `frame` is any uint8 buffer (bytes, bytearray, NumPy uint8 array);
+        # anything beyond our reduced range is cut off.
+        offset = start - 1
+        n = min(len(frame), self.num_channels - offset)
+        if offset >= 0 and n > 0:
+            src = memoryview(frame)[:n]
+            if self.dmx_data[offset:offset + n] != src:
+                self.dmx_data[offset:offset + n] = src
+                self.dirty = True
+
+    @staticmethod
+    def check_universe(universe):
+        if universe != 0:
+            raise ValueError("DMXSender has a single universe: 0")
+
+    def send(self, universe, data):
+        # Output interface for network_outputs.OutputRouter: the dongle drives
+        # one universe, so route it with universe=0 (add_output(sender, local, 0))
+        self.check_universe(universe)
+        self.set_frame(data)
+
+    def _transmit(self):
+        if self.recorder:
+            self.recorder.write(self.frame)
+        if self.monitor:
+            self.monitor.publish(self.dmx_data)
+        if not self.ser:
+            self.frames_sent += 1
+            DMX_FRAMES.inc()
+            return
+
+        t0 = time.perf_counter()
+        # 1. DROP BAUD RATE FOR BREAK (Most stable on macOS for OpenDMX)
+        self.ser.baudrate = 9600
+        self.ser.write(b'\x00')
+
+        # 2. RESTORE DMX BAUD RATE
+        self.ser.baudrate = 250000
+
+        # 3. DATA (Reduced Universe, start code already in the buffer)
+        self.ser.write(self.frame)
+        SERIAL_WRITE_SECONDS.observe(time.perf_counter() - t0)
+        self.frames_sent += 1
+        DMX_FRAMES.inc()
+
+    def send_due(self, now=None):
+        """Send one frame if values changed or a keep-alive is due. Returns True if sent."""
+        if not (self.ser or self.recorder or self.monitor):
+            return False
+        now = time.perf_counter() if now is None else now
+        if self.dirty or now - self.last_send >= 1.0 / self.keepalive_rate:
+            # Clear first so writes during the transmit mark the next frame
+            self.dirty = False
+            self._transmit()
+            self.last_send = now
+            return True
+        return False
 
     def _send_loop(self):
+        # Deadline-based pacing: write time is absorbed instead of added to the period
+        interval = 1.0 / self.max_rate
+        deadline = time.perf_counter()
         while self.running:
             try:
-                if self.ser:
-                    # 1. DROP BAUD RATE FOR BREAK (Most stable on macOS for OpenDMX)
-                    self.ser.baudrate = 9600
-                    self.ser.write(b'\x00')
-                    
-                    # 2. RESTORE DMX BAUD RATE
-                    self.ser.baudrate = 250000
-                    
-                    # 3. DATA (Reduced Universe)
-                    self.ser.write(bytearray([0x00]) + self.dmx_data)
-                    
-                    # 4. STABILIZE FRAME (Approx 35Hz)
-                    # Reduced universe takes much less time to write
-                    time.sleep(0.025) 
+                if self.ser or self.recorder or self.monitor:
+                    self.send_due()
+
+                    deadline += interval
+                    delay = deadline - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        deadline = time.perf_counter()  # Fell behind, don't burst to catch up
                 else:
                     time.sleep(0.05)
             except Exception as e:
                 print(f"DMX Error: {e}")
                 time.sleep(1)
+                deadline = time.perf_counter()
@@ -0,0 +1,412 @@
+"""
+Effect engine and preset registry.
+
+An effect is an object that LightingController activates by name. When it
+becomes active it is compiled once into a `render(now, frame)` closure:
+everything that does not change per frame (patch, colour tables, rotation,
+blend functions) is bound then, so the hot path is one call with no mode
+checks, and switching presets is a dict lookup plus a function swap.
+
+    start(ctx)         reset state on activation (ctx = LightingController)
+    on_beat(ctx, t)    a beat lands at clock time t
+    on_onset(ctx, ev)  a kick/snare/hat onset (onset_classifier.OnsetEvent)
+    compile(ctx)       -> render(now, frame), frame = uint8 patch-sized array
+
+Free-running animations (breathing, drifts, hue cycles) take their phase
+from ctx.anim_time, which runs at ctx.speed; beat-locked ones use `now`.
+
+Effects can be layered with Layers() using the frame-space blend modes in
+BLENDS (replace, add, multiply, screen, max, min, subtract) and an opacity.
+"""
+
+import math
+import random
+import numpy as np
+from color_lut import HUE_WHEEL, hue_index
+from fixtures import GROUPS
+
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+WHITE = (255, 255, 255)
+
+
+def beat_period(ctx, beats, fallback):
+    return (60.0 / ctx.bpm) * beats if ctx.bpm > 0 else fallback
+
+
+class Effect:
+    rotation = 255   # Derby/motor channels while active
+    name = None      # Set by the registry
+    snap = False     # Cut in instantly instead of crossfading (see transitions.py)
+    finished = False # A transition that has handed over to its target
+
+    def start(self, ctx):
+        pass
+
+    def on_beat(self, ctx, t):
+        pass
+
+    def on_onset(self, ctx, event):
+        # Kick/snare/hat OnsetEvent from onset_classifier.py
+        pass
+
+    def compile(self, ctx):
+        raise NotImplementedError
+
+
+class GroupEffect(Effect):
+    """
+    Effect expressed as one colour and level per fixture group.
+
+    Subclasses fill self.colors / self.levels in update(); the compiled
+    render function writes them through the patch.
+    """
+
+    def __init__(self, colors=RED, rotation=255):
+        self.colors = np.zeros((len(GROUPS), 3), dtype=np.float32)
+        self.colors[:] = colors  # One RGB for all groups or one row per group
+        self.levels = np.ones(len(GROUPS), dtype=np.float32)
+        self.rotation = rotation
+
+    def update(self, ctx, now):
+        pass
+
+    def compile(self, ctx):
+        patch, colors, levels, rotation = ctx.patch, self.colors, self.levels, self.rotation
+        update = self.update
+
+        def render(now, frame):
+            update(ctx, now)
+            patch.render(frame, colors, levels, rotation)
+        return render
+
+
+class Static(GroupEffect):
+    """Constant look, no beat response."""
+
+
+class KickPulse(GroupEffect):
+    """Full brightness on the beat, exponential decay (tau seconds) in between."""
+
+    def __init__(self, colors=RED, tau=0.154, rotation=255):
+        super().__init__(colors, rotation)
+        self.tau = tau
+        self.beat_t = -math.inf
+
+    def start(self, ctx):
+        # Carry the running envelope over from the previous preset
+        self.beat_t = ctx.last_visual_beat_time or -math.inf
+
+    def on_beat(self, ctx, t):
+        self.beat_t = t
+
+    def level(self, ctx, now):
+        if not ctx.audio_reactive: return 1.0
+        return math.exp(-max(0.0, now - self.beat_t) / self.tau)
+
+    def update(self, ctx, now):
+        self.levels[:] = self.level(ctx, now)
+
+
+class AlternatingKick(KickPulse):
+    """Kick pulse that swaps between the p1 and p2 sides every beat."""
+
+    def __init__(self, colors=RED, tau=0.154, rotation=255):
+        super().__init__(colors, tau, rotation)
+        self.side = True
+
+    def on_beat(self, ctx, t):
+        super().on_beat(ctx, t)
+        self.side = not self.side
+
+    def update(self, ctx, now):
+        b = self.level(ctx, now)
+        self.levels[:] = (b if self.side else 0.0, 0.0 if self.side else b, b)
+
+
+class Toggle(GroupEffect):
+    """Two group colour sets swapped every beat, optionally flashing at flash_hz."""
+
+    def __init__(self, on, off, flash_hz=0.0, flash_low=0.2, rotation=255):
+        super().__init__(on, rotation)
+        self.looks = (np.array(on, dtype=np.float32), np.array(off, dtype=np.float32))
+        self.flash_hz = flash_hz
+        self.flash_low = flash_low
+        self.state = False  # The first beat shows `on`
+
+    def on_beat(self, ctx, t):
+        self.state = not self.state
+
+    def update(self, ctx, now):
+        self.colors[:] = self.looks[0] if self.state else self.looks[1]
+        if self.flash_hz:
+            self.levels[:] = 1.0 if int(now * self.flash_hz) % 2 == 0 else self.flash_low
+
+
+class SineBreath(GroupEffect):
+    """Slow sine on the level, one cycle per `beats` beats."""
+
+    def __init__(self, colors, beats=16, fallback=8.0, base=0.425, depth=0.375, rotation=0):
+        super().__init__(colors, rotation)
+        self.beats, self.fallback = beats, fallback
+        self.base, self.depth = base, depth
+
+    def update(self, ctx, now):
+        period = beat_period(ctx, self.beats, self.fallback)
+        self.levels[:] = self.base + self.depth * math.sin((ctx.anim_time * 2 * math.pi) / period)
+
+
+class Drift(GroupEffect):
+    """
+    Sine crossfade between two group colour sets (`low` at mix 0, `high`
+    at mix 1), optionally switching pb to `pb_peak` near the top.
+    """
+
+    def __init__(self, low, high, beats, fallback, level=0.8, pb_peak=None, rotation=255):
+        super().__init__(low, rotation)
+        self.low = np.array(low, dtype=np.float32)
+        self.span = np.array(high, dtype=np.float32) - self.low
+        self.beats, self.fallback = beats, fallback
+        self.pb_peak = pb_peak
+        self.levels[:] = level
+
+    def update(self, ctx, now):
+        period = beat_period(ctx, self.beats, self.fallback)
+        mix = 0.5 + 0.5 * math.sin((ctx.anim_time * 2 * math.pi) / period)
+        np.multiply(self.span, mix, out=self.colors)
+        self.colors += self.low
+        if self.pb_peak is not None and mix > 0.8:
+            self.colors[2] = self.pb_peak
+
+
+class Rainbow(GroupEffect):
+    """Solid full brightness, hue cycling every `period` s, groups offset by `spread`."""
+
+    def __init__(self, period=10.0, spread=0.1, rotation=255):
+        super().__init__(WHITE, rotation)
+        self.period = period
+        self.offsets = np.arange(len(GROUPS)) * spread
+
+    def update(self, ctx, now):
+        hue = (ctx.anim_time % self.period) / self.period
+        np.take(HUE_WHEEL, hue_index(hue + self.offsets), axis=0, out=self.colors)
+
+
+class Pastel(GroupEffect):
+    """Pastel pairs stepping every two beats over a soft pulse."""
+
+    PAIRS = (
+        ((255, 182, 193), (230, 230, 250)),
+        ((255, 203, 164), (135, 206, 235)),
+        ((230, 230, 250), (255, 182, 193)),
+        ((135, 206, 235), (255, 203, 164)),
+    )
+
+    def __init__(self, tau=0.30, rotation=255):
+        super().__init__(WHITE, rotation)
+        self.tau = tau
+        self.beat_t = -math.inf
+
+    def start(self, ctx):
+        self.beat_t = ctx.last_visual_beat_time or -math.inf
+
+    def on_beat(self, ctx, t):
+        self.beat_t = t
+
+    def update(self, ctx, now):
+        p1, p2 = self.PAIRS[(ctx.beat_count // 2) % 4]
+        self.colors[0] = p1; self.colors[1] = p2; self.colors[2] = p1
+        pulse = math.exp(-max(0.0, now - self.beat_t) / self.tau)
+        self.levels[:] = 0.4 + 0.6 * pulse
+
+
+class Glitch(GroupEffect):
+    """
+    Full-level flashes over a dim floor: random (probability `chance` per
+    frame) and on every `trigger` onset (hi-hats by default).
+    """
+
+    def __init__(self, colors=WHITE, chance=0.05, floor=0.05, trigger="hat", flash=0.03,
+                 rotation=255):
+        super().__init__(colors, rotation)
+        self.chance, self.floor = chance, floor
+        self.trigger, self.flash = trigger, flash
+        self.flash_until = -math.inf
+        self.triggered = False
+
+    def on_onset(self, ctx, event):
+        if event.kind == self.trigger:
+            self.triggered = True
+
+    def update(self, ctx, now):
+        if self.triggered:
+            # The onset is already past by the time it is drained: flash from this frame on
+            self.triggered = False
+            self.flash_until = now + self.flash
+        lit = now < self.flash_until or random.random() < self.chance
+        self.levels[:] = 1.0 if lit else self.floor
+
+
+class Strobe(Effect):
+    snap = True
+
+    def __init__(self, hz=15.0):
+        self.hz = hz
+
+    def compile(self, ctx):
+        patch, rate = ctx.patch, self.hz * 2
+
+        def render(now, frame):
+            patch.render_strobe(frame, 255 if int(now * rate) % 2 == 0 else 0)
+        return render
+
+
+class Blackout(Effect):
+    rotation = 0
+    snap = True
+
+    def compile(self, ctx):
+        def render(now, frame):
+            frame[:] = 0
+        return render
+
+
+# Frame-space blend modes: blend(base, layer, out), float32 arrays in 0..255
+def _replace(a, b, out): np.copyto(out, b)
+def _add(a, b, out): np.add(a, b, out=out)
+def _subtract(a, b, out): np.subtract(a, b, out=out)
+def _max(a, b, out): np.maximum(a, b, out=out)
+def _min(a, b, out): np.minimum(a, b, out=out)
+
+
+def _multiply(a, b, out):
+    np.multiply(a, b, out=out)
+    out *= 1.0 / 255
+
+
+def _screen(a, b, out):
+    # 255 - (255 - a)(255 - b) / 255 == a + b - ab / 255
+    np.multiply(a, b, out=out)
+    out *= -1.0 / 255
+    out += a
+    out += b
+
+
+BLENDS = {
+    "replace": _replace,
+    "add": _add,
+    "subtract": _subtract,
+    "multiply": _multiply,
+    "screen": _screen,
+    "max": _max,
+    "min": _min,
+}
+
+
+class Layers(Effect):
+    """
+    Stack of effects blended bottom to top.
+
+    Layers((base, "replace"), (top, "screen", 0.5), ...): each entry is an
+    effect, a blend mode from BLENDS and an optional opacity (0..1). The
+    rotation of the bottom layer is used.
+    """
+
+    def __init__(self, *layers):
+        self.layers = []
+        for layer in layers:
+            effect, blend = layer[0], layer[1]
+            opacity = float(layer[2]) if len(layer) > 2 else 1.0
+            if blend not in BLENDS:
+                raise ValueError(f"Unknown blend mode: {blend}")
+            self.layers.append((effect, blend, opacity))
+        if not self.layers:
+            raise ValueError("Layers needs at least one effect")
+        self.rotation = self.layers[0][0].rotation
+
+    def start(self, ctx):
+        for effect, _, _ in self.layers:
+            effect.start(ctx)
+
+    def on_beat(self, ctx, t):
+        for effect, _, _ in self.layers:
+            effect.on_beat(ctx, t)
+
+    def on_onset(self, ctx, event):
+        for effect, _, _ in self.layers:
+            effect.on_onset(ctx, event)
+
+    def compile(self, ctx):
+        size = ctx.patch.size
+        scratch = np.zeros(size, dtype=np.uint8)
+        base = np.zeros(size, dtype=np.float32)
+        layer = np.zeros(size, dtype=np.float32)
+        blended = np.zeros(size, dtype=np.float32)
+        first = self.layers[0][0].compile(ctx)
+        rest = [(effect.compile(ctx), BLENDS[blend], opacity)
+                for effect, blend, opacity in self.layers[1:]]
+
+        def render(now, frame):
+            first(now, scratch)
+            np.copyto(base, scratch)
+            for fn, blend, opacity in rest:
+                fn(now, scratch)
+                np.copyto(layer, scratch)
+                if opacity >= 1.0:
+                    blend(base, layer, base)
+                else:
+                    # base += (blend - base) * opacity
+                    blend(base, layer, blended)
+                    np.subtract(blended, base, out=blended)
+                    np.multiply(blended, opacity, out=blended)
+                    np.add(base, blended, out=base)
+            np.clip(base, 0, 255, out=base)
+            np.copyto(frame[:size], base, casting="unsafe")
+        return render
+
+
+# Preset registry: name -> factory returning a fresh effect
+PRESETS = {}
+ALIASES = {"vivid_pop": "rainbow_flow"}
+
+
+def register(name, factory):
+    PRESETS[name] = factory
+
+
+def create_effect(name):
+    name = ALIASES.get(name, name)
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset: {name}")
+    effect = PRESETS[name]()
+    effect.name = name
+    return effect
+
+
+register("techno_red", lambda: KickPulse(RED))
+register("acid_green", lambda: KickPulse(GREEN))
+register("berlin_white", lambda: KickPulse(WHITE))
+register("white_kick", lambda: KickPulse(WHITE, tau=0.08, rotation=0))
+register("barbie_party", lambda: KickPulse([(255, 20, 147), (255, 105, 180), (255, 0, 255)]))
+register("alternating_kick", lambda: AlternatingKick(RED))
+register("industrial_amber",
+         lambda: SineBreath([(255, 100, 0), (255, 50, 0), (255, 80, 0)]))
+register("minimal_void", lambda: Drift(
+    low=[(128, 0, 32), (45, 0, 105), (128, 0, 32)],
+    high=[(45, 27, 105), (128, 0, 32), (45, 27, 105)],
+    beats=32, fallback=15.0, rotation=0))
+register("factory_floor", lambda: Drift(
+    low=[(240, 248, 255), (70, 130, 180), (240, 248, 255)],
+    high=[(70, 130, 180), (240, 248, 255), (70, 130, 180)],
+    beats=8, fallback=4.0, pb_peak=(255, 128, 0)))
+register("dance_rg", lambda: Toggle(on=[RED, GREEN, RED], off=[GREEN, RED, GREEN], rotation=0))
+register("code_red", lambda: Toggle(on=[RED, BLUE, RED], off=[BLUE, RED, BLUE], flash_hz=15.0))
+register("rainbow_flow", Rainbow)
+register("pastel_dreams", Pastel)
+register("minimal_glitch", lambda: Glitch(WHITE))
+register("digital_decay", lambda: Layers(
+    (KickPulse((0, 160, 255), tau=0.6), "replace"),
+    (Glitch(WHITE, chance=0.03, floor=0.0), "screen", 0.8)))
+register("strobe_white", Strobe)
+register("blackout", Blackout)
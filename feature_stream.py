@@ -0,0 +1,138 @@
+"""
+Per-hop audio features, published lock-free from the audio thread.
+
+AudioAnalyzer writes one feature row per hop into a FeatureRing; the
+render thread (or anything else) reads the newest row or everything since
+its last read without taking a lock and without touching the FFT.
+
+Row layout (float64):
+    F_TIME    capture time of the hop (analyzer clock)
+    F_RMS     RMS of the hop, 0-1 of full scale
+    F_BANDS   NUM_BANDS log10(1 + energy), log-spaced 30 Hz - 16 kHz
+    F_FLUX    per-band positive log-energy change vs one window back
+    F_KICK / F_SNARE / F_HAT   onset strength (summed flux of their bands)
+"""
+
+import numpy as np
+
+NUM_BANDS = 16
+BAND_RANGE = (30.0, 16000.0)
+F_TIME = 0
+F_RMS = 1
+F_BANDS = slice(2, 2 + NUM_BANDS)
+F_FLUX = slice(2 + NUM_BANDS, 2 + 2 * NUM_BANDS)
+F_KICK = 2 + 2 * NUM_BANDS
+F_SNARE = F_KICK + 1
+F_HAT = F_KICK + 2
+FEATURE_WIDTH = F_HAT + 1
+
+# Band centre ranges (Hz) summed into each onset strength
+ONSET_RANGES = {
+    F_KICK: [(40, 130)],
+    F_SNARE: [(1000, 5000)],  # The noise "crack"; the body overlaps kick tails
+    F_HAT: [(6000, 16000)],
+}
+
+
+def band_layout(rate, chunk, bands=NUM_BANDS, fmin=BAND_RANGE[0], fmax=BAND_RANGE[1]):
+    """
+    rfft bin layout of the log-spaced bands.
+
+    Returns (starts, stop, centres): bin start index of every band (for
+    np.add.reduceat over bins [starts[0], stop)), end bin, centre freqs.
+    Every band gets at least one bin, so narrow low bands widen upwards.
+    """
+    bin_hz = rate / float(chunk)
+    edges_hz = np.geomspace(fmin, min(fmax, rate / 2.0), bands + 1)
+    edges = np.round(edges_hz / bin_hz).astype(np.intp)
+    edges[0] = max(1, edges[0])
+    for i in range(1, len(edges)):
+        edges[i] = max(edges[i], edges[i - 1] + 1)
+    centres = np.sqrt(edges_hz[:-1] * edges_hz[1:])
+    return edges[:-1], int(edges[-1]), centres
+
+
+def onset_groups(centres):
+    """Feature column -> band indices for ONSET_RANGES."""
+    groups = {}
+    for col, ranges in ONSET_RANGES.items():
+        sel = np.zeros(len(centres), dtype=bool)
+        for lo, hi in ranges:
+            sel |= (centres >= lo) & (centres <= hi)
+        groups[col] = np.flatnonzero(sel)
+    return groups
+
+
+class FeatureRing:
+    """
+    Single-producer ring of fixed-width float64 rows.
+
+    The producer fills claim() and then calls publish(), which only bumps
+    `seq` after the row is complete; readers copy rows and check that the
+    producer hasn't lapped them meanwhile. No locks on either side.
+    """
+
+    def __init__(self, capacity=256, width=FEATURE_WIDTH):
+        self.capacity = capacity
+        self.width = width
+        self.data = np.zeros((capacity, width), dtype=np.float64)
+        self.seq = 0  # Rows published so far
+
+    def claim(self):
+        """View of the next row to fill (producer only)."""
+        return self.data[self.seq % self.capacity]
+
+    def publish(self):
+        self.seq += 1
+
+    def latest(self, out=None):
+        """Copy of the newest row (into `out` if given), or None before the first."""
+        if out is None:
+            out = np.empty(self.width, dtype=np.float64)
+        while True:
+            seq = self.seq
+            if seq == 0:
+                return None
+            out[:] = self.data[(seq - 1) % self.capacity]
+            # Slot is only reused capacity rows later; retry if that happened
+            if self.seq - seq < self.capacity - 1:
+                return out
+
+    def read_since(self, cursor):
+        """
+        Rows published after `cursor` (a previous return value, start at 0).
+
+        Returns (rows, cursor); if the reader fell more than a ring behind,
+        only the newest capacity - 1 rows are returned.
+        """
+        while True:
+            seq = self.seq
+            start = max(cursor, seq - self.capacity + 1)
+            idx = np.arange(start, seq) % self.capacity
+            rows = self.data[idx]
+            if self.seq - start < self.capacity:
+                return rows, seq
+
+
+class BandMeter:
+    """
+    Auto-gained 0-1 band levels from F_BANDS rows, for display/effects.
+
+    Each band is scaled by its own slowly decaying peak, so quiet and loud
+    tracks (and bass-heavy vs. bright mixes) both use the full range.
+    """
+
+    def __init__(self, bands=NUM_BANDS, decay=0.998, floor=0.5):
+        self.peak = np.full(bands, floor, dtype=np.float32)
+        self.decay = decay
+        self.floor = floor
+        self.levels = np.zeros(bands, dtype=np.float32)
+
+    def update(self, bands):
+        self.peak *= self.decay
+        np.maximum(self.peak, bands, out=self.peak)
+        np.maximum(self.peak, self.floor, out=self.peak)
+        levels = np.divide(bands, self.peak).astype(np.float32)
+        np.clip(levels, 0.0, 1.0, out=levels)
+        self.levels = levels
+        return levels
@@ -0,0 +1,316 @@
+"""
+Fixture profiles and patch engine.
+
+A profile declares which channel offset carries which role (dimmer, RGB
+cells, white, rotation). A Patch places profiles at DMX addresses and
+compiles the whole rig into flat index arrays, so LightingController can
+render every fixture in one vectorized pass instead of per-fixture code.
+
+Brightness goes through per-fixture gamma tables (color_lut.py): fixtures
+with a dimmer channel get the level there (16-bit with a fine channel)
+and pure colour on RGB; fixtures without one get colour x curve(level).
+"""
+
+import json
+import numpy as np
+from color_lut import fine_curve, hue_rotation, level_curve, level_index
+
+UNIVERSE_SIZE = 512
+DEFAULT_GAMMA = 2.2  # Typical LED driver response; profiles can override
+
+# Colour groups the lighting logic renders; every patched fixture follows one.
+# p1/p2 are the two "sides" (alternating, R/G dance), pb is the party-bar look.
+GROUPS = ("p1", "p2", "pb")
+
+# Offsets are 0-based from the fixture's start address.
+#   channels     - footprint of the fixture
+#   dimmer       - master dimmer channels; carry the group level
+#   dimmer_fine  - 16-bit low bytes, one per dimmer channel (optional)
+#   gamma        - level -> output curve exponent (default DEFAULT_GAMMA)
+#   cells        - RGB(W) emitters; each gets the group colour
+#   rotation     - motor/derby channels, driven by the preset's rotation value
+#   strobe_cells - cells lit by the strobe look (default: all cells)
+#   grid         - [cols, rows] layout of the cells for pixel mapping
+#                  (default: one row, see pixel_profile() for bars/matrices)
+PROFILES = {
+    "rgb_panel_4ch": {
+        "channels": 4,
+        "dimmer": [0],
+        "cells": [{"red": 1, "green": 2, "blue": 3}],
+    },
+    "party_bar_15ch": {
+        "channels": 15,
+        "cells": [
+            {"red": 0, "green": 1, "blue": 2, "white": 3},
+            {"red": 5, "green": 6, "blue": 7, "white": 8},
+            {"red": 9, "green": 10, "blue": 11, "white": 12},
+        ],
+        "rotation": [4, 13],
+        "strobe_cells": [1],
+    },
+    "rgb_3ch": {
+        "channels": 3,
+        "cells": [{"red": 0, "green": 1, "blue": 2}],
+    },
+    "rgb_par_16bit": {
+        "channels": 5,
+        "dimmer": [0],
+        "dimmer_fine": [1],
+        "cells": [{"red": 2, "green": 3, "blue": 4}],
+    },
+}
+
+
+def pixel_profile(cols, rows=1, gamma=DEFAULT_GAMMA):
+    """Profile of an RGB pixel bar (rows=1) or matrix: 3 channels per pixel, row-major."""
+    cells = [{"red": 3 * i, "green": 3 * i + 1, "blue": 3 * i + 2} for i in range(cols * rows)]
+    return {"channels": 3 * cols * rows, "cells": cells, "grid": [cols, rows], "gamma": gamma}
+
+
+class Patch:
+    """A list of patched fixtures, compiled to index arrays for rendering."""
+
+    def __init__(self, profiles=None, size=UNIVERSE_SIZE):
+        # size: total channels, a multiple of 512 for multi-universe rigs
+        self.profiles = dict(PROFILES)
+        for name, prof in (profiles or {}).items():
+            # {"pixels": [cols, rows]} is shorthand for pixel_profile()
+            if "pixels" in prof:
+                prof = pixel_profile(*prof["pixels"], gamma=prof.get("gamma", DEFAULT_GAMMA))
+            self.profiles[name] = prof
+        self.size = size
+        self.fixtures = []
+        self._compile()
+
+    def add(self, name, profile, address, group="pb", universe=0,
+            x=None, y=0.0, width=None, height=None):
+        # x/y/width/height place the fixture's cells on the 0-1 pixel-map
+        # plane; without x, fixtures line up left to right in patch order
+        if profile not in self.profiles:
+            raise ValueError(f"Unknown fixture profile: {profile}")
+        if group not in GROUPS:
+            raise ValueError(f"Group must be one of {GROUPS}")
+        if not 1 <= int(address) <= UNIVERSE_SIZE:
+            raise ValueError(f"Address must be between 1 and {UNIVERSE_SIZE}")
+        if not 0 <= int(universe) < self.size // UNIVERSE_SIZE:
+            raise ValueError(f"Universe must be between 0 and {self.size // UNIVERSE_SIZE - 1}")
+        # Addresses are flat across universes: universe 1, channel 1 -> 513
+        address = int(universe) * UNIVERSE_SIZE + int(address)
+        self._check_footprint(name, profile, address)
+        self.fixtures.append(
+            {"name": name, "profile": profile, "address": address, "group": group,
+             "x": x, "y": y, "width": width, "height": height}
+        )
+        self._compile()
+
+    def set_address(self, name, address):
+        # `address` is flat (universe * 512 + channel)
+        matches = [fx for fx in self.fixtures if fx["name"] == name]
+        if not matches:
+            raise ValueError(f"Unknown fixture: {name}")
+        if not 1 <= int(address) <= self.size:
+            raise ValueError(f"Address must be between 1 and {self.size}")
+        for fx in matches:
+            self._check_footprint(name, fx["profile"], int(address))
+        for fx in matches:
+            fx["address"] = int(address)
+        self._compile()
+
+    def _check_footprint(self, name, profile, address):
+        # A fixture can't straddle two universes (they go out as separate packets)
+        universe, offset = divmod(address - 1, UNIVERSE_SIZE)
+        channels = self.profiles[profile]["channels"]
+        if offset + channels > UNIVERSE_SIZE:
+            raise ValueError(f"{name} ({channels} channels at {offset + 1}) runs past "
+                             f"the end of universe {universe}")
+
+    def _compile(self):
+        rgb, cell_group, cell_curve, strobe = [], [], [], []
+        white, white_strobe = [], []
+        dimmer, dimmer_group, dimmer_curve, fine = [], [], [], []
+        rotation, span, cell_xy, fixture_curve = [], [], [], []
+        # Curve 0 is unity (cells behind a dimmer); one more per distinct gamma
+        gammas = [None]
+
+        n_auto = sum(1 for fx in self.fixtures if fx.get("x") is None)
+        slot = 0
+        for fx in self.fixtures:
+            prof = self.profiles[fx["profile"]]
+            base = fx["address"] - 1
+            g = GROUPS.index(fx["group"])
+            cells = prof.get("cells", [])
+            strobe_cells = prof.get("strobe_cells", range(len(cells)))
+            gamma = float(prof.get("gamma", DEFAULT_GAMMA))
+            if gamma not in gammas:
+                gammas.append(gamma)
+            curve = gammas.index(gamma)
+
+            span.extend(base + o for o in range(prof["channels"]))
+            dims = prof.get("dimmer", [])
+            fines = prof.get("dimmer_fine", [])
+            for di, o in enumerate(dims):
+                dimmer.append(base + o)
+                dimmer_group.append(g)
+                dimmer_curve.append(curve)
+                fine.append(base + fines[di] if di < len(fines) else -1)
+            rotation.extend(base + o for o in prof.get("rotation", []))
+            cell_xy.extend(self._cell_positions(fx, prof, len(cells), slot, n_auto))
+            if fx.get("x") is None:
+                slot += 1
+            for ci, cell in enumerate(cells):
+                lit = ci in strobe_cells
+                rgb.append([base + cell["red"], base + cell["green"], base + cell["blue"]])
+                cell_group.append(g)
+                cell_curve.append(0 if dims else curve)
+                fixture_curve.append(curve)
+                strobe.append(lit)
+                if "white" in cell:
+                    white.append(base + cell["white"])
+                    white_strobe.append(lit)
+
+        def idx(values):
+            return np.array(values, dtype=np.intp).reshape(-1)
+
+        # Channels patched past the end of the universe are dropped
+        rgb = np.array(rgb, dtype=np.intp).reshape(-1, 3)
+        keep = (rgb < self.size).all(axis=1)
+        self.rgb_idx = rgb[keep]
+        self.cell_group = idx(cell_group)[keep]
+        self.cell_curve = idx(cell_curve)[keep]
+        self.fixture_curve = idx(fixture_curve)[keep]
+        self.cell_xy = np.array(cell_xy, dtype=np.float32).reshape(-1, 2)[keep]
+        strobe = np.array(strobe, dtype=bool)[keep]
+
+        white = idx(white)
+        white_strobe = np.array(white_strobe, dtype=bool)
+        keep_w = white < self.size
+        self.white_idx = white[keep_w]
+
+        dimmer, fine = idx(dimmer), idx(fine)
+        keep_d = dimmer < self.size
+        self.dimmer_idx = dimmer[keep_d]
+        self.dimmer_group = idx(dimmer_group)[keep_d]
+        self.dimmer_curve = idx(dimmer_curve)[keep_d]
+        fine = fine[keep_d]
+        has_fine = (fine >= 0) & (fine < self.size)
+        self.fine_idx = fine[has_fine]
+        self.fine_sel = np.flatnonzero(has_fine)
+
+        # Level tables, indexed [curve, level_index(level)]
+        self.level_luts = np.stack([level_curve(1.0 if gm is None else gm) for gm in gammas])
+        self.cell_luts = self.level_luts.copy()
+        self.cell_luts[0] = 1.0
+        self.dimmer_luts = np.stack([fine_curve(1.0 if gm is None else gm) for gm in gammas])
+        self.rotation_idx = self._clip(idx(rotation))
+        self.span_idx = self._clip(idx(span))
+        self.strobe_idx = np.concatenate(
+            [self.rgb_idx[strobe].reshape(-1), white[keep_w & white_strobe]]
+        )
+
+    @staticmethod
+    def _cell_positions(fx, prof, count, slot, n_auto):
+        cols, rows = prof.get("grid", [count, 1])
+        if fx.get("x") is None:
+            x, width = slot / n_auto, 1.0 / n_auto
+        else:
+            x, width = fx["x"], fx["width"] or 0.0
+        y = fx.get("y") or 0.0
+        height = fx.get("height")
+        if height is None:
+            height = 1.0 if rows > 1 else 0.0
+        return [(x + (i % cols + 0.5) / cols * width, y + (i // cols + 0.5) / rows * height)
+                for i in range(count)]
+
+    def _clip(self, indices):
+        return indices[indices < self.size]
+
+    def render(self, frame, colors, levels, rotation=0):
+        """
+        Write all fixtures into `frame`.
+
+        Args:
+            frame: uint8 array of at least `size` channels (index 0 = channel 1)
+            colors: (len(GROUPS), 3) RGB per group, 0-255
+            levels: (len(GROUPS),) brightness per group, 0.0-1.0
+            rotation: value for all rotation channels
+        """
+        li = level_index(levels)
+        # (curves, groups, 3) colour table through each curve, then one gather per cell
+        table = np.asarray(colors, dtype=np.float32)[None] * self.cell_luts[:, li][:, :, None]
+        np.clip(table, 0, 255, out=table)
+        frame[self.rgb_idx] = table.astype(np.uint8)[self.cell_curve, self.cell_group]
+        frame[self.white_idx] = 0
+        dim = self.dimmer_luts[:, li][self.dimmer_curve, self.dimmer_group]
+        frame[self.dimmer_idx] = dim >> 8
+        frame[self.fine_idx] = dim[self.fine_sel] & 0xFF
+        frame[self.rotation_idx] = rotation
+
+    def render_cells(self, frame, colors, levels, rotation=0):
+        """
+        Write per-cell colours (pixel mapping) into `frame`.
+
+        Args:
+            colors: (cells, 3) RGB 0-255, in cell order (see cell_xy)
+            levels: (cells,) brightness 0.0-1.0, through each fixture's curve
+        Dimmers are held at full; the level is folded into the cell colour.
+        """
+        gain = self.level_luts[self.fixture_curve, level_index(levels)]
+        rgb = np.multiply(colors, gain[:, None])
+        np.clip(rgb, 0, 255, out=rgb)
+        frame[self.rgb_idx] = rgb.astype(np.uint8)
+        frame[self.white_idx] = 0
+        frame[self.dimmer_idx] = 255
+        frame[self.fine_idx] = 255
+        frame[self.rotation_idx] = rotation
+
+    def apply_output(self, frame, out, master=1.0, hue=0.0):
+        """
+        Copy `frame` into `out` with a master level (0-1) and hue shift (turns).
+
+        RGB cells are rotated and scaled, white cells scaled; dimmers and
+        rotation pass through, so the effect's own levels keep their curve.
+        """
+        out[:] = frame
+        rgb = frame[self.rgb_idx].astype(np.float32) @ (hue_rotation(hue) * master).T
+        np.clip(rgb + 0.5, 0, 255, out=rgb)
+        out[self.rgb_idx] = rgb.astype(np.uint8)
+        out[self.white_idx] = (frame[self.white_idx] * master + 0.5).astype(np.uint8)
+
+    def render_strobe(self, frame, level):
+        """Blank every fixture, then drive the strobe cells (RGB+W) to `level` (0-255)."""
+        frame[self.span_idx] = 0
+        frame[self.dimmer_idx] = 255
+        frame[self.fine_idx] = 255
+        frame[self.strobe_idx] = level
+
+
+def default_patch():
+    """The house rig: two LED panels and a 15ch party bar."""
+    patch = Patch()
+    patch.add("panel1", "rgb_panel_4ch", 10, group="p1")
+    patch.add("panel2", "rgb_panel_4ch", 20, group="p2")
+    patch.add("party_bar", "party_bar_15ch", 30, group="pb")
+    return patch
+
+
+def load_patch(path):
+    """
+    Load a patch from JSON:
+
+        {"universes": 1,
+         "profiles": {...optional extra profiles...,
+                      "bar170": {"pixels": [170, 1]}},
+         "fixtures": [{"name": "panel1", "profile": "rgb_panel_4ch",
+                       "address": 10, "group": "p1", "universe": 0}, ...]}
+
+    Fixtures can carry "x", "y", "width", "height" (0-1 plane) for pixel mapping.
+    """
+    with open(path) as f:
+        config = json.load(f)
+    patch = Patch(profiles=config.get("profiles"),
+                  size=int(config.get("universes", 1)) * UNIVERSE_SIZE)
+    for fx in config.get("fixtures", []):
+        patch.add(fx["name"], fx["profile"], fx["address"],
+                  fx.get("group", "pb"), fx.get("universe", 0),
+                  fx.get("x"), fx.get("y", 0.0), fx.get("width"), fx.get("height"))
+    return patch
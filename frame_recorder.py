@@ -0,0 +1,71 @@
+"""
+Memory-mapped ring file of timestamped DMX frames.
+
+Used as the virtual output of DMXSender (no FTDI device) and by the
+benchmarks to check what was actually sent and when.
+
+File layout:
+    header  32 bytes: magic, frame_size (u32), capacity (u32), count (u64)
+    records capacity x (timestamp f64 + frame_size bytes)
+"""
+
+import mmap
+import struct
+import time
+import numpy as np
+
+MAGIC = b"DMXREC1\x00"
+HEADER = struct.Struct("<8sIIQ8x")
+
+
+class FrameRecorder:
+    def __init__(self, path, frame_size, capacity=4096):
+        self.path = path
+        self.frame_size = frame_size
+        self.capacity = capacity
+        self.record_size = 8 + frame_size
+        self.count = 0
+
+        size = HEADER.size + capacity * self.record_size
+        self.file = open(path, "w+b")
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        HEADER.pack_into(self.map, 0, MAGIC, frame_size, capacity, 0)
+
+    def write(self, frame, timestamp=None):
+        """Append one frame (bytes-like, frame_size long); overwrites the oldest when full."""
+        offset = HEADER.size + (self.count % self.capacity) * self.record_size
+        struct.pack_into("<d", self.map, offset,
+                         time.perf_counter() if timestamp is None else timestamp)
+        self.map[offset + 8:offset + self.record_size] = frame
+        self.count += 1
+        # Count last, so a reader never sees a half-written newest record
+        struct.pack_into("<Q", self.map, 16, self.count)
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+def read_frames(path):
+    """
+    Read a recording in chronological order.
+
+    Returns:
+        (timestamps, frames): float64 array (N,), uint8 array (N, frame_size)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, frame_size, capacity, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a DMX frame recording")
+
+    dtype = np.dtype([("t", "<f8"), ("frame", "u1", (frame_size,))])
+    records = np.frombuffer(data, dtype=dtype, count=capacity, offset=HEADER.size)
+    n = min(count, capacity)
+    if count > capacity:
+        start = count % capacity
+        records = np.concatenate([records[start:], records[:start]])
+    records = records[:n]
+    return records["t"].copy(), records["frame"].copy()
@@ -1,215 +1,264 @@
 import time
-import random
-import math
-from collections import deque
+import heapq
+from collections import deque, namedtuple
+import numpy as np
+import metrics
+from command_bus import CommandBus
+from effects import create_effect
+from transitions import Crossfade, Hold
+import pixel_map  # noqa: F401 - registers the pixel-mapped presets
+from feature_stream import F_BANDS, FEATURE_WIDTH, BandMeter
+from fixtures import default_patch
+
+# Light time of the frame showing a beat minus the beat's time; negative = shown early
+BEAT_LATENCY = metrics.histogram("vj_beat_to_dmx_seconds",
+                                 "Beat (detected or predicted) to the light time of the frame showing it",
+                                 (-0.025, -0.01, -0.005, 0.0, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2))
+
+# What other threads may read (LightingController.state), replaced whole once per frame
+ControllerState = namedtuple(
+    "ControllerState",
+    "mode bpm beat_count last_beat_time master hue speed audio_reactive frame_time")
 
 class LightingController:
-    def __init__(self, sender):
+    PARAMS = ("master", "hue", "speed")
+    # Methods other threads may call through the command bus
+    COMMANDS = ("set_preset", "set_param", "set_audio_reactive", "set_address")
+
+    def __init__(self, sender, patch=None):
         self.sender = sender
         self.mode = "techno_red"
         self.audio_reactive = True
         
-        self.panel1_addr = 10
-        self.panel2_addr = 20
-        self.party_bar_addr = 30
+        # Fixture layout lives in the patch (see fixtures.py)
+        self.patch = patch or default_patch()
+
+        # Whole output frame (index 0 = DMX channel 1), handed to the sender once per tick
+        self.frame = np.zeros(self.patch.size, dtype=np.uint8)
+
+        # Live controls (MIDI faders etc., see set_param): applied to a copy
+        # of the rendered frame, so effects and held fade frames never see them
+        self.master = 1.0  # Output level 0-1
+        self.hue = 0.0     # Hue shift, turns
+        self.speed = 1.0   # Rate of anim_time, the clock free-running animations follow
+        self.output = np.zeros(self.patch.size, dtype=np.uint8)
+        self.anim_time = 0.0
+        self.anim_last = None
+        # Per-frame input sources (e.g. MIDIController): drain(ctx, now) is
+        # called from the render thread before the effect renders
+        self.inputs = []
+        # Commands from the web/other threads: commands.post(name, *args)
+        self.commands = CommandBus(self.COMMANDS)
+        self.inputs.append(self.commands)
         
+        # One monotonic clock for everything beat related: AudioAnalyzer stamps
+        # onsets with perf_counter and RenderScheduler's deadlines use it too
+        self.clock = time.perf_counter
+        # Send deadline -> light on the fixture (serial break + frame on the wire)
+        self.output_latency = getattr(sender, "output_latency", 0.0)
         self.last_beat_time = 0.0
         self.last_visual_beat_time = 0.0
-        self.bpm = 124.0
-        self.brightness = 0.0
+        self.last_frame_time = 0.0
+        self.bpm = 124.0  # Until the audio tempo tracker locks
+        self.min_tempo_confidence = 0.5
         self.beat_count = 0
         
-        self.last_debounce_time = 0.0
-        self.dance_toggle = False
-        
-        self.p1_c = [255, 0, 0]
-        self.p2_c = [255, 0, 0]
-        self.pb_c = [255, 0, 0]
-        self.derby_rotation = 0
-        
-        self.sine_mode = False
-        self.color_fade_mode = False
-        self.strobe_active = False
-        self.glitch_mode = False
-        self.alternating = False
-        self.alt_state = True
-        self.void_mode = False
-        self.factory_mode = False
-        self.pastel_mode = False
-        self.police_mode = False
-
-    def set_preset(self, preset_name):
+        # Beat times (detected or predicted) from the audio thread; the render
+        # thread drains them into pending_beats and fires each one on the
+        # frame whose light time is closest to it
+        self.beat_inbox = deque()
+        self.pending_beats = []
+        self.beat_debounce = 0.2
+        # Kick/snare/hat OnsetEvents from the audio thread, handed to the
+        # active effect on the next frame (no debounce: each kind has its own)
+        self.onset_inbox = deque()
+        self.last_onsets = {}
+        # Band levels 0-1 (bass first) for spectrum effects: pushed with
+        # on_spectrum() or pulled each frame from an AudioAnalyzer's feature
+        # ring (set feature_source = analyzer.features)
+        self.spectrum = np.zeros(16, dtype=np.float32)
+        self.feature_source = None
+        self.features = np.zeros(FEATURE_WIDTH, dtype=np.float64)
+        self.band_meter = BandMeter()
+
+        # Active preset: (effect, compiled render function), see effects.py
+        self.active = None
+        self._activate(self.mode)
+        # Preset changes crossfade over fade_beats (fade_seconds without a tempo),
+        # starting on the next beat; see transitions.py
+        self.fade_beats = 1.0
+        self.fade_seconds = 0.5
+        self.fade_budget = 0.004
+        self.last_transition = None
+
+        # Push listeners (web dashboard etc.): callback(event, data)
+        self.listeners = []
+        self.last_sent_bpm = None
+
+        self.state = None
+        self._publish_state(0.0)
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners: self.listeners.remove(callback)
+
+    def _emit(self, event, data):
+        for cb in list(self.listeners):
+            try: cb(event, data)
+            except Exception as e: print(f"Listener Error: {e}")
+
+    def set_preset(self, preset_name, fade_beats=None):
         print(f"!!! VJ LOGIC: Preset -> {preset_name} !!!")
-        self.mode = preset_name
-        self.sine_mode = False
-        self.color_fade_mode = False
-        self.strobe_active = False
-        self.glitch_mode = False
-        self.alternating = False
-        self.void_mode = False
-        self.factory_mode = False
-        self.pastel_mode = False
-        self.police_mode = False
-        self.derby_rotation = 255
-        self.divide_by = 1
-        
-        # Handle both names for the rainbow
-        if preset_name in ["rainbow_flow", "vivid_pop"]:
-            self.color_fade_mode = True
-            self.mode = "rainbow_flow"
-        elif preset_name == "techno_red":
-            self.p1_c = self.p2_c = self.pb_c = [255,0,0]
-        elif preset_name == "acid_green":
-            self.p1_c = self.p2_c = self.pb_c = [0,255,0]
-        elif preset_name == "industrial_amber":
-            self.sine_mode = True
-            self.p1_c = [255,100,0]; self.p2_c = [255,50,0]; self.pb_c = [255,80,0]
-            self.derby_rotation = 0
-        elif preset_name == "minimal_void":
-            self.void_mode = True
-            self.derby_rotation = 0
-        elif preset_name == "berlin_white":
-            self.p1_c = self.p2_c = self.pb_c = [255,255,255]
-        elif preset_name == "barbie_party":
-            self.p1_c = [255,20,147]; self.p2_c = [255,105,180]; self.pb_c = [255,0,255]
-        elif preset_name == "dance_rg":
-            self.derby_rotation = 0
-        elif preset_name == "alternating_kick":
-            self.alternating = True
-            self.p1_c = self.p2_c = self.pb_c = [255,0,0]
-        elif preset_name == "minimal_glitch":
-            self.glitch_mode = True
-        elif preset_name == "strobe_white":
-            self.strobe_active = True
-        elif preset_name == "code_red":
-            self.police_mode = True
-        elif preset_name == "factory_floor":
-            self.factory_mode = True
-        elif preset_name == "pastel_dreams":
-            self.pastel_mode = True
-        elif preset_name == "blackout":
-            self.derby_rotation = 0
+        try:
+            self._activate(preset_name, self.fade_beats if fade_beats is None else fade_beats)
+        except ValueError as e:
+            print(f"Preset Error: {e}")
+            return
+        self._emit("preset", {"name": self.mode})
+
+    def set_audio_reactive(self, enabled):
+        self.audio_reactive = bool(enabled)
+
+    def set_param(self, name, value):
+        """Set a live control (render thread): master 0-1, hue in turns, speed factor."""
+        if name not in self.PARAMS:
+            raise ValueError(f"Unknown parameter: {name}")
+        value = float(value)
+        if name == "master":
+            value = min(max(value, 0.0), 1.0)
+        elif name == "hue":
+            value %= 1.0
+        elif name == "speed":
+            value = min(max(value, 0.0), 8.0)
+        setattr(self, name, value)
+
+    def _activate(self, preset_name, fade_beats=0):
+        effect = create_effect(preset_name)
+        effect.start(self)
+        render = effect.compile(self)
+        current = self.active
+        if fade_beats > 0 and current and not effect.snap:
+            if isinstance(current[0], Crossfade):
+                # Interrupted fade: continue from what is on the fixtures now,
+                # so at most two effects ever run at once
+                held = Hold(self.frame)
+                current = (held, held.compile(self))
+            # Fading out of a strobe/blackout starts right away, not on the beat
+            fade = Crossfade(current, (effect, render), beats=fade_beats,
+                             seconds=self.fade_seconds, sync=not current[0].snap,
+                             budget=self.fade_budget)
+            fade.start(self)
+            self.last_transition = fade
+            effect, render = fade, fade.compile(self)
+        self.mode = effect.name
+        # One assignment, so the render thread never sees a half-switched preset
+        self.active = (effect, render)
 
     def on_beat(self, precise_time=None):
+        # Detected onset (already in the past): shown on the next frame out
         if not self.audio_reactive: return
-        t = float(precise_time) if precise_time else float(time.time())
-        if t - self.last_debounce_time > 0.2:
-            self.last_beat_time = t
-            self.last_debounce_time = t
-            self._process_beat()
+        self.beat_inbox.append(float(precise_time) if precise_time else self.clock())
+
+    def on_tempo(self, bpm, next_beat_time=0.0, confidence=1.0):
+        # Tempo from AudioAnalyzer's tracker; drives the synthetic beat flywheel
+        if confidence >= self.min_tempo_confidence and bpm > 0:
+            self.bpm = round(float(bpm), 1)
+            # Predicted kick: queued ahead so it lands on the matching frame
+            if self.audio_reactive and next_beat_time > 0:
+                self.beat_inbox.append(float(next_beat_time))
+
+    def on_onset(self, event):
+        if self.audio_reactive: self.onset_inbox.append(event)
+
+    def on_spectrum(self, bands):
+        # Replaced, not written in place, so a render never sees a half-updated array
+        self.spectrum = np.asarray(bands, dtype=np.float32)
 
-    def _process_beat(self):
+    def _fire_due_beats(self, now):
+        # now = light time of the frame being rendered
+        debounce = self.beat_debounce
+        while self.beat_inbox:
+            t = self.beat_inbox.popleft()
+            # The detection of a kick that was already predicted (or vice versa)
+            if abs(t - self.last_beat_time) <= debounce: continue
+            if any(abs(t - p) <= debounce for p in self.pending_beats): continue
+            heapq.heappush(self.pending_beats, t)
+
+        # Fire on the frame nearest the beat: up to half a frame early
+        half_frame = min(0.5 * (now - self.last_frame_time), 0.05)
+        fired = False
+        while self.pending_beats and self.pending_beats[0] <= now + half_frame:
+            t = heapq.heappop(self.pending_beats)
+            if abs(t - self.last_beat_time) > debounce:
+                self.last_beat_time = t
+                self._process_beat(t)
+                BEAT_LATENCY.observe(now - t)
+                fired = True
+        return fired
+
+    def _process_beat(self, t=None):
         if self.mode == "blackout": return
         self.beat_count += 1
-        self.last_visual_beat_time = float(time.time())
-        self.dance_toggle = not self.dance_toggle
-        if self.alternating: self.alt_state = not self.alt_state
-        self.brightness = 1.0
-
-    def update(self):
-        now = float(time.time())
-        if self.audio_reactive and self.bpm > 0:
-            beat_interval = 60.0 / float(self.bpm)
-            if now - self.last_beat_time >= beat_interval:
-                self.last_beat_time = now
-                self._process_beat()
-
-        eff_b = 1.0
-        o_p1, o_p2, o_pb = self.p1_c, self.p2_c, self.pb_c
-        
-        if self.mode == "blackout":
-            self._apply_off(); return
-            
-        if self.strobe_active:
-            eff_b = 1.0 if (int(now * 30) % 2 == 0) else 0.0
-            self._apply_panel(self.panel1_addr, [255,255,255], eff_b)
-            self._apply_panel(self.panel2_addr, [255,255,255], eff_b)
-            self._apply_party_bar_strobe(eff_b)
-            return
+        self.last_visual_beat_time = self.clock() if t is None else t
+        self.active[0].on_beat(self, self.last_visual_beat_time)
 
-        if self.mode == "dance_rg":
-            if self.dance_toggle: o_p1, o_p2, o_pb = [255,0,0], [0,255,0], [255,0,0]
-            else: o_p1, o_p2, o_pb = [0,255,0], [255,0,0], [0,255,0]
-            eff_b = 1.0
-        elif self.police_mode:
-            if self.dance_toggle: o_p1, o_p2, o_pb = [255,0,0], [0,0,255], [255,0,0]
-            else: o_p1, o_p2, o_pb = [0,0,255], [255,0,0], [0,0,255]
-            eff_b = 1.0 if (int(now * 15) % 2 == 0) else 0.2
-        elif self.color_fade_mode:
-            # RAINBOW FLOW: Solid 100% brightness, slow color cycle
-            period = 10.0 # 10 seconds for a full loop
-            hue = (now % period) / period
-            o_p1 = self._hsv_to_rgb(hue, 1.0, 1.0)
-            o_p2 = self._hsv_to_rgb((hue + 0.1) % 1.0, 1.0, 1.0)
-            o_pb = self._hsv_to_rgb((hue + 0.2) % 1.0, 1.0, 1.0)
-            eff_b = 1.0
-        elif self.sine_mode:
-            period = (60.0 / self.bpm) * 16 if self.bpm > 0 else 8.0
-            eff_b = 0.425 + 0.375 * math.sin((now * 2 * math.pi) / period)
-        elif self.void_mode:
-            period = (60.0 / self.bpm) * 32 if self.bpm > 0 else 15.0
-            mix = 0.5 + 0.5 * math.sin((now * 2 * math.pi) / period)
-            o_p1 = [int(45*mix + 128*(1-mix)), int(27*mix), int(105*mix + 32*(1-mix))]
-            o_p2 = [int(128*mix + 45*(1-mix)), int(0), int(32*mix + 105*(1-mix))]
-            o_pb = o_p1; eff_b = 0.8
-        elif self.factory_mode:
-            period = (60.0 / self.bpm) * 8 if self.bpm > 0 else 4.0
-            mix = 0.5 + 0.5 * math.sin((now * 2 * math.pi) / period)
-            o_p1 = [int(70*mix + 240*(1-mix)), int(130*mix + 248*(1-mix)), int(180*mix + 255*(1-mix))]
-            o_p2 = [int(240*mix + 70*(1-mix)), int(248*mix + 130*(1-mix)), int(255*mix + 180*(1-mix))]
-            o_pb = [255, 128, 0] if mix > 0.8 else o_p1; eff_b = 0.8
-        elif self.pastel_mode:
-            bc = (self.beat_count // 2) % 4
-            if bc == 0: o_p1, o_p2 = [255,182,193], [230,230,250]
-            elif bc == 1: o_p1, o_p2 = [255,203,164], [135,206,235]
-            elif bc == 2: o_p1, o_p2 = [230,230,250], [255,182,193]
-            else: o_p1, o_p2 = [135,206,235], [255,203,164]
-            o_pb = o_p1; self.brightness *= 0.92; eff_b = 0.4 + 0.6 * self.brightness
-        elif self.glitch_mode:
-            eff_b = 1.0 if random.random() > 0.95 else 0.05
-        elif self.audio_reactive:
-            self.brightness *= 0.85
-            eff_b = self.brightness
-
-        if self.alternating:
-            b1 = eff_b if self.alt_state else 0.0; b2 = eff_b if not self.alt_state else 0.0
-            self._apply_panel(self.panel1_addr, o_p1, b1); self._apply_panel(self.panel2_addr, o_p2, b2)
+        if self.bpm != self.last_sent_bpm:
+            self.last_sent_bpm = self.bpm
+            self._emit("bpm", {"bpm": float(self.bpm)})
+        self._emit("beat", {"count": self.beat_count, "t": self.last_visual_beat_time})
+
+    def update(self, frame_time=None):
+        # frame_time = when this frame is sent (RenderScheduler's deadline);
+        # everything is rendered for when it actually shows on the fixtures
+        now = (self.clock() if frame_time is None else frame_time) + self.output_latency
+        self._render(now)
+        self.last_frame_time = now
+        frame = self.frame
+        if self.master < 1.0 or self.hue:
+            self.patch.apply_output(frame, self.output, self.master, self.hue)
+            frame = self.output
+        self.sender.set_frame(frame)
+        self._publish_state(now)
+
+    def _publish_state(self, now):
+        # One assignment: readers get all fields from the same frame
+        self.state = ControllerState(
+            self.mode, self.bpm, self.beat_count, self.last_visual_beat_time,
+            self.master, self.hue, self.speed, self.audio_reactive, now)
+
+    def _render(self, now):
+        for source in self.inputs:
+            source.drain(self, now)
+
+        if self.anim_last is None:
+            self.anim_time = now
         else:
-            self._apply_panel(self.panel1_addr, o_p1, eff_b); self._apply_panel(self.panel2_addr, o_p2, eff_b)
-
-        self._apply_party_bar_normal(o_pb, eff_b)
-
-    def _apply_party_bar_strobe(self, brightness):
-        addr = self.party_bar_addr; val = int(255 * brightness)
-        for i in range(15): self.sender.set_channel(addr + i, 0)
-        self.sender.set_channel(addr + 5, val); self.sender.set_channel(addr + 6, val); self.sender.set_channel(addr + 7, val); self.sender.set_channel(addr + 8, val)
-
-    def _apply_party_bar_normal(self, rgb, brightness):
-        addr = self.party_bar_addr; r, g, b = [int(float(c) * float(brightness)) for c in rgb]
-        rot = self.derby_rotation
-        self.sender.set_channel(addr + 0, r); self.sender.set_channel(addr + 1, g); self.sender.set_channel(addr + 2, b); self.sender.set_channel(addr + 3, 0); self.sender.set_channel(addr + 4, rot)
-        self.sender.set_channel(addr + 5, r); self.sender.set_channel(addr + 6, g); self.sender.set_channel(addr + 7, b); self.sender.set_channel(addr + 8, 0)
-        self.sender.set_channel(addr + 9, r); self.sender.set_channel(addr + 10, g); self.sender.set_channel(addr + 11, b); self.sender.set_channel(addr + 12, 0); self.sender.set_channel(addr + 13, rot)
-
-    def _hsv_to_rgb(self, h, s, v):
-        i = int(h * 6); f = h * 6 - i; p = v * (1 - s); q = v * (1 - f * s); t = v * (1 - (1 - f) * s)
-        r, g, b = 0, 0, 0
-        if i % 6 == 0: r, g, b = v, t, p
-        elif i % 6 == 1: r, g, b = q, v, p
-        elif i % 6 == 2: r, g, b = p, v, t
-        elif i % 6 == 3: r, g, b = p, q, v
-        elif i % 6 == 4: r, g, b = t, p, v
-        elif i % 6 == 5: r, g, b = v, p, q
-        return [int(r * 255), int(g * 255), int(b * 255)]
-
-    def _apply_panel(self, addr, rgb, brightness):
-        r, g, b = [int(float(c) * float(brightness)) for c in rgb]
-        self.sender.set_channel(addr, 255); self.sender.set_channel(addr+1, r); self.sender.set_channel(addr+2, g); self.sender.set_channel(addr+3, b)
-
-    def _apply_off(self):
-        for i in range(1, 65): self.sender.set_channel(i, 0)
+            self.anim_time += (now - self.anim_last) * self.speed
+        self.anim_last = now
+
+        if self.feature_source is not None and self.feature_source.latest(self.features) is not None:
+            self.spectrum = self.band_meter.update(self.features[F_BANDS])
+
+        while self.onset_inbox:
+            event = self.onset_inbox.popleft()
+            self.last_onsets[event.kind] = event.t
+            self.active[0].on_onset(self, event)
+
+        if self.audio_reactive:
+            fired = self._fire_due_beats(now)
+            if not fired and not self.pending_beats and self.bpm > 0:
+                # Flywheel: keep pulsing at the last tempo when nothing is queued
+                beat_interval = 60.0 / float(self.bpm)
+                if now - self.last_beat_time >= beat_interval:
+                    self.last_beat_time = now
+                    self._process_beat(now)
+
+        active = self.active
+        active[1](now, self.frame)
+        if active[0].finished and self.active is active:
+            self.active = active[0].target
 
     def set_address(self, fixture, addr):
-        if fixture == "panel1": self.panel1_addr = int(addr)
-        if fixture == "panel2": self.panel2_addr = int(addr)
-        if fixture == "party_bar": self.party_bar_addr = int(addr)
+        self.patch.set_address(fixture, int(addr))
@@ -1,24 +1,35 @@
-import time
+import os
 import sys
 from dmx_sender import DMXSender
 from audio_analyzer import AudioAnalyzer
 from lighting_controller import LightingController
+from fixtures import load_patch
 from web_server import start_web_server, stop_web_server
 from midi_controller import MIDIController
+from render_scheduler import RenderScheduler
+from universe_monitor import UniverseMonitor
 
 
 def main():
     SERIAL_PORT = "/dev/cu.usbserial-BG03LVHM"
     AUDIO_DEVICE = "BlackHole 2ch"
+    PATCH_FILE = "patch.json"  # Optional; the built-in house rig is used without it
+    OUTPUT_HZ = 40.0  # DMX frames per second
+    RENDER_HZ = 40.0  # Lighting renders per second (OUTPUT_HZ / N)
 
     sender = DMXSender(port=SERIAL_PORT)
     try:
-        sender.start()
+        sender.start(threaded=False)  # Output is paced by the RenderScheduler
     except Exception as e:
         print(f"Could not start DMX: {e}")
         sys.exit(1)
 
-    controller = LightingController(sender)
+    # What actually goes out, for the web universe monitor
+    monitor = UniverseMonitor(sender.num_channels)
+    sender.monitor = monitor
+
+    patch = load_patch(PATCH_FILE) if os.path.exists(PATCH_FILE) else None
+    controller = LightingController(sender, patch=patch)
 
     # Start MIDI
     midi = MIDIController(controller)
@@ -26,22 +37,26 @@ def main():
 
     analyzer = AudioAnalyzer(device_name=AUDIO_DEVICE)
 
-    start_web_server(controller, analyzer)
-    analyzer.start(callback=controller.on_beat)
+    controller.feature_source = analyzer.features  # Spectrum effects read it lock-free
+    analyzer.onsets.subscribe("*", controller.on_onset)  # Kick/snare/hat events
+
+    start_web_server(controller, analyzer, monitor=monitor)
+    analyzer.start(callback=controller.on_beat, tempo_callback=controller.on_tempo)
 
     print(f"\nVJ SYSTEM READY FOR TOMORROW!")
     print(f"Port: {SERIAL_PORT}")
     print(f"Web Dashboard: http://localhost:5005")
 
+    scheduler = RenderScheduler(controller, sender, output_hz=OUTPUT_HZ, render_hz=RENDER_HZ)
     try:
-        while True:
-            controller.update()
-            time.sleep(0.02)
+        scheduler.run()
     except KeyboardInterrupt:
         pass
     finally:
         print("\nVJ SYSTEM SHUTTING DOWN...")
+        print(f"Render stats: {scheduler.stats()}")
         analyzer.stop()
+        midi.stop()
         sender.stop()
         stop_web_server()
 
@@ -0,0 +1,140 @@
+"""
+Counters and histograms for the hot paths, exported in Prometheus text format.
+
+Every thread that updates a metric gets its own shard of it (found through
+a threading.local, created once per thread), so an update is a couple of
+list additions with no lock and no contention between the render, audio,
+serial and web threads. A scrape sums the shards; it may see an update
+half-applied (count in, sum not yet), which is fine for monitoring.
+
+Metrics are process-wide and created at import time by the module that
+updates them (ones shared by several modules are declared at the end of
+this file); a name can only be registered with one definition:
+
+    RENDER_SECONDS = metrics.histogram("vj_render_seconds", "Render tick time", TIME_BUCKETS)
+    RENDER_SECONDS.observe(t1 - t0)
+
+    metrics.render()   # /metrics page (web_server.py)
+"""
+
+import threading
+from bisect import bisect_left
+
+# Seconds: 50 us .. 100 ms
+TIME_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class _Sharded:
+    def __init__(self, name, help, size):
+        self.name = name
+        self.help = help
+        self.size = size
+        self.shards = []  # One list per thread that ever updated this metric
+        self._local = threading.local()
+        self._lock = threading.Lock()  # Only taken when a thread adds its shard
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0] * self.size
+            with self._lock:
+                self.shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _totals(self):
+        totals = [0] * self.size
+        for shard in list(self.shards):
+            for i, v in enumerate(shard):
+                totals[i] += v
+        return totals
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def __init__(self, name, help):
+        super().__init__(name, help, 1)
+
+    def inc(self, n=1):
+        self._shard()[0] += n
+
+    @property
+    def value(self):
+        return self._totals()[0]
+
+    def samples(self):
+        return [(self.name, "", self.value)]
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=TIME_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        # Per shard: count per bucket (last one is +Inf), then the sum
+        super().__init__(name, help, len(self.bounds) + 2)
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    @property
+    def count(self):
+        return sum(self._totals()[:-1])
+
+    def samples(self):
+        totals = self._totals()
+        out, cumulative = [], 0
+        for bound, n in zip(self.bounds + (float("inf"),), totals):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            out.append((self.name + "_bucket", f'{{le="{le}"}}', cumulative))
+        out.append((self.name + "_sum", "", totals[-1]))
+        out.append((self.name + "_count", "", cumulative))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, *args):
+        # Same name and definition -> same metric (a module imported twice,
+        # every instance of a class); anything else under that name is a clash
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, *args)
+            elif type(metric) is not cls or metric.help != help or \
+                    (cls is Histogram and metric.bounds != tuple(sorted(args[0]))):
+                raise ValueError(f"Metric {name} is already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name, help):
+        return self._get(Counter, name, help)
+
+    def histogram(self, name, help, buckets=TIME_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+render = REGISTRY.render
+
+# Shared by the two serial outputs (dmx_sender.DMXSender, dmx_controller.DMXController)
+SERIAL_WRITE_SECONDS = histogram("vj_serial_write_seconds", "Break + DMX frame serial write time")
+DMX_FRAMES = counter("vj_dmx_frames_sent_total", "DMX frames transmitted (or recorded in Virtual Mode)")
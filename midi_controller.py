@@ -1,14 +1,45 @@
+"""
+MIDI input for the lighting controller.
+
+The MIDI thread only timestamps incoming messages and queues them; the
+render thread drains the queue once per frame (LightingController.inputs),
+so presets and live controls change between frames, never in the middle of
+one. Control changes arriving in bursts (a fader sweep sends dozens per
+frame) are coalesced to the last value per controller per frame.
+
+    note on     preset for the key; velocity sets the fade (hardest hit = instant cut)
+    strobe key  strobe while held, back to the last preset on release
+    CC          cc_map: controller number -> "master" / "speed" / "hue"
+
+Any mido input works, including an in-memory one for tests:
+
+    port = mido.ports.EchoPort(); midi.start(port); port.send(msg)
+"""
+
 import mido
 import threading
-import time
+from collections import deque
+
+# Default controllers: volume, mod wheel, "brightness" (usually a knob)
+DEFAULT_CC_MAP = {7: "master", 1: "speed", 74: "hue"}
+
+# 0-127 -> parameter value
+CC_SCALE = {
+    "master": lambda v: v / 127.0,
+    "hue": lambda v: v / 128.0,
+    "speed": lambda v: 4.0 ** (v / 63.5 - 1.0),  # 0.25x - 4x, centre = 1x
+}
+
 
 class MIDIController:
-    def __init__(self, lighting_controller):
+    def __init__(self, lighting_controller, port_match="LPK25", cc_map=None, max_fade_beats=2.0):
         self.lc = lighting_controller
+        self.port_match = port_match
         self.running = False
         self.thread = None
+        self.port = None
         self.last_preset = "techno_red"
-        
+
         # STRICT WHITE KEY MAPPING (48 to 72)
         self.mapping = {
             48: "techno_red",      # Key 1
@@ -27,37 +58,116 @@ class MIDIController:
             72: "blackout"         # Key 15
         }
         self.strobe_note = 71      # Key 14 (B)
+        self.cc_map = dict(DEFAULT_CC_MAP if cc_map is None else cc_map)
+        # Velocity 127 cuts instantly, softer hits fade on the beat, up to max_fade_beats
+        self.max_fade_beats = max_fade_beats
+
+        # (receive time, message) from the MIDI thread, drained per frame
+        self.inbox = deque()
 
-    def start(self):
+        # Input -> light latency (receive time to the light time of the frame
+        # that first shows the message), s
+        self.latency = 0.0
+        self.avg_latency = 0.0
+        self.max_latency = 0.0
+        self.events = 0
+        self.coalesced = 0
+
+        self.lc.inputs.append(self)
+
+    def start(self, port=None, virtual=None):
+        """
+        Listen on `port` (an open mido input), a new virtual input named
+        `virtual` (needs the rtmidi backend), or the first port whose name
+        contains port_match.
+        """
         try:
-            ports = mido.get_input_names()
-            target_port = next((p for p in ports if "LPK25" in p), None)
-            
-            if not target_port:
-                print("MIDI: LPK25 not found.")
-                return
+            if port is None and virtual:
+                port = mido.open_input(virtual, virtual=True)
+            elif port is None:
+                target_port = next((p for p in mido.get_input_names() if self.port_match in p), None)
+                if not target_port:
+                    print(f"MIDI: {self.port_match} not found.")
+                    return
+                port = mido.open_input(target_port)
 
+            self.port = port
             self.running = True
-            self.thread = threading.Thread(target=self._listen, args=(target_port,), daemon=True)
+            self.thread = threading.Thread(target=self._listen, args=(port,), daemon=True)
             self.thread.start()
-            print(f"MIDI: Active on {target_port} (White Keys Only)")
+            print(f"MIDI: Active on {getattr(port, 'name', None) or 'virtual port'}")
         except Exception as e:
             print(f"MIDI Error: {e}")
 
-    def _listen(self, port_name):
+    def stop(self):
+        self.running = False
+        if self.port is not None:
+            try: self.port.close()
+            except Exception: pass
+
+    def _listen(self, inport):
         try:
-            with mido.open_input(port_name) as inport:
-                for msg in inport:
-                    if not self.running: break
-                    if msg.type == 'note_on' and msg.velocity > 0:
-                        if msg.note == self.strobe_note:
-                            self.lc.set_preset("strobe_white")
-                        elif msg.note in self.mapping:
-                            preset = self.mapping[msg.note]
-                            if preset != "blackout": self.last_preset = preset
-                            self.lc.set_preset(preset)
-                    elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                        if msg.note == self.strobe_note:
-                            self.lc.set_preset(self.last_preset)
+            while self.running:
+                msg = inport.receive()
+                if msg is None or not self.running: break
+                self.receive(msg)
         except Exception as e:
-            print(f"MIDI Runtime Error: {e}")
+            if self.running: print(f"MIDI Runtime Error: {e}")
+
+    def receive(self, msg, t=None):
+        """Queue a message (any thread); it takes effect on the next rendered frame."""
+        self.inbox.append((self.lc.clock() if t is None else t, msg))
+
+    def drain(self, ctx, now):
+        """Render thread: apply everything queued, CCs coalesced to one value per frame."""
+        ccs = {}
+        while self.inbox:
+            t, msg = self.inbox.popleft()
+            self.events += 1
+            if msg.type == "control_change":
+                key = (msg.channel, msg.control)
+                if key in ccs:
+                    # Keep the first arrival time: that's what the latency is measured from
+                    ccs[key] = (ccs[key][0], msg.value)
+                    self.coalesced += 1
+                else:
+                    ccs[key] = (t, msg.value)
+                continue
+            if self._note(ctx, msg):
+                self._record_latency(now - t)
+        for (channel, control), (t, value) in ccs.items():
+            param = self.cc_map.get(control)
+            if param:
+                ctx.set_param(param, CC_SCALE[param](value))
+                self._record_latency(now - t)
+
+    def _note(self, ctx, msg):
+        if msg.type == "note_on" and msg.velocity > 0:
+            if msg.note == self.strobe_note:
+                ctx.set_preset("strobe_white")
+            elif msg.note in self.mapping:
+                preset = self.mapping[msg.note]
+                if preset != "blackout": self.last_preset = preset
+                ctx.set_preset(preset, self.max_fade_beats * (1.0 - msg.velocity / 127.0))
+            else:
+                return False
+            return True
+        if msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
+            if msg.note == self.strobe_note:
+                ctx.set_preset(self.last_preset, 0)
+                return True
+        return False
+
+    def _record_latency(self, latency):
+        self.latency = latency
+        self.avg_latency += 0.1 * (latency - self.avg_latency)
+        self.max_latency = max(self.max_latency, latency)
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "coalesced": self.coalesced,
+            "latency_ms": self.latency * 1e3,
+            "avg_latency_ms": self.avg_latency * 1e3,
+            "max_latency_ms": self.max_latency * 1e3,
+        }
@@ -0,0 +1,210 @@
+"""
+Network DMX outputs (Art-Net, sACN / E1.31) and a multi-universe router.
+
+The router looks like a DMXSender to LightingController (set_channel /
+set_frame on one flat frame spanning several universes) and fans each
+512-channel universe out to any number of outputs on its own thread.
+Universes that did not change are only resent at the keep-alive rate.
+"""
+
+import socket
+import struct
+import threading
+import time
+import uuid
+import numpy as np
+
+UNIVERSE_SIZE = 512
+
+ARTNET_PORT = 6454
+ARTNET_HEADER = b"Art-Net\x00"
+ARTNET_OP_DMX = 0x5000
+ARTNET_PROTOCOL = 14
+
+SACN_PORT = 5568
+SACN_ACN_ID = b"ASC-E1.17\x00\x00\x00"
+SACN_VECTOR_ROOT = 0x00000004
+SACN_VECTOR_FRAMING = 0x00000002
+SACN_VECTOR_DMP = 0x02
+
+
+def sacn_multicast_group(universe):
+    return f"239.255.{(universe >> 8) & 0xFF}.{universe & 0xFF}"
+
+
+class ArtNetSender:
+    """ArtDmx packets, unicast to a node IP or broadcast (the default)."""
+
+    def __init__(self, host="255.255.255.255", port=ARTNET_PORT):
+        self.host = host
+        self.port = port
+        self.sequence = {}
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+    @staticmethod
+    def check_universe(universe):
+        # 15-bit Port-Address: Net (7 bits) + Sub-Net/Universe (8 bits)
+        if not 0 <= universe <= 0x7FFF:
+            raise ValueError("Art-Net universe must be between 0 and 32767")
+
+    def build_packet(self, universe, data):
+        length = len(data) + (len(data) & 1)  # Art-Net wants an even slot count
+        seq = self.sequence.get(universe, 0) % 255 + 1  # 0 disables sequencing
+        self.sequence[universe] = seq
+        header = (ARTNET_HEADER + struct.pack("<H", ARTNET_OP_DMX)
+                  + struct.pack(">HBBBBH", ARTNET_PROTOCOL, seq, 0,
+                                universe & 0xFF, (universe >> 8) & 0x7F, length))
+        return header + bytes(data) + (b"\x00" if length != len(data) else b"")
+
+    def send(self, universe, data):
+        self.sock.sendto(self.build_packet(universe, data), (self.host, self.port))
+
+    def close(self):
+        self.sock.close()
+
+
+class SACNSender:
+    """E1.31 data packets, multicast per universe or unicast to `host`."""
+
+    def __init__(self, host=None, port=SACN_PORT, source_name="Lightweight VJ Pro",
+                 priority=100, multicast_ttl=1):
+        self.host = host  # None -> multicast to 239.255.<hi>.<lo>
+        self.port = port
+        self.priority = priority
+        self.source_name = source_name.encode("utf-8")[:63].ljust(64, b"\x00")
+        self.cid = uuid.uuid4().bytes
+        self.sequence = {}
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, multicast_ttl)
+
+    @staticmethod
+    def check_universe(universe):
+        if not 1 <= universe <= 63999:
+            raise ValueError("sACN universe must be between 1 and 63999")
+
+    def build_packet(self, universe, data):
+        self.check_universe(universe)
+        slots = len(data)
+        total = 126 + slots
+        seq = (self.sequence.get(universe, -1) + 1) % 256
+        self.sequence[universe] = seq
+        root = struct.pack(">HH12sHI", 0x0010, 0x0000, SACN_ACN_ID,
+                           0x7000 | (total - 16), SACN_VECTOR_ROOT) + self.cid
+        framing = struct.pack(">HI", 0x7000 | (total - 38), SACN_VECTOR_FRAMING) \
+            + self.source_name + struct.pack(">BHBBH", self.priority, 0, seq, 0, universe)
+        dmp = struct.pack(">HBBHHHB", 0x7000 | (total - 115), SACN_VECTOR_DMP,
+                          0xA1, 0x0000, 0x0001, slots + 1, 0x00)
+        return root + framing + dmp + bytes(data)
+
+    def send(self, universe, data):
+        host = self.host or sacn_multicast_group(universe)
+        self.sock.sendto(self.build_packet(universe, data), (host, self.port))
+
+    def close(self):
+        self.sock.close()
+
+
+class OutputRouter:
+    """
+    Multi-universe frame buffer with pluggable outputs.
+
+    Outputs only need a send(universe, data) method. Local universe indexes
+    (0 = channels 1-512 of the flat frame) are mapped to each output's own
+    universe number, so one local universe can go to Art-Net, sACN and the
+    serial dongle (DMXSender) at the same time. Outputs with a
+    check_universe(universe) method get their universe number validated
+    when they are added; an output that fails while sending is reported and
+    skipped, the others still get the frame.
+    """
+
+    def __init__(self, universes=1, rate=40, keepalive=1.0):
+        self.universes = universes
+        self.rate = rate
+        self.keepalive = keepalive
+        self.frame = np.zeros(universes * UNIVERSE_SIZE, dtype=np.uint8)
+        self._last = np.zeros((universes, UNIVERSE_SIZE), dtype=np.uint8)
+        self._last_sent = [0.0] * universes
+        self.routes = [[] for _ in range(universes)]
+        self.monitor = None  # Optional universe_monitor.UniverseMonitor over all universes
+        self.output_errors = 0
+        self.running = False
+        self.thread = None
+
+    @property
+    def num_channels(self):
+        return len(self.frame)
+
+    def add_output(self, output, local=0, universe=None):
+        if not 0 <= local < self.universes:
+            raise ValueError(f"Local universe must be between 0 and {self.universes - 1}")
+        universe = local if universe is None else universe
+        check = getattr(output, "check_universe", None)
+        if check:
+            check(universe)
+        self.routes[local].append((output, universe))
+
+    def set_channel(self, channel, value):
+        if 1 <= channel <= len(self.frame):
+            self.frame[channel - 1] = max(0, min(255, int(value)))
+
+    def set_frame(self, frame, start=1):
+        offset = start - 1
+        n = min(len(frame), len(self.frame) - offset)
+        if offset >= 0 and n > 0:
+            self.frame[offset:offset + n] = np.frombuffer(memoryview(frame), dtype=np.uint8)[:n]
+
+    def tick(self, now=None):
+        """Send every universe that changed (or is due a keep-alive). Returns universes sent."""
+        now = time.perf_counter() if now is None else now
+        frames = self.frame.reshape(self.universes, UNIVERSE_SIZE)
+        sent = 0
+        for u in range(self.universes):
+            if not self.routes[u]:
+                continue
+            data = frames[u]
+            if np.array_equal(data, self._last[u]) and now - self._last_sent[u] < self.keepalive:
+                continue
+            self._last[u] = data
+            self._last_sent[u] = now
+            for output, universe in self.routes[u]:
+                try:
+                    output.send(universe, self._last[u])
+                except Exception as e:
+                    # One broken output must not stop the others (or the send loop)
+                    self.output_errors += 1
+                    if self.output_errors == 1 or self.output_errors % 100 == 0:
+                        print(f"Output Error ({type(output).__name__} u{universe}, "
+                              f"{self.output_errors}x): {e}")
+            sent += 1
+        if sent and self.monitor:
+            self.monitor.publish(self.frame)
+        return sent
+
+    def send_due(self, now=None):
+        # Same hook as DMXSender.send_due, for render_scheduler.RenderScheduler
+        return self.tick(now) > 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._send_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread: self.thread.join()
+        for route in self.routes:
+            for output, _ in route:
+                if hasattr(output, "close"): output.close()
+
+    def _send_loop(self):
+        interval = 1.0 / self.rate
+        deadline = time.perf_counter()
+        while self.running:
+            self.tick()
+            deadline += interval
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.perf_counter()
@@ -0,0 +1,108 @@
+"""
+Kick / snare / hi-hat onset classifier.
+
+Runs on the feature rows AudioAnalyzer already publishes (feature_stream.py),
+so it shares the hop's single FFT and costs a few scalar operations per
+hop. Each instrument has its own adaptive threshold (running mean + k
+standard deviations of its onset strength) and refractory time; events are
+dispatched to the handlers subscribed for that kind, in the audio thread.
+
+    classifier.subscribe("kick", handler)   # handler(OnsetEvent)
+    classifier.subscribe("*", handler)      # every kind
+"""
+
+import math
+import time
+from collections import namedtuple
+from feature_stream import F_HAT, F_KICK, F_SNARE, F_TIME
+
+OnsetEvent = namedtuple("OnsetEvent", "kind t strength")
+
+KINDS = ("kick", "snare", "hat")
+COLUMNS = {"kick": F_KICK, "snare": F_SNARE, "hat": F_HAT}
+# Minimum time between two onsets of the same kind (s)
+REFRACTORY = {"kick": 0.2, "snare": 0.1, "hat": 0.05}
+
+
+class _Detector:
+    def __init__(self, refractory, k=3.0, floor=0.5, peak_ratio=0.35, peak_decay=0.9995,
+                 alpha=0.02):
+        self.refractory = refractory
+        self.k, self.floor, self.alpha = k, floor, alpha
+        # Onsets also have to reach peak_ratio x the recent onset peak (a
+        # slowly decaying max), so noise-floor bumps don't fire on loud tracks
+        self.peak_ratio = peak_ratio
+        self.peak_decay = peak_decay
+        self.peak = 0.0
+        self.mean = 0.0
+        self.var = 0.0
+        self.last = -math.inf
+        self.prev = 0.0
+        self.threshold = floor
+
+    def step(self, value, t):
+        threshold = max(self.mean + self.k * math.sqrt(self.var) + self.floor,
+                        self.peak_ratio * self.peak)
+        self.threshold = threshold
+        # Rising edge over the threshold, outside the refractory window
+        hit = value > threshold and self.prev <= threshold and t - self.last >= self.refractory
+        self.peak *= self.peak_decay
+        if value > threshold:
+            self.peak = max(self.peak, value)
+        if hit:
+            self.last = t
+        elif value <= threshold:
+            # Only the background feeds the statistics: onsets and their
+            # tails would otherwise raise the threshold over the next onset
+            d = value - self.mean
+            self.mean += self.alpha * d
+            self.var += self.alpha * (d * d - self.var)
+        self.prev = value
+        return hit
+
+
+class OnsetClassifier:
+    def __init__(self, warmup_hops=40, snare_ratio=0.7):
+        self.detectors = {kind: _Detector(REFRACTORY[kind]) for kind in KINDS}
+        self.handlers = {kind: [] for kind in KINDS + ("*",)}
+        self.warmup_hops = warmup_hops
+        # Kick clicks and hats leak into the snare bands: a snare only counts
+        # if it is (relative to each detector's threshold) at least
+        # snare_ratio x as strong as the kick and hat in the same hop
+        self.snare_ratio = snare_ratio
+        self.hops = 0
+        self.counts = {kind: 0 for kind in KINDS}
+        self.process_time = 0.0  # Last process() call, s
+
+    def subscribe(self, kind, handler):
+        if kind not in self.handlers:
+            raise ValueError(f"Onset kind must be one of {KINDS} or '*'")
+        self.handlers[kind].append(handler)
+
+    def unsubscribe(self, kind, handler):
+        if handler in self.handlers.get(kind, []):
+            self.handlers[kind].remove(handler)
+
+    def process(self, row):
+        """Classify one feature row; dispatches and returns the OnsetEvents found."""
+        t0 = time.perf_counter()
+        t = row[F_TIME]
+        self.hops += 1
+        events = []
+        relative = {}
+        for kind in KINDS:
+            detector = self.detectors[kind]
+            value = row[COLUMNS[kind]]
+            relative[kind] = value / detector.threshold
+            if detector.step(value, t) and self.hops > self.warmup_hops:
+                events.append(OnsetEvent(kind, t, float(value)))
+        masking = self.snare_ratio * max(relative["kick"], relative["hat"])
+        if relative["snare"] < masking:
+            events = [e for e in events if e.kind != "snare"]
+        for event in events:
+            self.counts[event.kind] += 1
+            for handler in self.handlers[event.kind] + self.handlers["*"]:
+                try: handler(event)
+                except Exception as e: print(f"Onset Handler Error: {e}")
+        self.process_time = time.perf_counter() - t0
+        return events
@@ -0,0 +1,130 @@
+"""
+Pixel-mapped effects.
+
+Every RGB cell in the patch has a position on a 0-1 plane (Patch.cell_xy,
+from the fixture's x/y/width/height or left-to-right patch order). Pixel
+effects shade all cells at once as NumPy arrays over those coordinates,
+(cells, 3) colours and (cells,) levels, and Patch.render_cells projects
+them onto the DMX channels in one scatter, whatever the number of
+fixtures or universes.
+
+Importing this module registers the pixel presets.
+"""
+
+import numpy as np
+from color_lut import HUE_WHEEL, hue_index
+from effects import Effect, WHITE, beat_period, register
+
+
+class PixelEffect(Effect):
+    """Base class: fill colors/levels for every cell in shade()."""
+
+    def __init__(self, colors=WHITE, rotation=255):
+        self.base_color = np.array(colors, dtype=np.float32)
+        self.rotation = rotation
+
+    def shade(self, ctx, now, x, y, colors, levels):
+        raise NotImplementedError
+
+    def compile(self, ctx):
+        patch = ctx.patch
+        x, y = patch.cell_xy[:, 0].copy(), patch.cell_xy[:, 1].copy()
+        colors = np.empty((len(x), 3), dtype=np.float32)
+        colors[:] = self.base_color
+        levels = np.ones(len(x), dtype=np.float32)
+        shade, rotation = self.shade, self.rotation
+
+        def render(now, frame):
+            shade(ctx, now, x, y, colors, levels)
+            patch.render_cells(frame, colors, levels, rotation)
+        return render
+
+
+class Chase(PixelEffect):
+    """Bright head with a fading tail sweeping along x, `beats` beats per sweep."""
+
+    def __init__(self, colors=WHITE, width=0.25, beats=2, fallback=2.0, rotation=255):
+        super().__init__(colors, rotation)
+        self.width, self.beats, self.fallback = width, beats, fallback
+
+    def shade(self, ctx, now, x, y, colors, levels):
+        head = (ctx.anim_time / beat_period(ctx, self.beats, self.fallback)) % 1.0
+        # Distance behind the head, wrapping around the end of the rig
+        np.subtract(head, x, out=levels)
+        np.mod(levels, 1.0, out=levels)
+        np.multiply(levels, -1.0 / self.width, out=levels)
+        np.add(levels, 1.0, out=levels)
+        np.maximum(levels, 0.0, out=levels)
+
+
+class Gradient(PixelEffect):
+    """Hue gradient over the plane (`span` wheels across x + y) scrolling every `period` s."""
+
+    def __init__(self, span=1.0, period=8.0, rotation=255):
+        super().__init__(WHITE, rotation)
+        self.span, self.period = span, period
+
+    def shade(self, ctx, now, x, y, colors, levels):
+        hue = (x + y) * self.span + ctx.anim_time / self.period
+        np.take(HUE_WHEEL, hue_index(hue), axis=0, out=colors)
+
+
+class Noise(PixelEffect):
+    """Drifting smooth value noise on the level, `scale` lattice cells per unit."""
+
+    def __init__(self, colors=(0, 160, 255), scale=4.0, speed=0.5, floor=0.05, seed=0,
+                 rotation=255):
+        super().__init__(colors, rotation)
+        self.scale, self.speed, self.floor = scale, speed, floor
+        self.lattice = np.random.default_rng(seed).random((256, 256)).astype(np.float32)
+
+    @staticmethod
+    def _split(coord):
+        i0 = np.floor(coord)
+        f = coord - i0
+        i0 = i0.astype(np.intp) & 255
+        return i0, (i0 + 1) & 255, f * f * (3 - 2 * f)  # Smoothstep weights
+
+    def shade(self, ctx, now, x, y, colors, levels):
+        t = ctx.anim_time * self.speed
+        x0, x1, sx = self._split(x * self.scale + t)
+        y0, y1, sy = self._split(y * self.scale + 0.37 * t)
+        lat = self.lattice
+        top = lat[y0, x0] + (lat[y0, x1] - lat[y0, x0]) * sx
+        bottom = lat[y1, x0] + (lat[y1, x1] - lat[y1, x0]) * sx
+        np.multiply(bottom - top, sy, out=levels)
+        levels += top
+        np.maximum(levels, self.floor, out=levels)
+
+
+class Spectrum(PixelEffect):
+    """
+    Audio spectrum across x from ctx.spectrum (band levels 0-1, bass first).
+
+    1D rigs show each band as brightness; cells spread over y (matrices)
+    light up as bars from the bottom (y = 1) up to the band level.
+    """
+
+    def __init__(self, hue_span=0.7, rotation=255):
+        super().__init__(WHITE, rotation)
+        self.hue_span = hue_span
+
+    def compile(self, ctx):
+        x = ctx.patch.cell_xy[:, 0]
+        # Hue follows the band: red bass to blue treble
+        self.base_color = HUE_WHEEL[hue_index(np.clip(x, 0, 1) * self.hue_span)]
+        return super().compile(ctx)
+
+    def shade(self, ctx, now, x, y, colors, levels):
+        bands = ctx.spectrum
+        v = np.interp(x, (np.arange(len(bands)) + 0.5) / len(bands), bands)
+        if len(y) and y.max() > y.min():  # No cells: nothing to shade
+            np.less_equal(1.0 - y, v, out=levels, casting="unsafe")
+        else:
+            levels[:] = v
+
+
+register("pixel_chase", Chase)
+register("pixel_rainbow", Gradient)
+register("pixel_noise", Noise)
+register("spectrum", Spectrum)
@@ -0,0 +1,102 @@
+import time
+import metrics
+
+RENDER_SECONDS = metrics.histogram("vj_render_seconds", "Controller update() time per rendered frame")
+FRAMES = metrics.counter("vj_output_frames_total", "Output deadlines handled (frames handed to send_due)")
+MISSED = metrics.counter("vj_missed_deadlines_total", "Frames sent more than 1 ms late")
+
+
+class RenderScheduler:
+    """
+    Single render + output loop on perf_counter deadlines.
+
+    Each output period ends in a send deadline. The frame is rendered
+    `render_lead` seconds before it and handed to the sender's send_due()
+    right at the deadline, so the light always shows a frame that is at
+    most `render_lead` old and render/output can't drift against each
+    other. The controller gets the deadline as its frame time, so beat
+    visuals are placed on the frame that is actually sent. With render_hz
+    below output_hz (it must divide it: every Nth output frame is rendered),
+    the last frame is re-sent in between renders (the sender's delta logic
+    decides whether it goes out).
+    """
+
+    def __init__(self, controller, sender, output_hz=40.0, render_hz=None,
+                 render_lead=0.004, spin=0.0005):
+        self.controller = controller
+        self.sender = sender
+        self.output_hz = float(output_hz)
+        self.render_hz = float(render_hz or output_hz)
+        if self.render_hz > self.output_hz:
+            raise ValueError("render_hz can't be higher than output_hz")
+        self.render_every = round(self.output_hz / self.render_hz)
+        if abs(self.render_every * self.render_hz - self.output_hz) > 1e-9 * self.output_hz:
+            raise ValueError(f"render_hz ({self.render_hz:g}) must be output_hz ({self.output_hz:g}) / N")
+        self.render_lead = render_lead
+        self.spin = spin  # Busy-wait the last bit of each sleep for sub-ms accuracy
+        self.running = False
+
+        # Metrics
+        self.frames = 0
+        self.renders = 0
+        self.missed_deadlines = 0
+        self.max_late = 0.0
+        self.render_time = 0.0
+        self.max_render_time = 0.0
+        self.send_jitter = 0.0  # EWMA of |actual - planned| send time
+
+    def _wait_until(self, target):
+        delay = target - time.perf_counter() - self.spin
+        if delay > 0:
+            time.sleep(delay)
+        while time.perf_counter() < target:
+            pass
+
+    def run(self, duration=None):
+        """Run in the calling thread until stop(), KeyboardInterrupt or `duration` seconds."""
+        interval = 1.0 / self.output_hz
+        self.running = True
+        deadline = time.perf_counter() + interval
+        end = deadline + duration if duration else None
+        while self.running and (end is None or deadline < end):
+            if self.frames % self.render_every == 0:
+                self._wait_until(deadline - self.render_lead)
+                t0 = time.perf_counter()
+                self.controller.update(deadline)
+                t1 = time.perf_counter()
+                self.render_time = t1 - t0
+                RENDER_SECONDS.observe(self.render_time)
+                self.max_render_time = max(self.max_render_time, self.render_time)
+                self.renders += 1
+
+            self._wait_until(deadline)
+            now = time.perf_counter()
+            late = now - deadline
+            if late > self.spin + 0.001:
+                self.missed_deadlines += 1
+                MISSED.inc()
+                self.max_late = max(self.max_late, late)
+            self.send_jitter += 0.05 * (abs(late) - self.send_jitter)
+            self.sender.send_due(now)
+            self.frames += 1
+            FRAMES.inc()
+
+            deadline += interval
+            if now - deadline > interval:
+                # More than a whole period behind (e.g. a GC or swap stall): resync
+                # instead of firing a burst of catch-up frames
+                deadline = now + interval
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "renders": self.renders,
+            "missed_deadlines": self.missed_deadlines,
+            "max_late_ms": self.max_late * 1000,
+            "render_ms": self.render_time * 1000,
+            "max_render_ms": self.max_render_time * 1000,
+            "send_jitter_ms": self.send_jitter * 1000,
+        }
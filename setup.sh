@@ -34,7 +34,7 @@ source venv/bin/activate
 # 5. Install Python Dependencies
 echo "🛠 Installing Python packages..."
 pip install --upgrade pip
-pip install pyserial numpy flask mido python-rtmidi
+pip install pyserial numpy mido python-rtmidi
 
 # Modern, robust way to install pyaudio on macOS
 echo "🎤 Special install for PyAudio..."
@@ -0,0 +1,139 @@
+import numpy as np
+from collections import deque
+
+
+class TempoTracker:
+    """
+    Streaming BPM + beat-phase estimator fed with onset times.
+
+    Every onset updates a comb-filter score over a fixed BPM grid from the
+    inter-onset intervals of the last `history` onsets (bounded cost:
+    history^2 x grid size), then a phase-locked loop keeps a beat grid
+    (anchor + n * period) aligned to the onsets. Tuning follows
+    BPM_DETECTION_FIX.md: 6+ onsets before the first estimate, 6% outlier
+    band, 5 outliers before a reset, 0.02-0.10 learning rate (x1.2 for
+    135-145 BPM) and 0.15 phase correction.
+    """
+
+    def __init__(self, min_bpm=80.0, max_bpm=180.0, resolution=0.5, history=16):
+        self.bpm_grid = np.arange(min_bpm, max_bpm + resolution, resolution)
+        self.periods = 60.0 / self.bpm_grid
+        self.onsets = deque(maxlen=history)
+        self.candidates = deque(maxlen=5)
+
+        self.min_onsets = 6
+        self.outlier_tolerance = 0.06
+        self.max_outliers = 5
+        self.phase_gain = 0.15
+        self.sigma = 0.015  # Timing jitter tolerated per interval (s)
+
+        self.bpm = 0.0
+        self.confidence = 0.0
+        self.anchor = None  # Time of a beat on the locked grid
+        self.outliers = 0
+        self.phase_misses = 0
+
+    @property
+    def period(self):
+        return 60.0 / self.bpm if self.bpm > 0 else 0.0
+
+    def add_onset(self, t):
+        """Feed one onset time (seconds, monotonic clock). Returns the current BPM."""
+        self.onsets.append(float(t))
+        if len(self.onsets) < self.min_onsets:
+            return self.bpm
+
+        candidate, confidence = self._estimate()
+        if candidate > 0:
+            self._update_bpm(candidate, confidence)
+        self._update_phase(float(t))
+        return self.bpm
+
+    def _estimate(self):
+        times = np.fromiter(self.onsets, dtype=np.float64)
+        # All pairwise intervals up to 4 beats at the slowest tempo
+        diffs = times[None, :] - times[:, None]
+        iois = diffs[np.triu_indices(len(times), k=1)]
+        iois = iois[(iois > 0.2) & (iois < 4 * self.periods[0])]
+        if len(iois) == 0:
+            return 0.0, 0.0
+
+        # Comb filter: how well each candidate period explains every interval.
+        # Multiples are weighted 1/k so half-tempo candidates don't win.
+        k = np.rint(iois[None, :] / self.periods[:, None])
+        valid = (k >= 1) & (k <= 4)
+        err = iois[None, :] - k * self.periods[:, None]
+        score = np.where(valid, np.exp(-0.5 * (err / self.sigma) ** 2) / np.maximum(k, 1), 0.0)
+        total = score.sum(axis=1)
+        best = int(np.argmax(total))
+        period = self.periods[best]
+
+        # Confidence: share of consecutive intervals on the chosen grid
+        steps = np.diff(times)
+        ratio = steps / period
+        on_grid = np.abs(ratio - np.rint(ratio)) < self.outlier_tolerance * np.maximum(np.rint(ratio), 1)
+        confidence = float(np.mean(on_grid & (np.rint(ratio) >= 1)))
+        return float(self.bpm_grid[best]), confidence
+
+    def _update_bpm(self, candidate, confidence):
+        self.candidates.append(candidate)
+        estimate = float(np.median(self.candidates))
+        self.confidence = confidence
+
+        if self.bpm <= 0:
+            self.bpm = estimate
+            return
+
+        change = abs(estimate - self.bpm) / self.bpm
+        if change > self.outlier_tolerance:
+            self.outliers += 1
+            if self.outliers >= self.max_outliers:
+                # Sustained disagreement: the track changed tempo, re-lock
+                self.bpm = estimate
+                self.outliers = 0
+                self.anchor = None
+            return
+        self.outliers = 0
+
+        alpha = 0.02 + 0.08 * confidence
+        if 135.0 <= estimate <= 145.0:
+            alpha *= 1.2
+        if change > 0.03:
+            alpha *= 0.5
+        self.bpm += alpha * (estimate - self.bpm)
+
+    def _update_phase(self, t):
+        period = self.period
+        if period <= 0:
+            return
+        if self.anchor is None:
+            self.anchor = t
+            return
+        beats = round((t - self.anchor) / period)
+        error = t - (self.anchor + beats * period)
+        # Only onsets near a predicted beat steer the phase; a run of
+        # off-grid onsets means we locked to the off-beat, so re-anchor
+        if abs(error) < 0.25 * period:
+            self.anchor += self.phase_gain * error
+            self.phase_misses = 0
+        else:
+            self.phase_misses += 1
+            if self.phase_misses >= 3:
+                self.anchor = t
+                self.phase_misses = 0
+                return
+        # Keep the anchor recent so float error doesn't grow
+        self.anchor += beats * period
+
+    def phase(self, now):
+        """Position inside the current beat, 0.0 (on the beat) to 1.0."""
+        if self.anchor is None or self.period <= 0:
+            return 0.0
+        return ((now - self.anchor) / self.period) % 1.0
+
+    def next_beat(self, now):
+        """Predicted time of the next beat after `now` (0.0 when not locked)."""
+        if self.anchor is None or self.period <= 0:
+            return 0.0
+        n = np.floor((now - self.anchor) / self.period) + 1
+        return float(self.anchor + n * self.period)
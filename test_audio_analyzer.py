@@ -0,0 +1,15 @@
+import numpy as np
+from audio_analyzer import RunningMedian
+
+
+def test_running_median_matches_numpy_over_a_sliding_window():
+    values = np.random.default_rng(1).normal(size=500)
+    values[::7] = 0.5  # Duplicates must be removed one at a time
+    for maxlen in (1, 2, 5, 43):
+        median = RunningMedian(maxlen)
+        assert median.median() == 0.0
+        for i, v in enumerate(values):
+            median.append(float(v))
+            window = values[max(0, i + 1 - maxlen):i + 1]
+            assert len(median) == len(window)
+            assert median.median() == np.median(window)
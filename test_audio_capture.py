@@ -0,0 +1,108 @@
+import numpy as np
+from audio_analyzer import AudioAnalyzer
+from audio_capture import CaptureRing
+from feature_stream import F_TIME, FeatureRing
+
+RATE = 44100
+
+
+def kick_train(beats=16, period=0.48, lead=1.5):
+    """Kick-only int16 track, first kick after the analyzer's warm-up."""
+    n = int((lead + beats * period + 0.5) * RATE)
+    x = np.random.default_rng(0).normal(0, 0.01, n)
+    t = np.arange(int(0.25 * RATE)) / RATE
+    kick = 0.8 * np.sin(2 * np.pi * (55 + 100 * np.exp(-t * 30)) * t) * np.exp(-t * 12)
+    times = lead + period * np.arange(beats)
+    for b in times:
+        s = int(b * RATE)
+        x[s:s + len(kick)] += kick
+    return (x * 32767).astype(np.int16), times
+
+
+def detect_beats(x, drain_every):
+    """Beat times from 256-sample callbacks, the worker draining every `drain_every` s."""
+    analyzer = AudioAnalyzer(rate=RATE, chunk=2048, hop=512)
+    analyzer.p = None
+    analyzer.features = FeatureRing(capacity=4096)
+    now = 0.0
+    analyzer.clock = lambda: now
+    beats = []
+    analyzer.on_beat_callback = beats.append
+    next_drain = 0.0
+    for i in range(0, len(x), 256):
+        now = min(i + 256, len(x)) / RATE
+        analyzer._audio_callback(x[i:i + 256].tobytes(), 256, {}, 0)
+        if now >= next_drain:
+            while analyzer._drain_hop():
+                pass
+            next_drain += drain_every
+    while analyzer._drain_hop():
+        pass
+    return np.array(beats)
+
+
+def test_ring_wraps_and_counts_overruns():
+    ring = CaptureRing(capacity=8)
+    out = np.zeros(3, dtype=np.int16)
+    assert ring.read(out) is None
+    ring.write(np.arange(5, dtype=np.int16), t_end=1.0)
+    assert ring.read(out) == 0 and list(out) == [0, 1, 2]
+    ring.write(np.arange(5, 10, dtype=np.int16), t_end=2.0)
+    assert ring.read(out) == 3 and list(out) == [3, 4, 5]  # Across the wrap
+    # 4 buffered, 4 free: the oldest 2 of the next 6 are dropped
+    assert ring.write(np.arange(10, 16, dtype=np.int16), t_end=3.0) == 2
+    assert ring.overruns == 2
+    assert ring.read(out) == 6 and list(out) == [6, 7, 8]
+    assert ring.read(out) == 9 and list(out) == [9, 12, 13]
+
+
+def test_overrun_keeps_buffered_timestamps():
+    rate = 10
+    ring = CaptureRing(capacity=8)
+    out = np.zeros(3, dtype=np.int16)
+    ring.write(np.arange(6, dtype=np.int16), t_end=0.5)        # Samples at 0.0 .. 0.5
+    assert ring.write(np.arange(6, dtype=np.int16), t_end=2.5) == 4  # 2.0 .. 2.5 kept
+    assert ring.read(out) == 0 and np.isclose(ring.time_of(0, rate), 0.0)
+    assert ring.read(out) == 3 and np.isclose(ring.time_of(3, rate), 0.3)
+    # First sample after the gap: 2.4, not 0.6
+    assert ring.read(np.zeros(2, dtype=np.int16)) == 6 and np.isclose(ring.time_of(6, rate), 2.4)
+    ring.write(np.arange(2, dtype=np.int16), t_end=2.7)
+    assert ring.read(np.zeros(2, dtype=np.int16)) == 8 and np.isclose(ring.time_of(8, rate), 2.6)
+
+
+def test_callback_capture_survives_a_stalled_worker():
+    rate, hop = 44100, 512
+    analyzer = AudioAnalyzer(rate=rate, chunk=2048, hop=hop)
+    analyzer.p = None
+    analyzer.features = FeatureRing(capacity=1024)
+    analyzer.clock = lambda: now
+    x = (np.random.default_rng(0).normal(0, 3000, rate)).astype(np.int16)
+    # Two seconds of 256-sample callbacks while the worker is stuck
+    now = 0.0
+    for i in range(0, len(x), 256):
+        now = min(i + 256, len(x)) / rate
+        analyzer._audio_callback(x[i:i + 256].tobytes(), 256, {}, 0)
+    assert analyzer.capture.available() == len(x)
+
+    def failing(t):
+        raise RuntimeError("handler")
+    analyzer.on_beat_callback = failing
+    while analyzer._drain_hop():
+        pass
+    rows, cursor = analyzer.features.read_since(0)
+    stats = analyzer.capture_stats()
+    assert cursor == len(x) // hop and stats["overruns"] == 0
+    # Hop timestamps follow the sample clock, not the (late) drain time
+    assert np.allclose(np.diff(rows[:, F_TIME]), hop / rate)
+    assert abs(rows[0, F_TIME]) < 1e-9
+
+
+def test_backlog_drained_in_bursts_finds_the_same_beats():
+    x, times = kick_train()
+    live = detect_beats(x, 0.0)
+    # One onset per kick: overlapping hops don't fire again on the kick's tail
+    assert len(live) == len(times) and np.abs(live - times).max() < 0.07
+    # Debounce runs on capture time, so late drains don't merge beats
+    for drain_every in (1.0, 2.0):
+        late = detect_beats(x, drain_every)
+        assert late.shape == live.shape and np.allclose(late, live)
@@ -0,0 +1,56 @@
+import wave
+import numpy as np
+import pytest
+from audio_analyzer import AudioAnalyzer
+from audio_sources import ArraySource, WavSource, load_beat_annotations
+from feature_stream import F_TIME, FeatureRing
+from test_audio_capture import RATE, kick_train
+
+
+def test_array_source_reads_hops_on_its_sample_clock():
+    source = ArraySource(np.array([0.0, 0.5, -2.0, 1.0]), rate=4)
+    assert source.samples.dtype == np.int16 and list(source.samples) == [0, 16383, -32767, 32767]
+    assert source.duration == 1.0 and source.clock() == 0.0
+    assert source.read(3) == source.samples[:3].tobytes()
+    assert source.clock() == 0.75
+    with pytest.raises(EOFError):
+        source.read(2)  # Never a short block
+    assert source.clock() == 0.75
+
+
+def test_wav_source_downmixes_to_mono(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    stereo = np.array([[100, 300], [-200, -400], [0, 10]], dtype=np.int16)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(stereo.tobytes())
+    source = WavSource(path)
+    assert source.rate == 8000 and list(source.samples) == [200, -300, 5]
+
+
+def test_beat_annotations(tmp_path):
+    path = tmp_path / "beats.txt"
+    path.write_text("# time label\n0.5 1\n\n1.0  # downbeat\n1.5\t3\n")
+    assert list(load_beat_annotations(str(path))) == [0.5, 1.0, 1.5]
+
+
+def test_replay_timestamps_follow_the_sample_clock():
+    x, times = kick_train()
+    analyzer = AudioAnalyzer(rate=RATE, chunk=2048, hop=512)
+    analyzer.features = FeatureRing(capacity=4096)
+    beats, tempos = [], []
+    analyzer.replay(ArraySource(x, RATE), callback=beats.append,
+                    tempo_callback=lambda bpm, next_beat, confidence: tempos.append((bpm, next_beat)))
+
+    hops = len(x) // 512
+    rows, _ = analyzer.features.read_since(0)
+    assert len(rows) == hops
+    assert np.allclose(rows[:, F_TIME], np.arange(hops) * 512 / RATE)  # First sample of each hop
+
+    assert len(beats) == len(times)
+    assert np.abs(np.array(beats) - times).max() < 0.07
+    bpm, next_beat = tempos[-1]
+    assert abs(bpm - 125.0) < 1.0
+    assert abs(next_beat - (times[-1] + 0.48)) < 0.07
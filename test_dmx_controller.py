@@ -0,0 +1,102 @@
+import pytest
+from dmx_controller import DMXController
+
+
+class InterruptedCopy(bytearray):
+    """Scratch buffer whose fill runs `write` first, like a writer landing mid-copy."""
+
+    def __init__(self, size, write):
+        super().__init__(size)
+        self.write = write
+
+    def __setitem__(self, index, value):
+        self.write()
+        super().__setitem__(index, value)
+
+
+def controller():
+    return DMXController(port="/dev/null", auto_detect=False)
+
+
+def test_swap_publishes_consistent_frames_only():
+    dmx = controller()
+    dmx.set_range(1, [10, 20, 30])
+    dmx._swap_buffers()
+    assert list(dmx._front[:4]) == [0, 10, 20, 30]
+
+    # Writer in progress (odd seq): nothing is copied, the previous frame stays
+    dmx._seq += 1
+    dmx.dmx_data[1] = 99
+    dmx._swap_buffers()
+    dmx._seq += 1
+    assert dmx._front[1] == 10
+
+    # Finished write is picked up on the next swap
+    dmx._swap_buffers()
+    assert dmx._front[1] == 99
+
+
+def test_torn_copy_is_dropped_and_previous_frame_resent():
+    dmx = controller()
+    dmx.set_channel(1, 50)
+    dmx._swap_buffers()
+    front = dmx._front
+
+    dmx.set_channel(1, 60)
+    scratch = dmx._scratch
+    dmx._scratch = InterruptedCopy(len(dmx.dmx_data), lambda: dmx.set_channel(2, 70))
+    dmx._swap_buffers()
+    assert dmx._front is front and list(front[1:3]) == [50, 0]
+
+    dmx._scratch = scratch
+    dmx._swap_buffers()
+    assert list(dmx._front[1:3]) == [60, 70]
+
+
+class FakePort:
+    is_open = True
+    break_condition = False
+
+    def write(self, data):
+        self.sent = bytes(data)
+
+    def flush(self):
+        pass
+
+
+class ViewLog:
+    def __init__(self):
+        self.frames = []
+
+    def publish(self, frame):
+        self.frames.append((frame, bytes(frame)))
+
+
+def test_monitor_gets_the_sent_frame_through_cached_views():
+    dmx = controller()
+    dmx.DMX_BREAK_TIME = dmx.DMX_MAB_TIME = 0.0
+    dmx.serial_port = FakePort()
+    dmx.monitor = ViewLog()
+    for value in (10, 20, 30):
+        dmx.set_channel(1, value)
+        dmx._send_dmx_frame()
+    dmx._send_dmx_frame()  # Nothing changed: same buffer resent
+    sent = [data[0] for _, data in dmx.monitor.frames]
+    assert sent == [10, 20, 30, 30] and dmx.monitor.frames[-1][1] == dmx.serial_port.sent[1:]
+    views = [view for view, _ in dmx.monitor.frames]
+    # Only the two buffers' prebuilt views are ever published
+    assert views[0] is views[2] is views[3] and views[1] is not views[0]
+    assert views[1] is dmx._scratch_view and views[0] is dmx._front_view
+
+
+def test_set_range_validates_bounds_and_values():
+    dmx = controller()
+    dmx.set_range(510, b"\x01\x02\x03")
+    assert dmx.get_universe_data()[-3:] == [1, 2, 3]
+    seq = dmx._seq
+
+    for start, values in ((0, [1]), (511, [1, 2, 3]), (1, [256]), (1, [-1])):
+        with pytest.raises(ValueError):
+            dmx.set_range(start, values)
+    assert dmx._seq == seq  # Rejected before the writer section
+    assert dmx.get_universe_data()[-3:] == [1, 2, 3]
@@ -0,0 +1,46 @@
+import numpy as np
+from dmx_sender import DMXSender
+from frame_recorder import read_frames
+from universe_monitor import UniverseMonitor
+
+
+def test_recording_every_tick_with_sized_capacity(tmp_path):
+    path = str(tmp_path / "frames.dmxrec")
+    sender = DMXSender(port="virtual", keepalive_rate=float("inf"),
+                       record_path=path, record_capacity=8)
+    sender.start(threaded=False)
+    for i in range(10):
+        if i % 3 == 0:
+            sender.set_channel(1, i)
+        assert sender.send_due(now=i * 0.025)  # Unchanged frames go out too
+    sender.stop()
+
+    timestamps, frames = read_frames(path)
+    assert sender.recorder.count == 10 and len(frames) == 8  # Oldest two overwritten
+    assert timestamps[0] < timestamps[-1] and np.all(np.diff(timestamps) > 0)
+    assert list(frames[:, 1]) == [0, 3, 3, 3, 6, 6, 6, 9]
+
+
+def test_dirty_flag_and_keepalive():
+    tick = 1 / 32.0  # Exact in binary, so keep-alive spacing is too
+    sender = DMXSender(port="virtual", max_rate=32.0, keepalive_rate=4.0)
+    assert not sender.send_due(now=0.0)  # No output at all: nothing to send to
+    sender.monitor = UniverseMonitor(sender.num_channels)
+
+    assert sender.send_due(now=0.0)  # Initial frame
+    assert not sender.send_due(now=tick)
+    sender.set_channel(1, 0)  # Same value: still clean
+    sender.set_frame(bytes(4), start=2)
+    sender.set_channel(sender.num_channels + 1, 255)  # Outside the reduced range
+    assert not sender.dirty and not sender.send_due(now=2 * tick)
+
+    sender.set_frame(bytes([1, 2]), start=sender.num_channels - 1)
+    assert sender.dirty and sender.send_due(now=3 * tick)
+    sender.monitor.poll()
+    assert list(sender.monitor.shown[-2:]) == [1, 2]
+    assert not sender.send_due(now=4 * tick)
+
+    # Static output: one keep-alive every 1 / keepalive_rate seconds
+    sent = [i for i in range(4, 40) if sender.send_due(now=i * tick)]
+    assert sent == [11, 19, 27, 35]
+    assert sender.frames_sent == 6
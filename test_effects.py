@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from effects import BLENDS, PRESETS, Layers, Static, create_effect
+from fixtures import Patch
+from lighting_controller import LightingController
+from pixel_map import PixelEffect  # Registers the pixel presets
+
+
+def test_every_ui_preset_is_registered():
+    for name in ("techno_red", "white_kick", "digital_decay", "strobe_white", "blackout"):
+        assert name in PRESETS
+    assert create_effect("vivid_pop").name == "rainbow_flow"
+    with pytest.raises(ValueError):
+        create_effect("no_such_preset")
+
+
+def test_unknown_preset_keeps_current_one(controller):
+    controller.set_preset("acid_green")
+    controller.set_preset("no_such_preset")
+    assert controller.mode == "acid_green"
+
+
+def test_blend_modes():
+    a = np.array([0, 100, 255], dtype=np.float32)
+    b = np.array([255, 100, 0], dtype=np.float32)
+    out = np.zeros(3, dtype=np.float32)
+    BLENDS["multiply"](a, b, out)
+    assert np.allclose(out, [0, 100 * 100 / 255, 0])
+    BLENDS["screen"](a, b, out)
+    assert np.allclose(out, [255, 200 - 100 * 100 / 255, 255])
+
+
+def test_layers_render_with_opacity(controller):
+    stack = Layers((Static((200, 0, 0)), "replace"), (Static((0, 0, 200)), "add", 0.5))
+    frame = np.zeros(controller.patch.size, dtype=np.uint8)
+    stack.compile(controller)(0.0, frame)
+    # Panel 1: dimmer at channel 10, RGB at 11-13
+    assert list(frame[9:13]) == [255, 200, 0, 100]
+
+
+def test_crossfade_blends_and_hands_over(controller):
+    controller.bpm = 120.0
+    controller.clock = lambda: 10.0
+    controller.output_latency = 0.0
+    controller.audio_reactive = False  # Constant kick level
+    controller.set_preset("techno_red", fade_beats=0)
+    controller.set_preset("acid_green", fade_beats=1)  # 0.5 s, no beat yet: starts now
+    controller._render(10.25)
+    assert list(controller.frame[10:13]) == [127, 127, 0]
+    controller._render(10.6)
+    assert list(controller.frame[10:13]) == [0, 255, 0]
+    assert controller.active[0].name == "acid_green"
+
+
+def test_crossfade_throttles_source_over_budget(controller):
+    controller.clock = lambda: 10.0
+    controller.fade_budget = 0.0
+    controller.set_preset("acid_green", fade_beats=4)
+    fade = controller.last_transition
+    for i in range(1, 40):
+        controller._render(10.0 + i * 0.025)
+    assert fade.source_every == fade.MAX_SOURCE_EVERY
+    assert fade.source_renders < fade.frames
+
+
+def test_pixel_presets_render_without_rgb_cells(sender):
+    patch = Patch(profiles={"dimmer": {"channels": 1, "dimmer": [0]}})
+    patch.add("house", "dimmer", 1)
+    controller = LightingController(sender, patch=patch)
+    controller.spectrum = np.full(8, 0.5, dtype=np.float32)
+    pixel = [name for name, factory in PRESETS.items()
+             if isinstance(factory, type) and issubclass(factory, PixelEffect)]
+    assert {"pixel_chase", "pixel_rainbow", "pixel_noise", "spectrum"} <= set(pixel)
+    for name in pixel:
+        controller.set_preset(name, 0)
+        assert controller.mode == name
+        controller.update(1.0)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from audio_analyzer import AudioAnalyzer
+from audio_sources import ArraySource
+from feature_stream import F_BANDS, F_HAT, F_KICK, F_RMS, F_TIME, FEATURE_WIDTH, FeatureRing
+from onset_classifier import OnsetClassifier
+
+
+def test_ring_latest_and_read_since():
+    ring = FeatureRing(capacity=4, width=2)
+    assert ring.latest() is None
+    for i in range(6):
+        ring.claim()[:] = (i, i * 10)
+        ring.publish()
+    assert list(ring.latest()) == [5, 50]
+    rows, cursor = ring.read_since(0)
+    # Lapped reader: only the rows that can't be mid-overwrite
+    assert list(rows[:, 0]) == [3, 4, 5] and cursor == 6
+    ring.claim()[:] = (6, 60)
+    ring.publish()
+    rows, cursor = ring.read_since(cursor)
+    assert list(rows[:, 0]) == [6] and cursor == 7
+
+
+def test_analyzer_publishes_a_row_per_hop():
+    rate = 44100
+    t = np.arange(rate) / rate
+    # Silence, then a 60 Hz burst and a high noise burst half a second later
+    x = np.zeros(2 * rate, dtype=np.float32)
+    x[rate:rate + 4000] = 0.8 * np.sin(2 * np.pi * 60 * t[:4000])
+    noise = np.diff(np.random.default_rng(0).normal(0, 0.3, 2001))
+    x[rate + rate // 2:rate + rate // 2 + 2000] = noise
+
+    analyzer = AudioAnalyzer(rate=rate, chunk=2048, hop=512)
+    analyzer.features = FeatureRing(capacity=512)
+    analyzer.replay(ArraySource(x, rate))
+    rows, cursor = analyzer.features.read_since(0)
+    assert cursor == len(x) // 512
+    assert np.all(np.diff(rows[:, F_TIME]) > 0)
+    assert rows[:, F_RMS].max() > 0.4
+
+    kick_t = rows[np.argmax(rows[:, F_KICK]), F_TIME]
+    hat_t = rows[np.argmax(rows[:, F_HAT]), F_TIME]
+    assert abs(kick_t - 1.0) < 0.05
+    assert abs(hat_t - 1.5) < 0.05
+    assert rows[:, F_BANDS].shape[1] == 16
+
+
+def test_classifier_dispatches_typed_onsets():
+    classifier = OnsetClassifier(warmup_hops=5)
+    kicks, everything = [], []
+    classifier.subscribe("kick", kicks.append)
+    classifier.subscribe("*", everything.append)
+    row = np.zeros(FEATURE_WIDTH)
+    for i in range(100):
+        row[:] = 0.0
+        row[F_TIME] = i * 0.01
+        if i in (20, 60):
+            row[F_KICK] = 10.0
+        if i == 40:
+            row[F_HAT] = 10.0
+        classifier.process(row)
+    assert [e.t for e in kicks] == [0.2, 0.6]
+    assert [e.kind for e in everything] == ["kick", "hat", "kick"]
+    with pytest.raises(ValueError):
+        classifier.subscribe("clap", print)
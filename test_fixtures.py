@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from color_lut import HUE_WHEEL, hue_to_rgb
+from fixtures import Patch
+
+
+def render(patch, level):
+    frame = np.zeros(patch.size, dtype=np.uint8)
+    colors = np.full((3, 3), 255, dtype=np.float32)
+    patch.render(frame, colors, np.full(3, level, dtype=np.float32))
+    return frame
+
+
+def test_level_goes_through_gamma_and_dimmer():
+    patch = Patch()
+    patch.add("bar", "rgb_3ch", 1)
+    patch.add("panel", "rgb_panel_4ch", 10)
+    frame = render(patch, 0.5)
+    # No dimmer: colour x 0.5 ** 2.2
+    assert list(frame[0:3]) == [int(255 * 0.5 ** 2.2)] * 3
+    # Dimmer: level on the dimmer, full colour on RGB
+    assert list(frame[9:13]) == [int(255 * 0.5 ** 2.2), 255, 255, 255]
+
+
+def test_fine_dimmer_is_16_bit():
+    patch = Patch()
+    patch.add("par", "rgb_par_16bit", 1)
+    values = set()
+    for level in np.linspace(0.0, 0.1, 50):
+        frame = render(patch, level)
+        values.add(int(frame[0]) << 8 | int(frame[1]))
+    # 8-bit linear output would only have a handful of steps down here
+    assert len(values) > 40
+    assert list(render(patch, 1.0)[0:5]) == [255, 255, 255, 255, 255]
+
+
+def test_hue_wheel():
+    assert list(hue_to_rgb(0.0)) == [255, 0, 0]
+    assert list(hue_to_rgb(1.0 / 3)) == [0, 255, 0]
+    assert hue_to_rgb(np.array([0.1, 0.6])).shape == (2, 3)
+    assert HUE_WHEEL.max() == 255
+
+
+def test_output_master_and_hue_shift():
+    patch = Patch()
+    patch.add("par", "rgb_par_16bit", 1)
+    frame = np.zeros(patch.size, dtype=np.uint8)
+    frame[patch.rgb_idx[0]] = (200, 0, 0)
+    frame[patch.dimmer_idx] = 255
+    out = np.empty_like(frame)
+    patch.apply_output(frame, out, master=0.5, hue=1.0 / 3)
+    assert list(out[patch.rgb_idx[0]]) == [0, 100, 0]  # Red -> green, halved
+    assert out[patch.dimmer_idx[0]] == 255
+    frame[patch.rgb_idx[0]] = 180
+    patch.apply_output(frame, out, hue=0.4)
+    assert list(out[patch.rgb_idx[0]]) == [180, 180, 180]  # Greys don't shift
+
+
+def test_pixel_cells_are_placed_and_projected():
+    patch = Patch(profiles={"bar": {"pixels": [4, 1], "gamma": 1.0}}, size=1024)
+    patch.add("bar", "bar", 1, universe=1, x=0.0, width=1.0)
+    assert list(patch.cell_xy[:, 0]) == [0.125, 0.375, 0.625, 0.875]
+
+    frame = np.zeros(patch.size, dtype=np.uint8)
+    colors = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255], [255, 255, 255]], dtype=np.float32)
+    patch.render_cells(frame, colors, np.array([1.0, 1.0, 1.0, 0.5], dtype=np.float32))
+    assert list(frame[512:524]) == [255, 0, 0, 0, 255, 0, 0, 0, 255, 127, 127, 127]
+
+
+def test_patch_validates_and_compiles_addresses():
+    patch = Patch(size=1024)
+    bad = [("nope", 1, {}), ("rgb_3ch", 1, {"group": "p9"}), ("rgb_3ch", 0, {}),
+           ("rgb_3ch", 513, {}), ("rgb_3ch", 1, {"universe": 2}), ("rgb_3ch", 1, {"universe": -1}),
+           ("rgb_3ch", 511, {}), ("party_bar_15ch", 500, {"universe": 1})]  # Last two: past the end
+    for profile, address, kwargs in bad:
+        with pytest.raises(ValueError):
+            patch.add("x", profile, address, **kwargs)
+    assert patch.fixtures == []
+
+    patch.add("bar", "party_bar_15ch", 1, group="p1")
+    patch.add("par", "rgb_par_16bit", 1, universe=1)  # Channel 513
+    patch.add("edge", "rgb_3ch", 510)  # Ends on channel 512
+    assert patch.rgb_idx.tolist() == [[0, 1, 2], [5, 6, 7], [9, 10, 11], [514, 515, 516], [509, 510, 511]]
+    assert patch.white_idx.tolist() == [3, 8, 12] and patch.rotation_idx.tolist() == [4, 13]
+    assert patch.dimmer_idx.tolist() == [512] and patch.fine_idx.tolist() == [513]
+    assert patch.strobe_idx.tolist() == [5, 6, 7, 514, 515, 516, 509, 510, 511, 8]  # Only the bar's middle cell
+    assert list(patch.cell_group) == [0, 0, 0, 2, 2]
+
+    patch.set_address("par", 101)
+    assert patch.rgb_idx[3].tolist() == [102, 103, 104] and patch.dimmer_idx.tolist() == [100]
+    for name, address in (("par", 1025), ("par", 510), ("nope", 1)):
+        with pytest.raises(ValueError):
+            patch.set_address(name, address)
+    assert patch.dimmer_idx.tolist() == [100]
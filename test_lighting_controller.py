@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from lighting_controller import LightingController
+
+
+@pytest.fixture
+def sender(sender):
+    sender.output_latency = 0.004  # Light shows 4 ms after the send
+    return sender
+
+
+def run_frames(controller, start, count, interval=0.025):
+    fired = []
+    for i in range(count):
+        t = start + i * interval
+        before = controller.beat_count
+        controller.update(t)
+        if controller.beat_count != before:
+            fired.append((t, controller.last_visual_beat_time))
+    return fired
+
+
+def test_predicted_beat_lands_on_nearest_frame(controller):
+    controller.bpm = 0  # No flywheel
+    controller.on_tempo(120.0, next_beat_time=10.5, confidence=0.9)
+    fired = run_frames(controller, 10.0, 40)
+    assert len(fired) == 1
+    frame_time, beat_time = fired[0]
+    assert beat_time == 10.5
+    # Light time (send + output latency) within half a frame of the beat
+    assert abs(frame_time + 0.004 - 10.5) <= 0.0125
+
+
+def test_detection_of_predicted_beat_is_not_doubled(controller):
+    controller.bpm = 0
+    controller.on_tempo(120.0, next_beat_time=10.5, confidence=0.9)
+    run_frames(controller, 10.0, 22)  # Up to ~10.53
+    controller.on_beat(10.51)  # The analyser catches the same kick late
+    fired = run_frames(controller, 10.55, 10)
+    assert fired == []
+    assert controller.beat_count == 1
+
+
+def test_low_confidence_tempo_is_not_scheduled(controller):
+    controller.bpm = 0
+    controller.on_tempo(120.0, next_beat_time=10.5, confidence=0.1)
+    assert run_frames(controller, 10.0, 40) == []
+
+
+def test_commands_apply_between_frames_as_one_batch(controller):
+    controller.update(1.0)
+    controller.commands.post_batch([("set_param", "master", 0.5), ("set_param", "hue", 0.25)])
+    controller.commands.post("set_preset", "acid_green", 0)
+    controller.commands.post("set_param", "volume", 1.0)  # Rejected on the render thread
+    assert controller.state.master == 1.0 and controller.mode == "techno_red"
+    controller.update(1.025)
+    state = controller.state
+    assert (state.master, state.hue, state.mode) == (0.5, 0.25, "acid_green")
+    assert state.frame_time == 1.025 + controller.output_latency
+    assert controller.commands.applied == 3 and controller.commands.errors == 1
+    with pytest.raises(ValueError):
+        controller.commands.post("shutdown")
+
+
+class FrameLog:
+    output_latency = 0.0
+
+    def __init__(self):
+        self.calls = []
+
+    def set_frame(self, frame, start=1):
+        self.calls.append((frame, bytes(frame), start))
+
+
+def test_each_update_hands_one_whole_frame_to_the_sender():
+    sender = FrameLog()
+    controller = LightingController(sender)
+    controller.set_preset("acid_green", 0)
+    for i in range(3):
+        controller.update(1.0 + i * 0.025)
+    assert len(sender.calls) == 3
+    assert all(frame is controller.frame and start == 1 for frame, _, start in sender.calls)
+    assert len(sender.calls[-1][1]) == controller.patch.size and any(sender.calls[-1][1])
+
+    # Master dimming goes through the separate output buffer; the rendered frame is untouched
+    controller.set_param("master", 0.5)
+    controller.update(1.075)
+    frame, sent, _ = sender.calls[-1]
+    assert frame is controller.output
+    rgb = controller.patch.rgb_idx
+    assert np.all(np.frombuffer(sent, dtype=np.uint8)[rgb] <= controller.frame[rgb] // 2 + 1)
+    assert controller.frame[rgb].max() == 255
+
+
+def test_a_failing_command_is_dropped_and_the_frame_renders(controller, sender):
+    def broken(fixture, addr):
+        raise RuntimeError("patch file locked")
+    controller.set_address = broken
+    controller.update(1.0)
+    controller.commands.post_batch([("set_address", "panel1", 5), ("set_param", "master", 0.5)])
+    controller.update(1.025)
+    assert controller.commands.errors == 1 and controller.commands.applied == 1
+    assert controller.state.master == 0.5 and controller.state.frame_time == 1.025 + sender.output_latency
+    controller.commands.post("set_address", "panel1", 5)
+    controller.update(1.05)
+    assert controller.commands.errors == 2 and controller.state.frame_time == 1.05 + sender.output_latency
@@ -0,0 +1,57 @@
+import threading
+import pytest
+import dmx_controller  # noqa: F401 - the modules below register the process metrics
+import dmx_sender  # noqa: F401
+import lighting_controller  # noqa: F401
+import render_scheduler  # noqa: F401
+import web_server  # noqa: F401
+import metrics
+from metrics import Registry
+
+
+def test_per_thread_shards_and_text_format():
+    registry = Registry()
+    hits = registry.counter("test_hits_total", "Hits")
+    latency = registry.histogram("test_latency_seconds", "Latency", (0.001, 0.01))
+    assert registry.counter("test_hits_total", "Hits") is hits
+
+    def work():
+        for i in range(1000):
+            hits.inc()
+            latency.observe(0.005 if i % 2 else 0.0005)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(hits.shards) == 4 and hits.value == 4000
+    assert latency.count == 4000
+
+    text = registry.render()
+    assert "# TYPE test_hits_total counter\ntest_hits_total 4000\n" in text
+    assert 'test_latency_seconds_bucket{le="0.001"} 2000\n' in text
+    assert 'test_latency_seconds_bucket{le="0.01"} 4000\n' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 4000\n' in text
+    assert "test_latency_seconds_count 4000\n" in text
+
+
+def test_one_definition_per_name():
+    registry = Registry()
+    hits = registry.counter("test_hits_total", "Hits")
+    latency = registry.histogram("test_latency_seconds", "Latency", (0.01, 0.001))
+    # Same definition again (a second importer): the same object
+    assert registry.counter("test_hits_total", "Hits") is hits
+    assert registry.histogram("test_latency_seconds", "Latency", (0.001, 0.01)) is latency
+    with pytest.raises(ValueError):
+        registry.histogram("test_hits_total", "Hits")
+    with pytest.raises(ValueError):
+        registry.counter("test_hits_total", "Other help")
+    with pytest.raises(ValueError):
+        registry.histogram("test_latency_seconds", "Latency", (0.001, 0.1))
+
+    text = registry.render()
+    assert text.count("# TYPE test_hits_total ") == 1 and text.count("# HELP test_hits_total ") == 1
+
+
+def test_process_registry_has_no_duplicate_families():
+    types = [line.split()[2] for line in metrics.render().splitlines() if line.startswith("# TYPE ")]
+    assert len(types) == len(set(types)) and "vj_serial_write_seconds" in types
@@ -0,0 +1,69 @@
+import time
+import mido
+from midi_controller import MIDIController
+from transitions import Crossfade
+
+
+def test_notes_from_a_virtual_port_apply_on_the_next_frame(controller):
+    midi = MIDIController(controller)
+    port = mido.ports.EchoPort()
+    midi.start(port)
+    port.send(mido.Message("note_on", note=64, velocity=127))
+    deadline = time.perf_counter() + 1.0
+    while not midi.inbox and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    midi.stop()
+    assert controller.mode == "techno_red"  # Nothing changes off the render thread
+    controller.update()
+    assert controller.mode == "rainbow_flow"
+    assert 0.0 <= midi.latency < 1.0
+
+
+def test_cc_bursts_coalesce_to_one_value_per_frame(controller, sender):
+    controller.set_preset("code_red", 0)
+    midi = MIDIController(controller)
+    controller.update(1.0)
+    full = sender.frame
+    for v in range(127, 63, -1):
+        midi.receive(mido.Message("control_change", control=7, value=v), t=1.0)
+    controller.update(1.025)
+    assert midi.coalesced == 63 and midi.events == 64
+    assert abs(controller.master - 64 / 127.0) < 1e-6
+    red = controller.patch.rgb_idx[:, 0]
+    lit = [i for i in red if full[i]]
+    assert lit and all(abs(sender.frame[i] - full[i] * 64 / 127.0) <= 1 for i in lit)
+    assert abs(midi.latency - 0.025) < 1e-9
+
+    midi.receive(mido.Message("control_change", control=1, value=127))
+    midi.receive(mido.Message("control_change", control=74, value=32))
+    controller.update(1.05)
+    assert controller.speed == 4.0 and controller.hue == 0.25
+
+
+class PresetLog:
+    def __init__(self):
+        self.inputs = []
+        self.calls = []
+
+    def set_preset(self, name, fade_beats=None):
+        self.calls.append((name, fade_beats))
+
+
+def test_velocity_sets_the_fade(controller):
+    log = PresetLog()
+    midi = MIDIController(log, max_fade_beats=2.0)
+    for velocity in (127, 64, 1):
+        midi.receive(mido.Message("note_on", note=48, velocity=velocity), t=0.0)
+    midi.drain(log, 0.0)
+    assert [name for name, _ in log.calls] == ["techno_red"] * 3
+    fades = [fade for _, fade in log.calls]
+    assert fades[0] == 0.0 and abs(fades[1] - 2.0 * 63 / 127) < 1e-9 and abs(fades[2] - 2.0 * 126 / 127) < 1e-9
+
+    # On the controller: full velocity switches on this frame, softer hits crossfade
+    midi = MIDIController(controller)
+    midi.receive(mido.Message("note_on", note=50, velocity=127))
+    controller.update()
+    assert controller.active[0].name == "acid_green" and not isinstance(controller.active[0], Crossfade)
+    midi.receive(mido.Message("note_on", note=64, velocity=64))
+    controller.update()
+    assert isinstance(controller.active[0], Crossfade) and controller.active[0].name == "rainbow_flow"
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the Art-Net / sACN outputs against a local UDP listener
+"""
+
+import socket
+import struct
+import pytest
+from dmx_sender import DMXSender
+from network_outputs import ArtNetSender, SACNSender, OutputRouter
+
+
+def _listener():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    return sock, sock.getsockname()[1]
+
+
+def test_artnet_packet():
+    sock, port = _listener()
+    out = ArtNetSender(host="127.0.0.1", port=port)
+    data = bytes(range(1, 8))  # odd length gets padded
+    out.send(0x123, data)
+    pkt, _ = sock.recvfrom(1024)
+
+    assert pkt[:8] == b"Art-Net\x00"
+    assert struct.unpack("<H", pkt[8:10])[0] == 0x5000
+    assert struct.unpack(">H", pkt[10:12])[0] == 14
+    assert pkt[12] == 1  # sequence starts at 1
+    assert pkt[14] == 0x23 and pkt[15] == 0x01  # SubUni, Net
+    assert struct.unpack(">H", pkt[16:18])[0] == 8
+    assert pkt[18:25] == data and pkt[25] == 0
+    out.close(); sock.close()
+
+
+def test_sacn_packet():
+    sock, port = _listener()
+    out = SACNSender(host="127.0.0.1", port=port)
+    data = bytes([255] * 512)
+    out.send(7, data)
+    pkt, _ = sock.recvfrom(1024)
+
+    assert len(pkt) == 638
+    assert pkt[4:16] == b"ASC-E1.17\x00\x00\x00"
+    assert struct.unpack(">H", pkt[16:18])[0] == 0x7000 | 622
+    assert struct.unpack(">H", pkt[38:40])[0] == 0x7000 | 600
+    assert struct.unpack(">H", pkt[113:115])[0] == 7  # universe
+    assert struct.unpack(">H", pkt[115:117])[0] == 0x7000 | 523
+    assert struct.unpack(">H", pkt[123:125])[0] == 513  # start code + 512 slots
+    assert pkt[125] == 0 and pkt[126:] == data
+    out.close(); sock.close()
+
+
+def test_router_skips_unchanged_universes():
+    sock, port = _listener()
+    router = OutputRouter(universes=2, keepalive=1.0)
+    router.add_output(ArtNetSender(host="127.0.0.1", port=port), local=0)
+    router.add_output(ArtNetSender(host="127.0.0.1", port=port), local=1)
+
+    assert router.tick(now=10.0) == 2   # first frame goes out everywhere
+    assert router.tick(now=10.1) == 0   # nothing changed
+    router.set_channel(513, 200)        # universe 1, channel 1
+    assert router.tick(now=10.2) == 1
+    assert router.tick(now=11.5) == 2   # keep-alive
+
+    received = []
+    for _ in range(5):
+        pkt, _ = sock.recvfrom(1024)
+        received.append((pkt[14], pkt[18]))
+    assert (1, 200) in received
+    router.stop(); sock.close()
+
+
+class FailingOutput:
+    def __init__(self):
+        self.calls = 0
+
+    def send(self, universe, data):
+        self.calls += 1
+        raise RuntimeError("unplugged")
+
+
+def test_router_validates_universes_and_isolates_failures():
+    router = OutputRouter(universes=2)
+    with pytest.raises(ValueError):
+        router.add_output(SACNSender(host="127.0.0.1"))  # Default universe 0 is not valid sACN
+    with pytest.raises(ValueError):
+        router.add_output(ArtNetSender(host="127.0.0.1"), universe=0x8000)
+    with pytest.raises(ValueError):
+        router.add_output(DMXSender(port="virtual"), local=1)  # The dongle is universe 0
+    with pytest.raises(ValueError):
+        router.add_output(ArtNetSender(host="127.0.0.1"), local=2)
+    assert router.routes == [[], []]
+
+    sock, port = _listener()
+    broken = FailingOutput()
+    dmx = DMXSender(port="virtual")
+    router.add_output(broken, local=1)
+    router.add_output(SACNSender(host="127.0.0.1", port=port), local=1, universe=1)
+    router.add_output(dmx, local=1, universe=0)
+    router.set_channel(513, 42)
+    assert router.tick(now=1.0) == 1
+    assert broken.calls == 1 and router.output_errors == 1
+    pkt, _ = sock.recvfrom(1024)
+    assert pkt[126] == 42 and dmx.dmx_data[0] == 42
+    with pytest.raises(ValueError):
+        dmx.send(1, bytes(4))
+    router.stop(); sock.close()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import render_scheduler
+from render_scheduler import RenderScheduler
+
+
+class FakeClock:
+    """perf_counter/sleep stand-in: sleeps jump ahead, each reading costs 10 us."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        self.now += 0.00001
+        return self.now
+
+    def sleep(self, delay):
+        self.now += delay
+
+
+class Recorder:
+    def __init__(self, clock, stall_at=None, stall=0.0):
+        self.clock = clock
+        self.stall_at = stall_at
+        self.stall = stall
+        self.renders = []  # (clock, frame deadline)
+        self.sends = []
+
+    def update(self, deadline):
+        self.renders.append((self.clock.now, deadline))
+        if len(self.renders) == self.stall_at:
+            self.clock.now += self.stall
+
+    def send_due(self, now):
+        self.sends.append(now)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(render_scheduler.time, "perf_counter", clock.perf_counter)
+    monkeypatch.setattr(render_scheduler.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_render_hz_must_divide_output_hz():
+    RenderScheduler(None, None, output_hz=40, render_hz=20)
+    RenderScheduler(None, None, output_hz=60, render_hz=20)
+    for render_hz in (30, 41, 15):
+        with pytest.raises(ValueError):
+            RenderScheduler(None, None, output_hz=40, render_hz=render_hz)
+
+
+def test_renders_lead_and_sends_hit_the_deadlines(clock):
+    out = Recorder(clock)
+    scheduler = RenderScheduler(out, out, output_hz=40, render_hz=20, render_lead=0.004)
+    start = clock.now
+    scheduler.run(duration=0.5)
+
+    deadlines = np.array([d for _, d in out.renders])
+    assert scheduler.frames == len(out.sends) == 20 and scheduler.renders == len(out.renders) == 10
+    assert np.allclose(np.diff(deadlines), 0.05)  # Every other output frame
+    assert abs(deadlines[0] - (start + 0.025)) < 0.001
+    lead = deadlines - [t for t, _ in out.renders]
+    assert np.all((lead > 0.0035) & (lead <= 0.004))
+    sends = np.array(out.sends)
+    assert np.allclose(sends[::2], deadlines, atol=0.0001)
+    assert np.allclose(np.diff(sends), 0.025, atol=0.0001)
+    assert scheduler.missed_deadlines == 0 and scheduler.send_jitter < 0.0001
+
+
+def test_stall_counts_one_miss_and_resyncs_without_a_burst(clock):
+    out = Recorder(clock, stall_at=5, stall=0.1)
+    scheduler = RenderScheduler(out, out, output_hz=40)
+    scheduler.run(duration=0.5)
+
+    assert scheduler.missed_deadlines == 1
+    assert 0.095 < scheduler.max_late < 0.1
+    gaps = np.diff(out.sends)
+    assert gaps[3] > 0.1  # The stalled frame
+    assert np.allclose(np.delete(gaps, 3), 0.025, atol=0.0001)  # Then the regular pace, no catch-up
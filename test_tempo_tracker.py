@@ -0,0 +1,68 @@
+import numpy as np
+from audio_analyzer import AudioAnalyzer
+from tempo_tracker import TempoTracker
+
+
+def onset_train(bpm, beats, start=0.0, jitter=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return start + np.arange(beats) * 60.0 / bpm + rng.normal(0, jitter, beats)
+
+
+def feed(tracker, times):
+    for t in times:
+        tracker.add_onset(t)
+    return tracker.bpm
+
+
+def test_converges_to_the_tempo():
+    for bpm in (90.0, 124.0, 140.0, 174.0):
+        tracker = TempoTracker()
+        feed(tracker, onset_train(bpm, 32, jitter=0.004))
+        assert abs(tracker.bpm - bpm) <= 1.0, bpm
+        assert tracker.confidence > 0.8
+
+
+def test_no_estimate_before_enough_onsets():
+    tracker = TempoTracker()
+    assert feed(tracker, onset_train(128.0, 5)) == 0.0
+    assert tracker.next_beat(1.0) == 0.0 and tracker.phase(1.0) == 0.0
+
+
+def test_outliers_are_ignored_and_a_tempo_change_relocks():
+    tracker = TempoTracker()
+    times = list(onset_train(124.0, 24))
+    # A few stray onsets (fills, snares) between the kicks
+    for i in (10, 15, 20):
+        times.append(times[i] + 0.17)
+    feed(tracker, sorted(times))
+    assert abs(tracker.bpm - 124.0) <= 1.0
+
+    # The next track is at 140: sustained disagreement re-locks the grid
+    feed(tracker, onset_train(140.0, 40, start=times[-1] + 60.0 / 140.0))
+    assert abs(tracker.bpm - 140.0) <= 1.0
+
+
+def test_phase_and_next_beat_follow_the_grid():
+    bpm = 120.0
+    times = onset_train(bpm, 32, start=0.013, jitter=0.003, seed=1)
+    tracker = TempoTracker()
+    feed(tracker, times)
+    last = 0.013 + 31 * 0.5  # Where the last beat really was
+    for offset in (0.1, 0.25, 0.4):
+        assert abs(tracker.next_beat(last + offset) - (last + 0.5)) < 0.01
+        assert abs(tracker.phase(last + offset) - offset / 0.5) < 0.03
+    # Off-beat onsets for a while: the grid re-anchors onto them
+    feed(tracker, times[-1] + 0.25 + np.arange(1, 9) * 0.5)
+    assert abs(tracker.next_beat(last + 4.8) - (last + 5.25)) < 0.02  # Not last + 5.0
+
+
+def test_analyzer_predicts_the_beat_after_the_onset():
+    analyzer = AudioAnalyzer(rate=44100, chunk=2048, hop=512)
+    predicted = []
+    analyzer.on_tempo_callback = lambda bpm, next_beat, confidence: predicted.append(next_beat)
+    times = onset_train(120, 32, jitter=0.003)
+    for t in times:
+        analyzer._update_tempo(t)
+    # Onsets land a little either side of the grid; the prediction is always the next beat
+    ahead = np.array(predicted[-16:]) - times[-16:]
+    assert np.all(np.abs(ahead - 0.5) < 0.02)
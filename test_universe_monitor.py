@@ -0,0 +1,73 @@
+import numpy as np
+from universe_monitor import UniverseMonitor, apply_delta, encode_delta
+from dmx_sender import DMXSender
+
+
+def test_delta_round_trip_and_size():
+    rng = np.random.default_rng(1)
+    prev = rng.integers(0, 256, 512, dtype=np.uint8)
+    view = prev.copy()
+    for n in (0, 1, 5, 40, 512):
+        cur = prev.copy()
+        idx = rng.choice(512, n, replace=False)
+        cur[idx] = cur[idx] + 1
+        payload = encode_delta(prev, cur)
+        if n == 0:
+            assert payload == b""
+        else:
+            # At most one 4-byte run header per changed channel
+            assert len(payload) <= 1 + 5 * n
+            apply_delta(view, payload)
+            assert np.array_equal(view, cur)
+        prev = cur
+    # Neighbouring changes share a run: 3 changes 2 apart -> 1 header + 5 values
+    cur = prev.copy(); cur[[10, 12, 14]] ^= 0xFF
+    assert len(encode_delta(prev, cur)) == 1 + 4 + 5
+
+
+def test_monitor_sees_sent_frames():
+    monitor = UniverseMonitor(64)
+    sender = DMXSender(port="virtual")
+    sender.monitor = monitor
+    assert monitor.poll() is None
+
+    sender.set_frame(bytes([255, 0, 128]), start=10)
+    assert sender.send_due(1.0)
+    view = apply_delta(np.zeros(64, dtype=np.uint8), monitor.keyframe())
+    assert not view.any()
+    apply_delta(view, monitor.poll())
+    assert list(view[9:12]) == [255, 0, 128]
+    # Keepalive resend of the same frame: nothing to stream
+    assert sender.send_due(2.0)
+    assert monitor.poll() is None
+    assert monitor.stats()["deltas"] == 1
+
+
+class InterleavedSlots:
+    """Monitor slots that publish during the reader's copy, once."""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.slots = monitor.slots
+        self.armed = True
+
+    def __getitem__(self, i):
+        if self.armed:
+            self.armed = False
+            m = self.monitor
+            m.slots = self.slots
+            m.publish(np.full(m.size, 2, dtype=np.uint8))  # Other slot, seq + 1
+            self.slots[m.seq % 2, :m.size // 2] = 3        # Next publish, half done
+            m.slots = self
+        return self.slots[i]
+
+    def __setitem__(self, i, value):
+        self.slots[i] = value
+
+
+def test_poll_retries_a_copy_overlapped_by_publishes():
+    monitor = UniverseMonitor(8)
+    monitor.publish(np.ones(8, dtype=np.uint8))
+    monitor.slots = InterleavedSlots(monitor)
+    view = apply_delta(np.zeros(8, dtype=np.uint8), monitor.poll())
+    assert list(view) == [2] * 8  # Not the torn [3, 3, 3, 3, 1, 1, 1, 1]
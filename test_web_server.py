@@ -0,0 +1,154 @@
+import base64
+import http.client
+import json
+import socket
+import numpy as np
+import web_server
+from universe_monitor import UniverseMonitor, apply_delta
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    response = conn.getresponse()
+    result = response.status, response.read()
+    conn.close()
+    return result
+
+
+def test_batched_commands_and_status(controller):
+    server = web_server.start_web_server(controller, host="127.0.0.1", port=0)
+    try:
+        status, body = request(server.port, "POST", "/commands",
+                               {"commands": [["set_preset", "acid_green", 0], ["set_param", "master", 0.5]]})
+        assert status == 200 and json.loads(body) == {"queued": 2}
+        assert request(server.port, "POST", "/commands", {"commands": [["rm", "-rf"]]})[0] == 400
+        assert request(server.port, "POST", "/commands", "not a list")[0] == 400
+        assert request(server.port, "GET", "/commands")[0] == 405
+        assert request(server.port, "GET", "/nope")[0] == 404
+
+        controller.update(1.0)
+        assert (controller.mode, controller.master) == ("acid_green", 0.5)
+        status, body = request(server.port, "GET", "/get_status")
+        assert status == 200 and json.loads(body)["bpm"] == controller.state.bpm
+        assert server.stats()["requests"] == 6
+    finally:
+        web_server.stop_web_server()
+
+
+def test_monitor_stream(controller):
+    monitor = UniverseMonitor(16, rate=100.0)
+    server = web_server.start_web_server(controller, host="127.0.0.1", port=0, monitor=monitor)
+    try:
+        assert request(server.port, "GET", "/monitor")[0] == 200
+        sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+        stream = sock.makefile("rb")
+        sock.sendall(b"GET /monitor/stream HTTP/1.1\r\nHost: test\r\n\r\n")
+
+        def next_payload():
+            while True:
+                line = stream.readline()
+                if line.startswith(b"data: "):
+                    return base64.b64decode(line[6:].strip())
+
+        view = apply_delta(np.ones(16, dtype=np.uint8), next_payload())
+        assert not view.any()
+        monitor.publish(bytes([0, 7, 7, 0]))
+        apply_delta(view, next_payload())
+        assert list(view[:4]) == [0, 7, 7, 0]
+        stream.close(); sock.close()
+    finally:
+        web_server.stop_web_server()
+
+
+def test_metrics_endpoint(controller):
+    server = web_server.start_web_server(controller, host="127.0.0.1", port=0)
+    try:
+        request(server.port, "GET", "/get_status")
+        status, body = request(server.port, "GET", "/metrics")
+        assert status == 200
+        text = body.decode()
+        assert "# TYPE vj_http_requests_total counter" in text
+        assert "vj_beat_to_dmx_seconds_count" in text  # Registered by lighting_controller
+    finally:
+        web_server.stop_web_server()
+
+
+def test_events_stream_pushes_state_changes(controller):
+    server = web_server.start_web_server(controller, host="127.0.0.1", port=0)
+    try:
+        sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+        stream = sock.makefile("rb")
+        sock.sendall(b"GET /events HTTP/1.1\r\nHost: test\r\n\r\n")
+
+        def next_event():
+            event = None
+            while True:
+                line = stream.readline().strip()
+                if line.startswith(b"event: "):
+                    event = line[7:].decode()
+                elif line.startswith(b"data: ") and event:
+                    return event, json.loads(line[6:])
+
+        # Current state on connect, then changes as they happen
+        assert next_event() == ("bpm", {"bpm": controller.state.bpm})
+        assert next_event() == ("preset", {"name": controller.mode})
+        controller.set_preset("acid_green", 0)
+        assert next_event() == ("preset", {"name": "acid_green"})
+        controller.on_beat(5.0)
+        controller.update(5.0)
+        assert next_event() == ("bpm", {"bpm": controller.bpm})  # First beat at this tempo
+        event, data = next_event()
+        assert event == "beat" and data["count"] == 1
+        stream.close(); sock.close()
+    finally:
+        web_server.stop_web_server()
+
+
+def test_bad_content_length_and_non_json_numbers_are_rejected(controller):
+    server = web_server.start_web_server(controller, host="127.0.0.1", port=0)
+    try:
+        def raw(length, body=b""):
+            sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+            sock.sendall(b"POST /commands HTTP/1.1\r\nHost: test\r\nContent-Length: " + length + b"\r\n\r\n" + body)
+            status = int(sock.makefile("rb").readline().split()[1])
+            sock.close()
+            return status
+
+        for length in (b"abc", b"-1", b"+5", b"1_0", b"\xb2"):
+            assert raw(length) == 400, length
+        assert raw(str(web_server.MAX_BODY + 1).encode()) == 413
+        body = b'[["set_param", "master", 0.5]]'
+        assert raw(str(len(body)).encode(), body) == 200
+
+        for constant in ("NaN", "Infinity", "-Infinity"):
+            conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+            conn.request("POST", "/commands", body=f'[["set_param", "master", {constant}]]')
+            response = conn.getresponse()
+            assert response.status == 400 and constant in json.loads(response.read())["error"]
+            conn.close()
+    finally:
+        web_server.stop_web_server()
+
+
+def test_oversized_lines_and_deep_nesting_get_a_response(controller):
+    server = web_server.start_web_server(controller, host="127.0.0.1", port=0)
+    try:
+        def status_of(data):
+            sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+            sock.sendall(data)
+            line = sock.makefile("rb").readline()
+            sock.close()
+            return int(line.split()[1])
+
+        long = b"x" * (web_server.MAX_LINE + 10)
+        assert status_of(b"GET /" + long + b" HTTP/1.1\r\n\r\n") == 431
+        assert status_of(b"GET / HTTP/1.1\r\nX-Long: " + long + b"\r\n\r\n") == 431
+
+        body = b"[" * 30000 + b"]" * 30000
+        assert len(body) <= web_server.MAX_BODY
+        head = b"POST /commands HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body)
+        assert status_of(head + body) == 400
+        assert server.stats()["errors"] == 0
+    finally:
+        web_server.stop_web_server()
@@ -0,0 +1,132 @@
+"""
+Preset transitions.
+
+A Crossfade is itself an effect (see effects.py): it runs the outgoing and
+incoming effects side by side and mixes their rendered frames with one
+vectorized integer blend, then hands over to the incoming effect when the
+fade is done. Fades start on the beat grid and last a number of beats.
+
+Running two effects costs up to twice the render time, so each fade
+measures its own cost per frame; over `budget` seconds, the outgoing
+effect is re-rendered only every 2nd, 4th, ... frame (its last frame is
+held in between), which keeps a long fade at roughly one effect's cost.
+"""
+
+import math
+import time
+import numpy as np
+from effects import Effect
+
+
+class Hold(Effect):
+    """A fixed frame, e.g. the output of an interrupted fade."""
+
+    def __init__(self, frame):
+        self.frame = np.array(frame, dtype=np.uint8)
+
+    def compile(self, ctx):
+        held = self.frame
+
+        def render(now, frame):
+            frame[:len(held)] = held
+        return render
+
+
+class Crossfade(Effect):
+    """
+    Fade from `source` to `target`, both (effect, render) pairs.
+
+    beats:   fade length in beats at the current tempo
+    seconds: fade length when there is no tempo
+    sync:    start on the next beat of the grid instead of right away
+    budget:  render time (s) per frame the fade may take before the
+             outgoing effect is throttled
+    """
+
+    MAX_SOURCE_EVERY = 8
+
+    def __init__(self, source, target, beats=1.0, seconds=0.5, sync=True, budget=0.004):
+        self.source, self.target = source, target
+        self.name = target[0].name
+        self.rotation = target[0].rotation
+        self.beats, self.seconds, self.sync = beats, seconds, sync
+        self.budget = budget
+        self.t0 = 0.0
+        self.duration = seconds
+        self.finished = False
+
+        # Cost report
+        self.frames = 0
+        self.source_every = 1
+        self.source_renders = 0
+        self.cost = 0.0      # EWMA of the per-frame render + blend time
+        self.max_cost = 0.0
+
+    def start(self, ctx):
+        now = ctx.clock() + ctx.output_latency
+        period = 60.0 / ctx.bpm if ctx.bpm > 0 else 0.0
+        self.duration = self.beats * period if period else self.seconds
+        self.t0 = now
+        if self.sync and period and ctx.last_visual_beat_time > 0:
+            # Next beat on the grid of the last shown beat
+            beats_ahead = math.ceil((now - ctx.last_visual_beat_time) / period)
+            self.t0 = ctx.last_visual_beat_time + max(0, beats_ahead) * period
+
+    def on_beat(self, ctx, t):
+        self.source[0].on_beat(ctx, t)
+        self.target[0].on_beat(ctx, t)
+
+    def on_onset(self, ctx, event):
+        self.source[0].on_onset(ctx, event)
+        self.target[0].on_onset(ctx, event)
+
+    def compile(self, ctx):
+        size = ctx.patch.size
+        a = np.zeros(size, dtype=np.uint8)
+        b = np.zeros(size, dtype=np.uint8)
+        mix = np.zeros(size, dtype=np.uint16)
+        tmp = np.zeros(size, dtype=np.uint16)
+        source, target = self.source[1], self.target[1]
+        clock = time.perf_counter
+
+        def render(now, frame):
+            x = (now - self.t0) / self.duration if self.duration > 0 else 1.0
+            if x <= 0.0:
+                source(now, frame)
+                return
+            if x >= 1.0:
+                target(now, frame)
+                self.finished = True
+                return
+
+            c0 = clock()
+            if self.frames % self.source_every == 0:
+                source(now, a)
+                self.source_renders += 1
+            target(now, b)
+            # 8.8 fixed point: (a * (256 - w) + b * w) >> 8
+            w = int(x * 256)
+            np.multiply(a, 256 - w, out=mix, dtype=np.uint16)
+            np.multiply(b, w, out=tmp, dtype=np.uint16)
+            np.add(mix, tmp, out=mix)
+            np.right_shift(mix, 8, out=mix)
+            np.copyto(frame[:size], mix, casting="unsafe")
+            self.frames += 1
+
+            cost = clock() - c0
+            self.cost += 0.2 * (cost - self.cost)
+            self.max_cost = max(self.max_cost, cost)
+            if self.cost > self.budget and self.source_every < self.MAX_SOURCE_EVERY:
+                self.source_every *= 2
+            elif self.cost < self.budget / 2 and self.source_every > 1:
+                self.source_every //= 2
+        return render
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "source_renders": self.source_renders,
+            "source_every": self.source_every,
+            "cost_us": self.cost * 1e6,
+            "max_cost_us": self.max_cost * 1e6,
+        }
@@ -0,0 +1,117 @@
+"""
+Live view of the channels actually sent, as compressed frame deltas.
+
+Output senders (DMXSender, OutputRouter, DMXController) publish every frame
+they put on the wire into a UniverseMonitor; that is one copy into a
+two-slot buffer, no lock. The web server polls it at `rate` Hz while
+someone is watching and broadcasts the same delta to every viewer, so the
+traffic follows what changed, not channels x fps x clients.
+
+Payloads (binary, base64 over Server-Sent Events):
+
+    b"K" + frame                     keyframe, the whole frame
+    b"D" + (skip, count, values)*    delta: skip unchanged channels (u16 LE),
+                                     then `count` (u16 LE) new values
+
+An empty delta is never sent; a frame with no changes costs nothing.
+"""
+
+import struct
+import numpy as np
+
+KEY = b"K"
+DELTA = b"D"
+# A run header costs 4 bytes: unchanged gaps up to this long are cheaper
+# to resend than to skip
+MERGE_GAP = 4
+
+
+def encode_delta(prev, cur):
+    """Delta payload turning `prev` into `cur` (same-size uint8 arrays); b"" if equal."""
+    changed = np.flatnonzero(prev != cur)
+    if not len(changed):
+        return b""
+    breaks = np.flatnonzero(np.diff(changed) > MERGE_GAP + 1)
+    starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+    ends = np.concatenate((changed[breaks], [changed[-1]])) + 1
+    parts = [DELTA]
+    pos = 0
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        parts.append(struct.pack("<HH", start - pos, end - start))
+        parts.append(cur[start:end].tobytes())
+        pos = end
+    return b"".join(parts)
+
+
+def apply_delta(frame, payload):
+    """Apply a keyframe or delta payload to `frame` (uint8 array) in place."""
+    kind = payload[:1]
+    if kind == KEY:
+        frame[:] = np.frombuffer(payload, dtype=np.uint8, offset=1)
+        return frame
+    if kind != DELTA:
+        raise ValueError(f"Unknown monitor payload type: {kind!r}")
+    i, pos = 1, 0
+    while i < len(payload):
+        skip, count = struct.unpack_from("<HH", payload, i)
+        i += 4
+        pos += skip
+        frame[pos:pos + count] = np.frombuffer(payload, dtype=np.uint8, count=count, offset=i)
+        i += count
+        pos += count
+    return frame
+
+
+class UniverseMonitor:
+    """
+    Newest sent frame (publish() from the output thread) and the deltas
+    between the frames the viewers have seen (poll() from the web loop).
+    """
+
+    def __init__(self, size, rate=25.0):
+        self.size = size
+        self.rate = rate
+        # Writer fills slot seq % 2, then bumps seq; see poll() for the reader side
+        self.slots = np.zeros((2, size), dtype=np.uint8)
+        self.seq = 0
+        self.shown = np.zeros(size, dtype=np.uint8)  # What the viewers have now
+        self.shown_seq = 0
+        self.scratch = np.zeros(size, dtype=np.uint8)
+
+        self.deltas = 0
+        self.delta_bytes = 0
+
+    def publish(self, frame):
+        data = np.frombuffer(memoryview(frame), dtype=np.uint8)[:self.size]
+        self.slots[self.seq % 2, :len(data)] = data
+        self.seq += 1
+
+    def poll(self):
+        """Delta from the last polled frame to the newest one, or None if nothing changed."""
+        while True:
+            seq = self.seq
+            if seq == self.shown_seq:
+                return None
+            self.scratch[:] = self.slots[(seq - 1) % 2]
+            # The very next publish writes the other slot, but the one after
+            # rewrites ours before it bumps seq: any publish meanwhile -> retry
+            if self.seq == seq:
+                break
+        self.shown_seq = seq
+        payload = encode_delta(self.shown, self.scratch)
+        if not payload:
+            return None
+        self.shown[:] = self.scratch
+        self.deltas += 1
+        self.delta_bytes += len(payload)
+        return payload
+
+    def keyframe(self):
+        return KEY + self.shown.tobytes()
+
+    def stats(self):
+        return {
+            "channels": self.size,
+            "deltas": self.deltas,
+            "avg_delta_bytes": self.delta_bytes / self.deltas if self.deltas else 0.0,
+        }
@@ -1,10 +1,137 @@
-from flask import Flask, render_template_string, request, jsonify
+"""
+Web control surface: dashboard, status, push events and JSON commands.
+
+A small HTTP/1.1 server on asyncio, running its own event loop in one
+thread: every connection is a coroutine (an open dashboard holds one for
+its event stream), nothing in a handler blocks, and commands only go onto
+the controller's command bus, so the render thread never waits for the
+web side. Connections, header and body sizes are capped; there is no
+per-request access log (stats() counts requests instead).
+
+    GET  /                  dashboard
+    GET  /get_status        state snapshot as JSON
+    GET  /events            Server-Sent Events: beat, bpm, preset
+    GET  /monitor           universe monitor: every channel as sent, live
+    GET  /monitor/stream    Server-Sent Events: base64 frame deltas (universe_monitor.py)
+    GET  /metrics           Prometheus text format (metrics.py)
+    POST /commands          {"commands": [["set_preset", "acid_green"],
+                                          ["set_param", "master", 0.5]]}
+                            applied together on the next frame
+    GET  /set_preset?name=, /set_audio_reactive?enabled=, /set_address?fixture=&addr=
+"""
+
+import asyncio
+import base64
+import json
 import threading
-import time
+import metrics
+from urllib.parse import parse_qs, urlsplit
+
+HOST = "0.0.0.0"
+PORT = 5005
+MAX_CLIENTS = 64         # Open connections; more are turned away with 503
+MAX_HEADER_LINES = 64
+MAX_LINE = 8192          # Bytes per request/header line
+MAX_BODY = 64 * 1024
+MAX_BATCH = 64           # Commands per POST
+IDLE_TIMEOUT = 30.0      # Keep-alive connections waiting for the next request, s
+KEEPALIVE = 15.0         # Comment line on idle event streams, s
 
-app = Flask(__name__)
 controller = None
 audio_analyzer = None
+universe_monitor = None
+server = None
+
+HTTP_REQUESTS = metrics.counter("vj_http_requests_total", "Requests handled by the control server")
+HTTP_REJECTED = metrics.counter("vj_http_rejected_total", "Connections turned away (max_clients reached)")
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 431: "Request Header Fields Too Large",
+               503: "Service Unavailable"}
+
+
+class EventHub:
+    """Fan-out of controller events to connected dashboards (Server-Sent Events)."""
+
+    def __init__(self, max_queue=32):
+        self.max_queue = max_queue
+        self.clients = set()
+        self.loop = None
+
+    def subscribe(self):
+        q = asyncio.Queue(maxsize=self.max_queue)
+        self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.clients.discard(q)
+
+    def publish(self, event, data):
+        # Render thread: format once, fan out on the event loop
+        if self.loop is None or not self.clients: return
+        msg = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+        self.loop.call_soon_threadsafe(self._fan_out, msg)
+
+    def _fan_out(self, msg):
+        for q in self.clients:
+            try: q.put_nowait(msg)
+            except asyncio.QueueFull: pass  # Slow client: drop, the next beat will catch it up
+
+
+hub = EventHub()
+
+
+class MonitorFeed:
+    """
+    Polls the universe monitor while anyone is watching and sends each delta,
+    encoded once, to every viewer. New viewers and viewers that fell behind
+    (full queue) get a keyframe instead of the deltas they missed.
+    """
+
+    def __init__(self, max_queue=16):
+        self.max_queue = max_queue
+        self.clients = set()
+        self.task = None
+        self.bytes_sent = 0
+        self.resyncs = 0
+
+    def subscribe(self):
+        q = asyncio.Queue(maxsize=self.max_queue)
+        self.clients.add(q)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._run())
+        return q
+
+    def unsubscribe(self, q):
+        self.clients.discard(q)
+
+    @staticmethod
+    def _message(payload):
+        return b"data: " + base64.b64encode(payload) + b"\n\n"
+
+    def keyframe(self):
+        return self._message(universe_monitor.keyframe())
+
+    async def _run(self):
+        try:
+            while self.clients:
+                payload = universe_monitor.poll()
+                if payload:
+                    msg = self._message(payload)
+                    for q in self.clients:
+                        try:
+                            q.put_nowait(msg)
+                        except asyncio.QueueFull:
+                            # Deltas only apply in order: drop the backlog, start over
+                            while not q.empty(): q.get_nowait()
+                            q.put_nowait(self.keyframe())
+                            self.resyncs += 1
+                await asyncio.sleep(1.0 / universe_monitor.rate)
+        finally:
+            self.task = None
+
+
+feed = MonitorFeed()
 
 HTML = """
 <!DOCTYPE html>
@@ -49,6 +176,10 @@ HTML = """
             display: none; z-index: 100; padding: 20px; box-sizing: border-box;
         }
         .vj-label { font-size: 9px; color: #444; text-align: left; margin: 10px 0 5px 2px; text-transform: uppercase; letter-spacing: 2px; font-weight: bold; }
+        .metrics-overlay {
+            position: fixed; right: 8px; bottom: 8px; background: rgba(0,0,0,0.85); border: 1px solid #333; border-radius: 6px;
+            padding: 8px 10px; font: 11px monospace; color: #8f8; display: none; z-index: 50; pointer-events: none; white-space: pre;
+        }
         .config-row { display: flex; justify-content: space-between; margin: 15px 0; align-items: center; }
         input[type=number] { width: 60px; padding: 8px; background: #111; color: #fff; border: 1px solid #333; border-radius: 4px; }
     </style>
@@ -57,36 +188,45 @@ HTML = """
     <div class="header">
         <div class="bpm-display" id="bpm-val">--</div>
         <div class="beat-dot" id="beat-dot"></div>
+        <button onclick="toggleMetrics()" style="background:none; border:none; color:#333; font-size:20px; padding:10px;">📊</button>
         <button onclick="toggleSettings()" style="background:none; border:none; color:#333; font-size:24px; padding:10px;">⚙️</button>
     </div>
 
     <div class="vj-label">Techno / Dark</div>
     <div class="vj-grid">
-        <button class="btn btn-techno" onclick="setPreset('techno_red', this)">Red Pulse</button>
-        <button class="btn btn-techno" onclick="setPreset('acid_green', this)">Acid Green</button>
-        <button class="btn btn-techno" onclick="setPreset('industrial_amber', this)">Industrial Amber</button>
-        <button class="btn btn-techno" onclick="setPreset('minimal_void', this)">Minimal Void</button>
+        <button class="btn btn-techno" data-preset="techno_red" onclick="setPreset('techno_red', this)">Red Pulse</button>
+        <button class="btn btn-techno" data-preset="acid_green" onclick="setPreset('acid_green', this)">Acid Green</button>
+        <button class="btn btn-techno" data-preset="industrial_amber" onclick="setPreset('industrial_amber', this)">Industrial Amber</button>
+        <button class="btn btn-techno" data-preset="minimal_void" onclick="setPreset('minimal_void', this)">Minimal Void</button>
     </div>
 
     <div class="vj-label">House / Shuffle</div>
     <div class="vj-grid">
-        <button class="btn btn-house" onclick="setPreset('white_kick', this)">White Kick</button>
-        <button class="btn btn-house" onclick="setPreset('dance_rg', this)">R/G Dance</button>
-        <button class="btn btn-house" onclick="setPreset('alternating_kick', this)">Alt Kick</button>
-        <button class="btn btn-house" onclick="setPreset('factory_floor', this)">Factory Floor</button>
+        <button class="btn btn-house" data-preset="white_kick" onclick="setPreset('white_kick', this)">White Kick</button>
+        <button class="btn btn-house" data-preset="dance_rg" onclick="setPreset('dance_rg', this)">R/G Dance</button>
+        <button class="btn btn-house" data-preset="alternating_kick" onclick="setPreset('alternating_kick', this)">Alt Kick</button>
+        <button class="btn btn-house" data-preset="factory_floor" onclick="setPreset('factory_floor', this)">Factory Floor</button>
     </div>
 
     <div class="vj-label">Pop / FX</div>
     <div class="vj-grid">
-        <button class="btn btn-pop" onclick="setPreset('barbie_party', this)">Barbie Party</button>
-        <button class="btn btn-pop" onclick="setPreset('pastel_dreams', this)">Pastel Dreams</button>
-        <button class="btn btn-pop" onclick="setPreset('rainbow_flow', this)">Rainbow Flow</button>
-        <button class="btn btn-pop" onclick="setPreset('code_red', this)">Police / Alarm</button>
+        <button class="btn btn-pop" data-preset="barbie_party" onclick="setPreset('barbie_party', this)">Barbie Party</button>
+        <button class="btn btn-pop" data-preset="pastel_dreams" onclick="setPreset('pastel_dreams', this)">Pastel Dreams</button>
+        <button class="btn btn-pop" data-preset="rainbow_flow" onclick="setPreset('rainbow_flow', this)">Rainbow Flow</button>
+        <button class="btn btn-pop" data-preset="code_red" onclick="setPreset('code_red', this)">Police / Alarm</button>
+    </div>
+
+    <div class="vj-grid">
+        <button class="btn btn-pop" style="border-left-color:#fff" data-preset="minimal_glitch" onclick="setPreset('minimal_glitch', this)">Minimal Glitch</button>
+        <button class="btn btn-pop" style="border-left-color:#fff" data-preset="digital_decay" onclick="setPreset('digital_decay', this)">Digital Decay</button>
     </div>
 
+    <div class="vj-label">Pixel Map</div>
     <div class="vj-grid">
-        <button class="btn btn-pop" style="border-left-color:#fff" onclick="setPreset('minimal_glitch', this)">Minimal Glitch</button>
-        <button class="btn btn-pop" style="border-left-color:#fff" onclick="setPreset('digital_decay', this)">Digital Decay</button>
+        <button class="btn btn-pop" data-preset="pixel_chase" onclick="setPreset('pixel_chase', this)">Chase</button>
+        <button class="btn btn-pop" data-preset="pixel_rainbow" onclick="setPreset('pixel_rainbow', this)">Gradient</button>
+        <button class="btn btn-pop" data-preset="pixel_noise" onclick="setPreset('pixel_noise', this)">Noise</button>
+        <button class="btn btn-pop" data-preset="spectrum" onclick="setPreset('spectrum', this)">Spectrum</button>
     </div>
 
     <div class="strobe-area">
@@ -95,7 +235,9 @@ HTML = """
             ontouchstart="startStrobe()" ontouchend="stopStrobe()">STROBE</button>
     </div>
 
-    <button class="btn btn-blackout" onclick="setPreset('blackout', this)">MASTER BLACKOUT</button>
+    <button class="btn btn-blackout" data-preset="blackout" onclick="setPreset('blackout', this)">MASTER BLACKOUT</button>
+
+    <div id="metrics" class="metrics-overlay"></div>
 
     <div id="settings" class="settings-overlay">
         <div onclick="toggleSettings()" style="float:right; font-size:40px; color:#555;">×</div>
@@ -106,84 +248,482 @@ HTML = """
             <div class="config-row"><span>Panel 1 DMX:</span><input type="number" value="10" onchange="updateAddr('panel1', this.value)"></div>
             <div class="config-row"><span>Panel 2 DMX:</span><input type="number" value="20" onchange="updateAddr('panel2', this.value)"></div>
             <div class="config-row"><span>Party Bar DMX:</span><input type="number" value="30" onchange="updateAddr('party_bar', this.value)"></div>
+            <div class="config-row"><span>Universe Monitor</span><a href="/monitor" style="color:var(--primary)">Open</a></div>
             <p style="font-size:10px; color:#333; margin-top:50px;">LIGHTWEIGHT VJ PRO - V1.5.0</p>
         </div>
     </div>
 
     <script>
         let lastPreset = 'techno_red';
+        // One POST per action; several commands in a list are applied on the same frame
+        function send(commands) {
+            fetch('/commands', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                body: JSON.stringify({commands: commands})});
+        }
         function setPreset(name, btn) {
             if(name !== 'strobe_white') lastPreset = name;
-            fetch('/set_preset?name=' + name);
+            send([['set_preset', name]]);
             if(btn) {
                 document.querySelectorAll('.btn').forEach(b => b.classList.remove('active-mode'));
                 btn.classList.add('active-mode');
             }
         }
-        function startStrobe() { fetch('/set_preset?name=strobe_white'); }
-        function stopStrobe() { fetch('/set_preset?name=' + lastPreset); }
-        function setAudioReactive(e) { fetch('/set_audio_reactive?enabled=' + e); }
-        function updateAddr(f, a) { fetch('/set_address?fixture=' + f + '&addr=' + a); }
+        function startStrobe() { send([['set_preset', 'strobe_white']]); }
+        function stopStrobe() { send([['set_preset', lastPreset, 0]]); }
+        function setAudioReactive(e) { send([['set_audio_reactive', e]]); }
+        function updateAddr(f, a) { send([['set_address', f, parseInt(a)]]); }
         function toggleSettings() { 
             const s = document.getElementById('settings');
             s.style.display = s.style.display === 'block' ? 'none' : 'block';
         }
 
-        setInterval(() => {
-            fetch('/get_status').then(r => r.json()).then(data => {
-                const bpm = parseFloat(data.bpm);
-                document.getElementById('bpm-val').innerText = bpm > 0 ? Math.round(bpm) : '--';
-                const dot = document.getElementById('beat-dot');
-                if (data.last_beat_age < 0.08) dot.classList.add('active');
-                else dot.classList.remove('active');
+        // Performance overlay: /metrics once a second, rates and averages over that second
+        let metricsTimer = null, prevMetrics = null, prevMetricsT = 0;
+        function parseMetrics(text) {
+            const m = {};
+            text.split('\n').forEach(l => {
+                if (!l || l[0] === '#') return;
+                const i = l.lastIndexOf(' ');
+                m[l.slice(0, i)] = parseFloat(l.slice(i + 1));
+            });
+            return m;
+        }
+        async function pollMetrics() {
+            const m = parseMetrics(await (await fetch('/metrics')).text());
+            const t = performance.now() / 1000;
+            if (prevMetrics) {
+                const dt = t - prevMetricsT;
+                const rate = k => ((m[k] || 0) - (prevMetrics[k] || 0)) / dt;
+                const avgMs = k => {
+                    const n = rate(k + '_count');
+                    return n > 0 ? (rate(k + '_sum') / n * 1000).toFixed(2) + ' ms' : '-';
+                };
+                document.getElementById('metrics').textContent = [
+                    'frames/s   ' + rate('vj_output_frames_total').toFixed(1),
+                    'dmx sent/s ' + rate('vj_dmx_frames_sent_total').toFixed(1),
+                    'render     ' + avgMs('vj_render_seconds'),
+                    'serial     ' + avgMs('vj_serial_write_seconds'),
+                    'audio hop  ' + avgMs('vj_audio_hop_seconds'),
+                    'beat->dmx  ' + avgMs('vj_beat_to_dmx_seconds'),
+                    'missed     ' + (m['vj_missed_deadlines_total'] || 0),
+                    'dropped    ' + (m['vj_audio_dropped_samples_total'] || 0) + ' samples',
+                    'requests/s ' + rate('vj_http_requests_total').toFixed(1),
+                ].join('\n');
+            }
+            prevMetrics = m; prevMetricsT = t;
+        }
+        function toggleMetrics() {
+            const el = document.getElementById('metrics');
+            if (metricsTimer) {
+                clearInterval(metricsTimer); metricsTimer = null; prevMetrics = null;
+                el.style.display = 'none';
+            } else {
+                el.textContent = '...'; el.style.display = 'block';
+                pollMetrics(); metricsTimer = setInterval(pollMetrics, 1000);
+            }
+        }
+
+        function showBpm(bpm) {
+            document.getElementById('bpm-val').innerText = bpm > 0 ? Math.round(bpm) : '--';
+        }
+        function showPreset(name) {
+            if (name === 'strobe_white') return;
+            document.querySelectorAll('.btn').forEach(b => {
+                b.classList.toggle('active-mode', b.dataset.preset === name);
             });
-        }, 80);
+        }
+
+        // Push channel: the server sends beat/bpm/preset events as they happen
+        let dotTimer = null;
+        const events = new EventSource('/events');
+        events.addEventListener('beat', () => {
+            const dot = document.getElementById('beat-dot');
+            dot.classList.add('active');
+            clearTimeout(dotTimer);
+            dotTimer = setTimeout(() => dot.classList.remove('active'), 80);
+        });
+        events.addEventListener('bpm', e => showBpm(parseFloat(JSON.parse(e.data).bpm)));
+        events.addEventListener('preset', e => showPreset(JSON.parse(e.data).name));
+    </script>
+</body>
+</html>
+"""
+
+HTML_BYTES = HTML.encode()
+
+MONITOR_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>UNIVERSE MONITOR</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body { font-family: monospace; background: #050505; color: #eee; margin: 0; padding: 10px; }
+        .header { display: flex; justify-content: space-between; padding: 5px 0 10px; color: #555; font-size: 11px; }
+        .grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(34px, 1fr)); gap: 2px; }
+        .cell { background: #000; border: 1px solid #222; border-radius: 3px; padding: 2px; font-size: 10px; text-align: center; }
+        .cell b { display: block; color: #555; font-size: 8px; font-weight: normal; }
+    </style>
+</head>
+<body>
+    <div class="header"><a href="/" style="color:#f00">&larr; Control</a><span id="info">connecting</span></div>
+    <div class="grid" id="grid"></div>
+    <script>
+        // Keyframe: 'K' + every channel; delta: 'D' + (skip u16, count u16, values)*
+        let cells = [], bytes = 0, frames = 0, t0 = performance.now();
+        function build(n) {
+            const grid = document.getElementById('grid');
+            grid.innerHTML = '';
+            cells = [];
+            for (let i = 0; i < n; i++) {
+                const c = document.createElement('div');
+                c.className = 'cell';
+                c.innerHTML = '<b>' + (i + 1) + '</b><span>0</span>';
+                grid.appendChild(c);
+                cells.push(c);
+            }
+        }
+        function set(ch, v) {
+            const c = cells[ch];
+            c.lastChild.textContent = v;
+            c.style.background = 'rgb(' + v + ',' + v + ',' + v + ')';
+            c.style.color = v > 140 ? '#000' : '#eee';
+        }
+        const stream = new EventSource('/monitor/stream');
+        stream.onmessage = e => {
+            const s = atob(e.data), b = new Uint8Array(s.length);
+            for (let i = 0; i < s.length; i++) b[i] = s.charCodeAt(i);
+            bytes += e.data.length; frames++;
+            if (b[0] === 75) {
+                if (cells.length !== b.length - 1) build(b.length - 1);
+                for (let i = 1; i < b.length; i++) set(i - 1, b[i]);
+            } else {
+                let i = 1, pos = 0;
+                while (i < b.length) {
+                    pos += b[i] | b[i + 1] << 8;
+                    const count = b[i + 2] | b[i + 3] << 8;
+                    i += 4;
+                    for (let k = 0; k < count; k++) set(pos++, b[i++]);
+                }
+            }
+        };
+        setInterval(() => {
+            const s = (performance.now() - t0) / 1000;
+            document.getElementById('info').textContent =
+                cells.length + ' ch, ' + (frames / s).toFixed(1) + ' updates/s, ' + (bytes / s / 1024).toFixed(1) + ' KB/s';
+            bytes = 0; frames = 0; t0 = performance.now();
+        }, 1000);
     </script>
 </body>
 </html>
 """
 
-@app.route("/")
-def index():
-    return render_template_string(HTML)
-
-@app.route("/get_status")
-def get_status():
-    import time
-    last_beat = controller.last_visual_beat_time if controller else 0
-    return jsonify({
-        "last_beat_age": float(time.time() - last_beat),
-        "bpm": float(controller.bpm) if controller else 0.0
-    })
-
-@app.route("/set_preset")
-def set_preset():
-    name = request.args.get("name")
-    if controller: controller.set_preset(name)
-    return "OK"
-
-@app.route("/set_audio_reactive")
-def set_audio_reactive():
-    enabled = request.args.get("enabled") == "true"
-    if controller: controller.audio_reactive = enabled
-    return "OK"
-
-@app.route("/set_address")
-def set_address():
-    f = request.args.get("fixture"); a = request.args.get("addr")
-    if controller: controller.set_address(f, a)
-    return "OK"
-
-def start_web_server(lighting_controller, analyzer=None):
-    global controller, audio_analyzer
+MONITOR_HTML_BYTES = MONITOR_HTML.encode()
+
+
+def _json(data, status=200):
+    return status, "application/json", json.dumps(data).encode()
+
+
+def _text(text, status=200):
+    return status, "text/plain; charset=utf-8", text.encode()
+
+
+def _arg(query, name):
+    values = query.get(name)
+    return values[0] if values else None
+
+
+def index(query, body):
+    return 200, "text/html; charset=utf-8", HTML_BYTES
+
+
+def get_metrics(query, body):
+    return 200, "text/plain; version=0.0.4; charset=utf-8", metrics.render().encode()
+
+
+def monitor_page(query, body):
+    if not universe_monitor:
+        return _text("No universe monitor", 404)
+    return 200, "text/html; charset=utf-8", MONITOR_HTML_BYTES
+
+
+def get_status(query, body):
+    state = controller.state if controller else None
+    age = max(0.0, controller.clock() - state.last_beat_time) if state else 0.0
+    status = {
+        "last_beat_age": float(age),
+        "bpm": float(state.bpm) if state else 0.0
+    }
+    if audio_analyzer: status["audio"] = audio_analyzer.capture_stats()
+    return _json(status)
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not a valid command argument")
+
+
+def post_commands(query, body):
+    try:
+        # NaN/Infinity aren't JSON; Python accepts them unless told not to
+        data = json.loads(body or b"null", parse_constant=_reject_constant)
+        commands = data.get("commands") if isinstance(data, dict) else data
+        if not isinstance(commands, list) or not commands:
+            raise ValueError("Expected a non-empty list of commands")
+        if len(commands) > MAX_BATCH:
+            raise ValueError(f"At most {MAX_BATCH} commands per request")
+        if not all(isinstance(c, list) and c and isinstance(c[0], str) for c in commands):
+            raise ValueError("Each command is a list: [name, *args]")
+        if controller: controller.commands.post_batch(commands)
+    except ValueError as e:  # Includes JSONDecodeError
+        return _json({"error": str(e)}, 400)
+    except RecursionError:  # Nesting deeper than the parser's stack
+        return _json({"error": "JSON nested too deeply"}, 400)
+    return _json({"queued": len(commands)})
+
+
+def set_preset(query, body):
+    name = _arg(query, "name")
+    if controller: controller.commands.post("set_preset", name)
+    return _text("OK")
+
+
+def set_audio_reactive(query, body):
+    enabled = _arg(query, "enabled") == "true"
+    if controller: controller.commands.post("set_audio_reactive", enabled)
+    return _text("OK")
+
+
+def set_address(query, body):
+    f = _arg(query, "fixture"); a = _arg(query, "addr")
+    if controller: controller.commands.post("set_address", f, a)
+    return _text("OK")
+
+
+ROUTES = {
+    ("GET", "/"): index,
+    ("GET", "/get_status"): get_status,
+    ("GET", "/monitor"): monitor_page,
+    ("GET", "/metrics"): get_metrics,
+    ("POST", "/commands"): post_commands,
+    ("GET", "/set_preset"): set_preset,
+    ("GET", "/set_audio_reactive"): set_audio_reactive,
+    ("GET", "/set_address"): set_address,
+}
+
+
+class ControlServer:
+    """The asyncio HTTP server, on its own event loop thread."""
+
+    def __init__(self, host=HOST, port=PORT, max_clients=MAX_CLIENTS, access_log=False):
+        self.host, self.port = host, port
+        self.max_clients = max_clients
+        self.access_log = access_log
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait(5.0)
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(2.0)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        hub.loop = self.loop
+        try:
+            srv = self.loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE))
+            self.port = srv.sockets[0].getsockname()[1]  # When started on port 0
+        except OSError as e:
+            print(f"Web Server Error: {e}")
+            self.ready.set()
+            return
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            hub.loop = None
+            srv.close()
+            # Close open connections (event streams) before the loop goes away
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def stats(self):
+        return {
+            "connections": self.connections,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "event_clients": len(hub.clients),
+            "monitor_clients": len(feed.clients),
+            "monitor_bytes": feed.bytes_sent,
+            "monitor_resyncs": feed.resyncs,
+        }
+
+    async def _handle(self, reader, writer):
+        if self.connections >= self.max_clients:
+            self.rejected += 1
+            HTTP_REJECTED.inc()
+            self._respond(writer, *_text("Too many connections", 503), keep_alive=False)
+            writer.close()
+            return
+        self.connections += 1
+        try:
+            while True:
+                request = await asyncio.wait_for(self._read_request(reader, writer), IDLE_TIMEOUT)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                self.requests += 1
+                HTTP_REQUESTS.inc()
+                if self.access_log:
+                    print(f"{method} {path}")
+                if path == "/events" and method == "GET":
+                    await self._event_stream(writer)
+                    break
+                if path == "/monitor/stream" and method == "GET" and universe_monitor:
+                    await self._monitor_stream(writer)
+                    break
+                handler = ROUTES.get((method, path))
+                if handler:
+                    response = handler(query, body)
+                elif any(p == path for _, p in ROUTES):
+                    response = _text("Method not allowed", 405)
+                else:
+                    response = _text("Not found", 404)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._respond(writer, *response, keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Server shutting down
+        except Exception as e:
+            self.errors += 1
+            print(f"Web Error: {e}")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        try:
+            line = await reader.readline()
+            if not line:
+                return None
+            try:
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+            except ValueError:
+                self._respond(writer, *_text("Bad request line", 400), keep_alive=False)
+                return None
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                if len(headers) >= MAX_HEADER_LINES:
+                    self._respond(writer, *_text("Too many headers", 400), keep_alive=False)
+                    return None
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except (ValueError, asyncio.LimitOverrunError):
+            # readline() on a line longer than MAX_LINE
+            self._respond(writer, *_text("Request line or header too long", 431), keep_alive=False)
+            return None
+        length = headers.get("content-length", "0") or "0"
+        # Plain digits only: int() would also take "-1", "+1", " 1" and "1_0"
+        if not (length.isascii() and length.isdigit()):
+            self._respond(writer, *_text("Bad Content-Length", 400), keep_alive=False)
+            return None
+        length = int(length)
+        if length > MAX_BODY:
+            self._respond(writer, *_text("Body too large", 413), keep_alive=False)
+            return None
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return method.upper(), url.path, parse_qs(url.query), headers, body
+
+    @staticmethod
+    def _respond(writer, status, content_type, payload, keep_alive=True):
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+
+    @staticmethod
+    def _stream_head(writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nX-Accel-Buffering: no\r\n"
+                     b"Connection: keep-alive\r\n\r\nretry: 1000\n\n")
+
+    async def _event_stream(self, writer):
+        self._stream_head(writer)
+        q = hub.subscribe()
+        try:
+            if controller:
+                state = controller.state
+                writer.write(f"event: bpm\ndata: {json.dumps({'bpm': float(state.bpm)})}\n\n".encode())
+                writer.write(f"event: preset\ndata: {json.dumps({'name': state.mode})}\n\n".encode())
+            await writer.drain()
+            while True:
+                try:
+                    msg = await asyncio.wait_for(q.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    msg = b": keepalive\n\n"
+                writer.write(msg)
+                await writer.drain()
+        finally:
+            hub.unsubscribe(q)
+
+    async def _monitor_stream(self, writer):
+        self._stream_head(writer)
+        q = feed.subscribe()
+        try:
+            msg = feed.keyframe()
+            while True:
+                writer.write(msg)
+                feed.bytes_sent += len(msg)
+                await writer.drain()
+                try:
+                    msg = await asyncio.wait_for(q.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    msg = b": keepalive\n\n"
+        finally:
+            feed.unsubscribe(q)
+
+
+def start_web_server(lighting_controller, analyzer=None, host=HOST, port=PORT, monitor=None):
+    global controller, audio_analyzer, universe_monitor, server
     controller = lighting_controller
     audio_analyzer = analyzer
-    thread = threading.Thread(
-        target=lambda: app.run(host="0.0.0.0", port=5005, debug=False, use_reloader=False),
-        daemon=True
-    )
-    thread.start()
-    print("Web Control available at http://localhost:5005")
+    universe_monitor = monitor
+    controller.add_listener(hub.publish)
+    server = ControlServer(host, port)
+    server.start()
+    print(f"Web Control available at http://localhost:{server.port}")
+    return server
 
 def stop_web_server():
-    pass
+    global server
+    if server:
+        server.stop()
+        server = None
+        if controller: controller.remove_listener(hub.publish)